@@ -4,4 +4,8 @@ from .api import ( # noqa
     )
 from .compare import _produce_net_changes  # noqa
 from .generate import RevisionContext  # noqa
-from .render import render_op_text, renderers  # noqa
\ No newline at end of file
+from .render import render_op_text, renderers  # noqa
+from .snapshot import (  # noqa
+    SnapshotInspector, take_snapshot, write_snapshot
+    )
+from .fingerprint import schema_fingerprint  # noqa
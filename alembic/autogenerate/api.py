@@ -1,10 +1,14 @@
 """Provide the 'autogenerate' feature which can produce migration operations
 automatically."""
 
+from sqlalchemy import create_engine
+from sqlalchemy import event, schema as sa_schema
+from sqlalchemy.engine.reflection import Inspector
 from ..operations import ops
 from . import render
 from . import compare
 from . import compose
+from .snapshot import SnapshotInspector
 from .. import util
 
 
@@ -100,9 +104,10 @@ def compare_metadata(context, metadata):
 
     autogen_context = _autogen_context(context, metadata=metadata)
 
-    # as_sql=True is nonsensical here. autogenerate requires a connection
-    # it can use to run queries against to get the database schema.
-    if context.as_sql:
+    # as_sql=True is nonsensical here, unless the schema comes from a
+    # snapshot. autogenerate otherwise requires a connection it can use
+    # to run queries against to get the database schema.
+    if context.as_sql and autogen_context['inspector'] is None:
         raise util.CommandError(
             "autogenerate can't use as_sql=True as it prevents querying "
             "the database for schema information")
@@ -200,6 +205,72 @@ def _render_migration_diffs(context, template_args, imports):
     )
 
 
+def _reflect_schema(context):
+    """Reflect the tables of the database for the given
+    :class:`.MigrationContext` into a new
+    :class:`~sqlalchemy.schema.MetaData`, omitting the version table."""
+
+    if context.as_sql:
+        raise util.CommandError(
+            "Can't reflect the database schema using as_sql=True")
+
+    inspector = Inspector.from_engine(context.bind)
+    column_reflect = context.impl._compat_autogen_column_reflect(inspector)
+
+    # establish every table up front with the dialect's column_reflect
+    # hook, as used by autogenerate, so that tables referred to by
+    # foreign keys aren't reflected without it
+    metadata = sa_schema.MetaData()
+    tables = []
+    for tname in inspector.get_table_names():
+        if tname == context._version.name:
+            continue
+        table = sa_schema.Table(tname, metadata)
+        event.listen(table, "column_reflect", column_reflect)
+        tables.append(table)
+    for table in tables:
+        inspector.reflecttable(table, None)
+    return metadata
+
+
+def _produce_create_migrations(context, metadata):
+    """Produce a :class:`.MigrationScript` which creates the given
+    metadata from nothing.
+
+    The comparison is run against an empty SQLite memory database;
+    table and index creation doesn't depend on the dialect being
+    compared to, and the resulting operations are rendered against the
+    given context.  Tables are placed in foreign key dependency order.
+
+    """
+    from ..runtime.migration import MigrationContext
+
+    opts = dict(
+        (key, context.opts[key])
+        for key in ('include_symbol', 'include_object', 'include_name')
+        if key in context.opts
+    )
+
+    connection = create_engine("sqlite://").connect()
+    try:
+        scratch_context = MigrationContext.configure(connection, opts=opts)
+        migration_script = produce_migrations(scratch_context, metadata)
+    finally:
+        connection.close()
+
+    order = dict(
+        (table.key, idx) for idx, table in enumerate(metadata.sorted_tables))
+
+    def table_order(op):
+        key = "%s.%s" % (op.schema, op.table_name) \
+            if op.schema else op.table_name
+        return order.get(key, len(order))
+
+    migration_script.upgrade_ops.ops.sort(key=table_order)
+    migration_script.downgrade_ops.ops.sort(key=table_order, reverse=True)
+    return migration_script
+
+
 def _autogen_context(
     context, imports=None, metadata=None, include_symbol=None,
         include_object=None, include_schemas=False):
@@ -222,6 +293,11 @@ def _autogen_context(
     if include_object:
         object_filters.append(include_object)
 
+    name_filters = []
+    include_name = opts.get('include_name')
+    if include_name:
+        name_filters.append(include_name)
+
     if metadata is None:
         raise util.CommandError(
             "Can't proceed with --autogenerate option; environment "
@@ -232,6 +308,12 @@ def _autogen_context(
 
     opts = context.opts
     connection = context.bind
+
+    inspector = None
+    if opts.get('schema_snapshot'):
+        inspector = SnapshotInspector.from_file(
+            opts['schema_snapshot'], connection.dialect)
+
     return {
         'imports': imports if imports is not None else set(),
         'connection': connection,
@@ -240,6 +322,8 @@ def _autogen_context(
         'opts': opts,
         'metadata': metadata,
         'object_filters': object_filters,
-        'include_schemas': include_schemas
+        'name_filters': name_filters,
+        'include_schemas': include_schemas,
+        'inspector': inspector
     }
 
@@ -8,7 +8,10 @@ from sqlalchemy.util import OrderedSet
 import re
 from .render import _user_defined_render
 import contextlib
+import collections
+from multiprocessing.pool import ThreadPool
 from alembic.ddl.base import _fk_spec
+from .fingerprint import ComparisonCache
 
 log = logging.getLogger(__name__)
 
@@ -18,12 +21,14 @@ def _produce_net_changes(autogen_context, diffs):
     metadata = autogen_context['metadata']
     connection = autogen_context['connection']
     object_filters = autogen_context.get('object_filters', ())
+    name_filters = autogen_context.get('name_filters', ())
     include_schemas = autogen_context.get('include_schemas', False)
 
-    inspector = Inspector.from_engine(connection)
+    inspector = autogen_context.get('inspector') or \
+        Inspector.from_engine(connection)
     conn_table_names = set()
 
-    default_schema = connection.dialect.default_schema_name
+    default_schema = inspector.default_schema_name
     if include_schemas:
         schemas = set(inspector.get_schema_names())
         # replace default schema name with None
@@ -31,6 +36,9 @@ def _produce_net_changes(autogen_context, diffs):
         # replace the "default" schema with None
         schemas.add(None)
         schemas.discard(default_schema)
+        schemas = set(
+            s for s in schemas
+            if _run_name_filters(s, "schema", {}, name_filters))
     else:
         schemas = [None]
 
@@ -43,15 +51,203 @@ def _produce_net_changes(autogen_context, diffs):
             tables = tables.difference(
                 [autogen_context['context'].version_table]
             )
-        conn_table_names.update(zip([s] * len(tables), tables))
+        conn_table_names.update(
+            (s, tname) for tname in tables
+            if _run_name_filters(
+                tname, "table", {"schema_name": s}, name_filters))
 
     metadata_table_names = OrderedSet(
         [(table.schema, table.name) for table in metadata.sorted_tables]
     ).difference([(version_table_schema, version_table)])
 
-    _compare_tables(conn_table_names, metadata_table_names,
-                    object_filters,
-                    inspector, metadata, diffs, autogen_context)
+    if name_filters:
+        def include_metadata_table(schema, tname):
+            if schema == default_schema:
+                schema = None
+            if include_schemas and not _run_name_filters(
+                    schema, "schema", {}, name_filters):
+                return False
+            return _run_name_filters(
+                tname, "table", {"schema_name": schema}, name_filters)
+
+        metadata_table_names = OrderedSet(
+            (schema, tname) for schema, tname in metadata_table_names
+            if include_metadata_table(schema, tname))
+
+    comparison_cache = ComparisonCache.for_context(
+        autogen_context, conn_table_names)
+    autogen_context['comparison_cache'] = comparison_cache
+    try:
+        _compare_tables(conn_table_names, metadata_table_names,
+                        object_filters,
+                        inspector, metadata, diffs, autogen_context)
+    finally:
+        del autogen_context['comparison_cache']
+
+
+def _prefetch_reflection(conn_table_names, inspector, autogen_context):
+    """Give the dialect implementation the chance to reflect all of the
+    given tables in bulk, storing the results within the inspector's
+    cache so that per-table reflection doesn't query for them again."""
+
+    if _from_snapshot(inspector):
+        return
+
+    context = autogen_context['context']
+    impl = context.impl
+
+    tables_by_schema = collections.defaultdict(list)
+    for s, tname in conn_table_names:
+        tables_by_schema[s].append(tname)
+
+    remaining = []
+    for s, tnames in tables_by_schema.items():
+        reflected = impl.autogen_reflect_tables(inspector, s, sorted(tnames))
+        if not reflected:
+            remaining.extend((s, tname) for tname in sorted(tnames))
+            continue
+        for tname, table_info in reflected.items():
+            _prime_table_info(inspector, s, tname, table_info)
+
+    workers = context.opts.get('autogenerate_workers')
+    if workers and workers > 1 and len(remaining) > 1 and \
+            _supports_concurrent_reflection(inspector.bind):
+        remaining.sort(key=lambda x: (x[0] or '', x[1]))
+        for s, tname, table_info in _reflect_concurrently(
+                remaining, inspector.bind, workers):
+            _prime_table_info(inspector, s, tname, table_info)
+
+
+def _from_snapshot(inspector):
+    from .snapshot import SnapshotInspector
+    return isinstance(inspector, SnapshotInspector)
+
+
+def _reflect_table(table, inspector, autogen_context):
+    # column information within a snapshot was passed through the
+    # dialect's hook when the snapshot was taken
+    if not _from_snapshot(inspector):
+        event.listen(
+            table,
+            "column_reflect",
+            autogen_context['context'].impl.
+            _compat_autogen_column_reflect(inspector))
+    inspector.reflecttable(table, None)
+
+
+def _prime_table_info(inspector, schema, tname, table_info):
+    for key, value in table_info.items():
+        sqla_compat._prime_reflection_cache(
+            inspector, "get_%s" % key, tname, schema, value)
+
+
+def _supports_concurrent_reflection(bind):
+    # other connections to a SQLite memory database each get a
+    # database of their own
+    return not (
+        bind.dialect.name == 'sqlite' and
+        bind.engine.url.database in (None, '', ':memory:')
+    )
+
+
+def _reflect_concurrently(tables, bind, workers):
+    """Reflect the given (schema, tablename) pairs using a pool of
+    threads, each using its own connection from the engine of the given
+    connection.
+
+    Yields (schema, tablename, table_info) tuples in the order given,
+    where table_info is in the format returned by
+    :meth:`.DefaultImpl.autogen_reflect_tables`.
+
+    """
+    engine = bind.engine
+    batches = [
+        batch for batch in
+        (tables[idx::workers] for idx in range(workers)) if batch]
+
+    def reflect_batch(batch):
+        connection = engine.connect()
+        try:
+            worker_inspector = Inspector.from_engine(connection)
+            return [
+                (s, tname, _reflect_table_info(worker_inspector, s, tname))
+                for s, tname in batch
+            ]
+        finally:
+            connection.close()
+
+    pool = ThreadPool(len(batches))
+    try:
+        results = pool.map(reflect_batch, batches)
+    finally:
+        pool.close()
+        pool.join()
+
+    reflected = dict(
+        ((s, tname), table_info)
+        for batch in results for s, tname, table_info in batch)
+    for s, tname in tables:
+        yield s, tname, reflected[(s, tname)]
+
+
+def _reflect_table_info(inspector, schema, tname):
+    table_info = {
+        'table_options': inspector.get_table_options(tname, schema=schema),
+        'columns': inspector.get_columns(tname, schema=schema),
+        'pk_constraint': inspector.get_pk_constraint(tname, schema=schema),
+        'foreign_keys': inspector.get_foreign_keys(tname, schema=schema),
+    }
+    # as in _compare_indexes_and_uniques(), these may not be
+    # implemented by the dialect
+    try:
+        table_info['indexes'] = inspector.get_indexes(tname, schema=schema)
+    except NotImplementedError:
+        pass
+    if hasattr(inspector, "get_unique_constraints"):
+        try:
+            table_info['unique_constraints'] = \
+                inspector.get_unique_constraints(tname, schema=schema)
+        except NotImplementedError:
+            pass
+    return table_info
+
+
+def _reflection_order(tables, inspector):
+    """Order (schema, tablename) pairs so that tables referred to by
+    foreign keys precede those referring to them.
+
+    Reflecting a table also reflects the tables it refers to, using a
+    separate inspector, unless they're already present in the
+    :class:`~sqlalchemy.schema.MetaData`; this way, those tables are
+    reflected with the same inspector, and therefore the same cache.
+
+    """
+    ordered = []
+    seen = set()
+    for table_key in sorted(tables, key=lambda x: (x[0] or '', x[1])):
+        stack = [(table_key, False)]
+        while stack:
+            key, children_done = stack.pop()
+            if children_done:
+                ordered.append(key)
+                continue
+            if key in seen or key not in tables:
+                continue
+            seen.add(key)
+            stack.append((key, True))
+            s, tname = key
+            for fk in inspector.get_foreign_keys(tname, schema=s):
+                stack.append(
+                    ((fk['referred_schema'], fk['referred_table']), False))
+    return ordered
+
+
+def _run_name_filters(name, type_, parent_names, name_filters):
+    for fn in name_filters:
+        if not fn(name, type_, parent_names):
+            return False
+    else:
+        return True
 
 
 def _run_filters(object_, name, type_, reflected, compare_to, object_filters):
@@ -66,7 +262,7 @@ def _compare_tables(conn_table_names, metadata_table_names,
                     object_filters,
                     inspector, metadata, diffs, autogen_context):
 
-    default_schema = inspector.bind.dialect.default_schema_name
+    default_schema = inspector.default_schema_name
 
     # tables coming from the connection will not have "schema"
     # set if it matches default_schema_name; so we need a list
@@ -92,6 +288,18 @@ def _compare_tables(conn_table_names, metadata_table_names,
     )
     metadata_table_names = metadata_table_names_no_dflt_schema
 
+    existing_tables = conn_table_names.intersection(metadata_table_names)
+
+    comparison_cache = autogen_context.get('comparison_cache')
+    if comparison_cache is not None:
+        existing_tables = comparison_cache.skip_unchanged(
+            existing_tables, tname_to_table)
+        _prefetch_reflection(
+            conn_table_names.difference(comparison_cache.unchanged),
+            inspector, autogen_context)
+    else:
+        _prefetch_reflection(conn_table_names, inspector, autogen_context)
+
     for s, tname in metadata_table_names.difference(conn_table_names):
         name = '%s.%s' % (s, tname) if s else tname
         metadata_table = tname_to_table[(s, tname)]
@@ -104,61 +312,71 @@ def _compare_tables(conn_table_names, metadata_table_names,
                                          metadata_table,
                                          diffs, autogen_context, inspector)
 
+    removed_tables = conn_table_names.difference(metadata_table_names)
+
     removal_metadata = sa_schema.MetaData()
-    for s, tname in conn_table_names.difference(metadata_table_names):
+    for s, tname in _reflection_order(removed_tables, inspector):
         name = sa_schema._get_table_key(tname, s)
         exists = name in removal_metadata.tables
         t = sa_schema.Table(tname, removal_metadata, schema=s)
 
         if not exists:
-            event.listen(
-                t,
-                "column_reflect",
-                autogen_context['context'].impl.
-                _compat_autogen_column_reflect(inspector))
-            inspector.reflecttable(t, None)
+            _reflect_table(t, inspector, autogen_context)
+
+    for s, tname in removed_tables:
+        name = sa_schema._get_table_key(tname, s)
+        t = removal_metadata.tables[name]
         if _run_filters(t, tname, "table", True, None, object_filters):
             diffs.append(("remove_table", t))
             log.info("Detected removed table %r", name)
 
-    existing_tables = conn_table_names.intersection(metadata_table_names)
-
     existing_metadata = sa_schema.MetaData()
     conn_column_info = {}
-    for s, tname in existing_tables:
+    for s, tname in _reflection_order(existing_tables, inspector):
         name = sa_schema._get_table_key(tname, s)
         exists = name in existing_metadata.tables
         t = sa_schema.Table(tname, existing_metadata, schema=s)
         if not exists:
-            event.listen(
-                t,
-                "column_reflect",
-                autogen_context['context'].impl.
-                _compat_autogen_column_reflect(inspector))
-            inspector.reflecttable(t, None)
+            _reflect_table(t, inspector, autogen_context)
         conn_column_info[(s, tname)] = t
 
-    for s, tname in sorted(existing_tables, key=lambda x: (x[0] or '', x[1])):
-        s = s or None
-        name = '%s.%s' % (s, tname) if s else tname
-        metadata_table = tname_to_table[(s, tname)]
-        conn_table = existing_metadata.tables[name]
+    in_sync_tables = set()
+    with _deferred_server_default_compare(autogen_context, diffs):
+        for s, tname in sorted(
+                existing_tables, key=lambda x: (x[0] or '', x[1])):
+            s = s or None
+            name = '%s.%s' % (s, tname) if s else tname
+            metadata_table = tname_to_table[(s, tname)]
+            conn_table = existing_metadata.tables[name]
 
-        if _run_filters(
-                metadata_table, tname, "table", False,
-                conn_table, object_filters):
-            with _compare_columns(
-                s, tname, object_filters,
-                conn_table,
-                metadata_table,
-                    diffs, autogen_context, inspector):
-                _compare_indexes_and_uniques(s, tname, object_filters,
-                                             conn_table,
-                                             metadata_table,
-                                             diffs, autogen_context, inspector)
-                _compare_foreign_keys(s, tname, object_filters, conn_table,
-                                      metadata_table, diffs, autogen_context,
-                                      inspector)
+            if _run_filters(
+                    metadata_table, tname, "table", False,
+                    conn_table, object_filters):
+                diff_count = len(diffs)
+                with _compare_columns(
+                    s, tname, object_filters,
+                    conn_table,
+                    metadata_table,
+                        diffs, autogen_context, inspector):
+                    _compare_indexes_and_uniques(
+                        s, tname, object_filters,
+                        conn_table,
+                        metadata_table,
+                        diffs, autogen_context, inspector)
+                    _compare_foreign_keys(
+                        s, tname, object_filters, conn_table,
+                        metadata_table, diffs, autogen_context,
+                        inspector)
+                if len(diffs) == diff_count:
+                    in_sync_tables.add((s, tname))
+
+    if comparison_cache is not None:
+        # column changes located by deferred comparisons are added
+        # once the block above completes
+        in_sync_tables.difference_update(
+            (diff[0][1], diff[0][2]) for diff in diffs
+            if isinstance(diff, list))
+        comparison_cache.write(in_sync_tables, tname_to_table)
 
     # TODO:
     # table constraints
@@ -618,26 +836,79 @@ def _compare_server_default(schema, tname, cname, conn_col, metadata_col,
     rendered_conn_default = conn_col.server_default.arg.text \
         if conn_col.server_default else None
 
-    isdiff = autogen_context['context']._compare_server_default(
-        conn_col, metadata_col,
-        rendered_metadata_default,
-        rendered_conn_default
-    )
+    comparison = (conn_col, metadata_col,
+                  rendered_metadata_default, rendered_conn_default)
+
+    deferred = autogen_context.get('deferred_server_defaults')
+    if deferred is not None:
+        pending, table_diffs = deferred
+        # an empty column diff list isn't added to the table diffs by
+        # _compare_columns(); note where it would go if a change is found
+        position = len(table_diffs) if not diffs else None
+        pending.append(
+            (comparison, schema, tname, cname, rendered_conn_default,
+             diffs, position))
+        return
+
+    isdiff = autogen_context['context']._compare_server_default(*comparison)
     if isdiff:
-        conn_col_default = rendered_conn_default
-        diffs.append(
-            ("modify_default", schema, tname, cname,
-                {
-                    "existing_nullable": conn_col.nullable,
-                    "existing_type": conn_col.type,
-                },
-                conn_col_default,
-                metadata_default),
-        )
-        log.info("Detected server default on column '%s.%s'",
-                 tname,
-                 cname
-                 )
+        _add_modify_default(schema, tname, cname, conn_col, metadata_col,
+                            rendered_conn_default, diffs)
+
+
+def _add_modify_default(schema, tname, cname, conn_col, metadata_col,
+                        rendered_conn_default, diffs):
+    diffs.append(
+        ("modify_default", schema, tname, cname,
+            {
+                "existing_nullable": conn_col.nullable,
+                "existing_type": conn_col.type,
+            },
+            rendered_conn_default,
+            metadata_col.server_default),
+    )
+    log.info("Detected server default on column '%s.%s'",
+             tname,
+             cname
+             )
+
+
+@contextlib.contextmanager
+def _deferred_server_default_compare(autogen_context, diffs):
+    """Collect the server default comparisons made within the block,
+    so that they may be run as a group once the block completes.
+
+    Each "modify_default" located is then added to the diff list of its
+    column, and that list is placed within ``diffs`` where it would have
+    been without deferral.
+
+    """
+    pending = []
+    autogen_context['deferred_server_defaults'] = (pending, diffs)
+    try:
+        yield
+    finally:
+        del autogen_context['deferred_server_defaults']
+
+    if not pending:
+        return
+
+    results = autogen_context['context']._compare_server_defaults(
+        [entry[0] for entry in pending])
+
+    insertions = []
+    for (comparison, schema, tname, cname, rendered_conn_default,
+            col_diff, position), isdiff in zip(pending, results):
+        if isdiff:
+            conn_col, metadata_col = comparison[0:2]
+            _add_modify_default(schema, tname, cname, conn_col, metadata_col,
+                                rendered_conn_default, col_diff)
+            if position is not None:
+                insertions.append((position, col_diff))
+
+    # inserting from the end leaves the positions yet to be used intact
+    for position, col_diff in reversed(insertions):
+        diffs.insert(position, col_diff)
 
 
 def _compare_foreign_keys(schema, tname, object_filters, conn_table,
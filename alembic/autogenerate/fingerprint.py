@@ -0,0 +1,216 @@
+"""Fingerprints of schema objects, used to skip work which an earlier
+autogenerate run has already done."""
+
+import hashlib
+import json
+import logging
+import os
+import types
+
+from sqlalchemy import schema as sa_schema
+from sqlalchemy import exc as sa_exc
+
+from .. import __version__
+
+log = logging.getLogger(__name__)
+
+CACHE_FORMAT = 1
+
+
+def _hexdigest(value):
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+
+def _table_fingerprint(table, dialect):
+    """Return a fingerprint of the given metadata
+    :class:`~sqlalchemy.schema.Table`, based on the DDL which would
+    create it and its indexes, or ``None`` if that DDL can't be compiled
+    for the given dialect."""
+
+    try:
+        ddl = [str(sa_schema.CreateTable(table).compile(dialect=dialect))]
+        ddl.extend(
+            str(sa_schema.CreateIndex(index).compile(dialect=dialect))
+            for index in sorted(
+                table.indexes, key=lambda index: index.name or ''))
+    except sa_exc.SQLAlchemyError:
+        return None
+    return _hexdigest("\n".join(ddl))
+
+
+def schema_fingerprint(context):
+    """Return a fingerprint of the schema of the database of the given
+    :class:`.MigrationContext`.
+
+    The fingerprint is a hash of the reflected schema in the form
+    produced by :func:`.take_snapshot`, and so is subject to the same
+    options; it's specific to the dialect in use.
+
+    .. versionadded:: 0.8.0
+
+    """
+    from .snapshot import take_snapshot
+
+    snapshot = take_snapshot(context)
+    return _hexdigest(json.dumps(snapshot['schemas'], sort_keys=True))
+
+
+def _read_fingerprints(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file_:
+        return json.load(file_)
+
+
+def _write_fingerprints(path, fingerprints):
+    with open(path, 'w') as file_:
+        json.dump(fingerprints, file_, sort_keys=True, indent=1)
+        file_.write("\n")
+
+
+_COMPARISON_OPTIONS = (
+    'compare_type', 'compare_server_default', 'include_object',
+    'include_symbol', 'include_name', 'include_schemas', 'render_item'
+)
+
+
+def _option_state(value):
+    # filters and comparison callables are identified by name and by
+    # their code, so that editing one within env.py discards the cache
+    if callable(value):
+        code = getattr(value, '__code__', None)
+        return [
+            getattr(value, '__module__', None),
+            getattr(value, '__qualname__',
+                    getattr(value, '__name__', type(value).__name__)),
+            _hexdigest(repr(_code_state(code)))
+            if code is not None else None
+        ]
+    else:
+        return bool(value)
+
+
+def _code_state(code):
+    # the repr() of nested code objects, such as those of lambdas and
+    # generator expressions, includes their address, and that of a
+    # frozenset depends on the hash seed; neither is stable across runs
+    consts = []
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            consts.append(_code_state(const))
+        elif isinstance(const, frozenset):
+            consts.append(sorted(repr(elem) for elem in const))
+        else:
+            consts.append(repr(const))
+    return [repr(code.co_code), consts, list(code.co_names)]
+
+
+class ComparisonCache(object):
+    """Records the tables which an autogenerate run found to be the
+    same in the database as in the target metadata, so that the next run
+    can skip reflecting and comparing them.
+
+    A table is skipped when its metadata fingerprint is unchanged, and
+    the database side is considered unchanged when the revisions within
+    its version table, its list of tables and the comparison options,
+    including the filter callables such as ``include_object``, are all
+    the same as when the cache was written.  This assumes that the
+    schema of the database is only changed by migrations, and that
+    filters don't depend on state other than their own code; the cache
+    file may be deleted to force a full comparison.
+
+    """
+
+    def __init__(self, path, state, dialect, in_sync):
+        self.path = path
+        self.state = state
+        self.dialect = dialect
+        self.in_sync = in_sync
+        self.unchanged = set()
+        self._fingerprints = {}
+
+    @classmethod
+    def for_context(cls, autogen_context, conn_table_names):
+        """Return a :class:`.ComparisonCache` for the cache file named by
+        the ``autogenerate_cache`` option, or ``None`` if the option
+        isn't set."""
+
+        context = autogen_context['context']
+        path = context.opts.get('autogenerate_cache')
+        if not path or context.as_sql:
+            return None
+
+        connection = autogen_context['connection']
+        state = _hexdigest(json.dumps([
+            __version__,
+            connection.dialect.name,
+            repr(connection.engine.url),
+            sorted(context.get_current_heads()),
+            sorted(
+                "%s.%s" % (s, tname) if s else tname
+                for s, tname in conn_table_names),
+            [
+                _option_state(context.opts.get(name))
+                for name in _COMPARISON_OPTIONS
+            ]
+        ]))
+
+        in_sync = {}
+        if os.path.exists(path):
+            with open(path) as file_:
+                cached = json.load(file_)
+            if cached.get('format') == CACHE_FORMAT and \
+                    cached.get('state') == state:
+                in_sync = cached['tables']
+            else:
+                log.info("Autogenerate cache %s is out of date", path)
+
+        return cls(path, state, connection.dialect, in_sync)
+
+    def fingerprint(self, metadata_table):
+        key = metadata_table.key
+        if key not in self._fingerprints:
+            self._fingerprints[key] = _table_fingerprint(
+                metadata_table, self.dialect)
+        return self._fingerprints[key]
+
+    def skip_unchanged(self, tables, tname_to_table):
+        """Given (schema, tablename) pairs present both in the database
+        and the metadata, return those which need to be compared,
+        noting the others within :attr:`.unchanged`."""
+
+        remaining = set()
+        for s, tname in tables:
+            key = sa_schema._get_table_key(tname, s)
+            metadata_table = tname_to_table[(s, tname)]
+            fingerprint = self.fingerprint(metadata_table)
+            if fingerprint is not None and \
+                    self.in_sync.get(key) == fingerprint:
+                self.unchanged.add((s, tname))
+            else:
+                remaining.add((s, tname))
+        if self.unchanged:
+            log.info(
+                "Skipping %d table(s) unchanged since the last "
+                "autogenerate run", len(self.unchanged))
+        return remaining
+
+    def write(self, in_sync_tables, tname_to_table):
+        """Write the cache, recording the given (schema, tablename)
+        pairs as well as those skipped as unchanged."""
+
+        tables = {}
+        for s, tname in self.unchanged.union(in_sync_tables):
+            fingerprint = self.fingerprint(tname_to_table[(s, tname)])
+            if fingerprint is not None:
+                tables[sa_schema._get_table_key(tname, s)] = fingerprint
+
+        with open(self.path, 'w') as file_:
+            json.dump(
+                {
+                    'format': CACHE_FORMAT,
+                    'state': self.state,
+                    'tables': tables
+                },
+                file_, sort_keys=True, indent=1)
+            file_.write("\n")
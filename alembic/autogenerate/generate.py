@@ -38,6 +38,7 @@ class RevisionContext(object):
             splice=migration_script.splice,
             branch_labels=migration_script.branch_label,
             version_path=migration_script.version_path,
+            squashes=self.command_args.get('squashes'),
             **template_args)
 
     def run_autogenerate(self, rev, context):
@@ -64,6 +65,29 @@ class RevisionContext(object):
         for migration_script in self.generated_revisions:
             migration_script._autogen_context = autogen_context
 
+    def run_squash(self, rev, context):
+        squashes = self.command_args['squashes']
+        if set(self.script_directory.get_revisions(rev)) != \
+                set(self.script_directory.get_revisions(squashes)):
+            raise util.CommandError(
+                "Target database is not at revision %s." % squashes)
+
+        metadata = api._reflect_schema(context)
+        autogen_context = api._autogen_context(context, metadata=metadata)
+
+        snapshot = api._produce_create_migrations(context, metadata)
+
+        migration_script = self.generated_revisions[0]
+        migration_script.upgrade_ops = snapshot.upgrade_ops
+        migration_script.downgrade_ops = snapshot.downgrade_ops
+
+        hook = context.opts.get('process_revision_directives', None)
+        if hook:
+            hook(context, rev, self.generated_revisions)
+
+        for migration_script in self.generated_revisions:
+            migration_script._autogen_context = autogen_context
+
     def run_no_autogenerate(self, rev, context):
         hook = context.opts.get('process_revision_directives', None)
         if hook:
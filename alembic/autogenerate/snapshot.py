@@ -0,0 +1,411 @@
+"""Write the reflected schema of a database to a snapshot file, and
+provide an :class:`~sqlalchemy.engine.reflection.Inspector` which
+reads from such a file, so that autogenerate can run without
+a database."""
+
+import collections
+import importlib
+import json
+
+from sqlalchemy import types as sqltypes
+from sqlalchemy import schema as sa_schema
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine.reflection import Inspector
+
+from .. import util
+from ..util import compat
+from . import compare
+
+SNAPSHOT_FORMAT = 1
+
+
+def take_snapshot(context):
+    """Reflect the database of the given :class:`.MigrationContext`
+    and return the result as a structure of plain Python types, suitable
+    for JSON serialization.
+
+    Tables are reflected from all schemas if the ``include_schemas``
+    option of the context is set, otherwise from the default schema
+    only.  The ``include_name`` option is honored, and the version table
+    is omitted, other than for tables referred to by the foreign keys of
+    those stored.  Column information is passed through the
+    :meth:`.DefaultImpl.autogen_column_reflect` hook of the dialect
+    implementation before it is stored.
+
+    .. versionadded:: 0.8.0
+
+    """
+    if context.as_sql:
+        raise util.CommandError(
+            "Can't take a schema snapshot using as_sql=True")
+
+    connection = context.bind
+    inspector = Inspector.from_engine(connection)
+    impl = context.impl
+    include_name = context.opts.get('include_name')
+    name_filters = [include_name] if include_name else []
+
+    default_schema = inspector.default_schema_name
+    schema_names = inspector.get_schema_names()
+    if context.opts.get('include_schemas', False):
+        schemas = set(schema_names)
+        schemas.discard("information_schema")
+        schemas.add(None)
+        schemas.discard(default_schema)
+        schemas = sorted(
+            (s for s in schemas
+             if compare._run_name_filters(s, "schema", {}, name_filters)),
+            key=lambda s: s or '')
+    else:
+        schemas = [None]
+
+    table_names = []
+    for s in schemas:
+        for tname in sorted(inspector.get_table_names(schema=s)):
+            if s == context.version_table_schema and \
+                    tname == context.version_table:
+                continue
+            if compare._run_name_filters(
+                    tname, "table", {"schema_name": s}, name_filters):
+                table_names.append((s, tname))
+
+    compare._prefetch_reflection(
+        set(table_names), inspector, {'context': context})
+
+    table_names = collections.deque(table_names)
+    tables_by_schema = collections.defaultdict(dict)
+    # tables referred to by foreign keys are autoloaded when the
+    # referring table is reflected, so they're stored as well even if
+    # they're omitted otherwise
+    while table_names:
+        s, tname = table_names.popleft()
+        if tname in tables_by_schema[s]:
+            continue
+        table_info = tables_by_schema[s][tname] = _table_info(
+            inspector, impl, s, tname)
+        for fk in table_info['foreign_keys']:
+            referred_schema = fk['referred_schema']
+            if referred_schema == default_schema:
+                referred_schema = None
+            table_names.append((referred_schema, fk['referred_table']))
+
+    return {
+        'format': SNAPSHOT_FORMAT,
+        'dialect': connection.dialect.name,
+        'default_schema_name': default_schema,
+        'schema_names': schema_names,
+        'schemas': [
+            {'name': s, 'tables': tables_by_schema[s]}
+            for s in sorted(tables_by_schema, key=lambda s: s or '')
+        ]
+    }
+
+
+def _table_info(inspector, impl, schema, tname):
+    table = sa_schema.Table(tname, sa_schema.MetaData(), schema=schema)
+    columns = inspector.get_columns(tname, schema=schema)
+    for column_info in columns:
+        impl.autogen_column_reflect(inspector, table, column_info)
+    try:
+        uniques = inspector.get_unique_constraints(tname, schema=schema)
+    except NotImplementedError:
+        uniques = None
+    return {
+        'table_options': inspector.get_table_options(tname, schema=schema),
+        'columns': [_column_as_dict(col) for col in columns],
+        'pk_constraint': inspector.get_pk_constraint(tname, schema=schema),
+        'foreign_keys': inspector.get_foreign_keys(tname, schema=schema),
+        'indexes': inspector.get_indexes(tname, schema=schema),
+        'unique_constraints': uniques
+    }
+
+
+def write_snapshot(context, path):
+    """Reflect the database of the given :class:`.MigrationContext` and
+    write it to a snapshot file at the given path.
+
+    .. versionadded:: 0.8.0
+
+    .. seealso::
+
+        :func:`.take_snapshot`
+
+        :class:`.SnapshotInspector`
+
+    """
+    snapshot = take_snapshot(context)
+    with open(path, 'w') as file_:
+        json.dump(snapshot, file_, sort_keys=True, indent=1)
+        file_.write("\n")
+    return snapshot
+
+
+def _column_as_dict(column_info):
+    column = {
+        'name': column_info['name'],
+        'type': _type_as_dict(column_info['type']),
+        'nullable': column_info['nullable'],
+        'default': column_info.get('default'),
+    }
+    if 'autoincrement' in column_info:
+        column['autoincrement'] = column_info['autoincrement']
+    return column
+
+
+_missing = object()
+
+
+def _type_as_dict(type_):
+    # types are stored as the name of their class along with the
+    # arguments which differ from the defaults, found in the same way
+    # as SQLAlchemy's own repr() of a type; the __init__ of the class
+    # is inspected along with those it passes **kw on to, or
+    # SchemaType for the Enum family
+    cls = type(type_)
+    to_inspect = []
+    for base in cls.__mro__:
+        if base is object or '__init__' not in base.__dict__:
+            continue
+        spec = compat.inspect_getargspec(base.__init__)
+        to_inspect.append(spec)
+        if not spec[2] or isinstance(type_, sqltypes.SchemaType):
+            break
+    if isinstance(type_, sqltypes.SchemaType):
+        to_inspect.append(
+            compat.inspect_getargspec(sqltypes.SchemaType.__init__))
+
+    args = []
+    kwargs = {}
+    for i, (arg_names, varargs, varkw, defaults) in enumerate(
+            spec[0:4] for spec in to_inspect):
+        arg_names = arg_names[1:]
+        defaults = defaults or ()
+        positional = arg_names[0:len(arg_names) - len(defaults)]
+        if i == 0:
+            for arg in positional:
+                value = _value_as_json(getattr(type_, arg, None))
+                if value is _missing:
+                    return {'name': cls.__name__, 'args': [], 'kwargs': {}}
+                args.append(value)
+            if varargs is not None:
+                for value in getattr(type_, varargs, ()):
+                    value = _value_as_json(value)
+                    if value is _missing:
+                        return {
+                            'name': cls.__name__, 'args': [], 'kwargs': {}}
+                    args.append(value)
+        for arg, default in zip(arg_names[len(positional):], defaults):
+            if arg.startswith('_') or arg in kwargs:
+                continue
+            value = getattr(type_, arg, _missing)
+            if value is _missing or value == default:
+                continue
+            value = _value_as_json(value)
+            if value is not _missing:
+                kwargs[arg] = value
+    return {'name': cls.__name__, 'args': args, 'kwargs': kwargs}
+
+
+def _value_as_json(value):
+    if isinstance(value, sqltypes.TypeEngine):
+        return _type_as_dict(value)
+    elif isinstance(value, (list, tuple)):
+        values = [_value_as_json(elem) for elem in value]
+        if _missing in values:
+            return _missing
+        return values
+    elif value is None or isinstance(
+            value, compat.string_types + (bool, int, float)):
+        return value
+    else:
+        return _missing
+
+
+def _type_lookup(dialect):
+    # types are looked up by name amongst the generic types, those
+    # exported by the package of the dialect, such as postgresql.ENUM,
+    # and the dialect's ischema_names
+    def types_in(namespace):
+        return (
+            (name, cls) for name, cls in vars(namespace).items()
+            if not name.startswith('_') and isinstance(cls, type) and
+            issubclass(cls, sqltypes.TypeEngine)
+        )
+
+    lookup = dict(types_in(sqltypes))
+    package = type(dialect).__module__.rsplit('.', 1)[0]
+    try:
+        lookup.update(types_in(importlib.import_module(package)))
+    except ImportError:
+        pass
+    lookup.update(
+        (cls.__name__, cls) for cls in dialect.ischema_names.values()
+        if isinstance(cls, type)
+    )
+    return lookup
+
+
+def _type_from_dict(type_info, lookup):
+    try:
+        cls = lookup[type_info['name']]
+    except KeyError:
+        util.warn(
+            "Did not recognize type '%s' in schema snapshot" %
+            type_info['name'])
+        return sqltypes.NULLTYPE
+    args = [_value_from_json(value, lookup) for value in type_info['args']]
+    kwargs = dict(
+        (key, _value_from_json(value, lookup))
+        for key, value in type_info['kwargs'].items()
+    )
+    return cls(*args, **kwargs)
+
+
+def _value_from_json(value, lookup):
+    if isinstance(value, dict):
+        return _type_from_dict(value, lookup)
+    elif isinstance(value, list):
+        return [_value_from_json(elem, lookup) for elem in value]
+    else:
+        return value
+
+
+class SnapshotInspector(Inspector):
+    """An :class:`~sqlalchemy.engine.reflection.Inspector` which returns
+    the reflected schema stored within a snapshot, rather than querying
+    a database.
+
+    Autogenerate uses this inspector when the
+    :paramref:`.EnvironmentContext.configure.schema_snapshot` option is
+    given, in which case :func:`.compare_metadata` and
+    :func:`.produce_migrations` can also be used with a
+    :class:`.MigrationContext` in "offline" mode::
+
+        from alembic.migration import MigrationContext
+        from alembic.autogenerate import compare_metadata
+
+        context = MigrationContext.configure(
+            dialect_name="postgresql",
+            opts={"as_sql": True, "schema_snapshot": "schema.json"}
+        )
+        diffs = compare_metadata(context, target_metadata)
+
+    Snapshot files are written by the ``alembic snapshot`` command,
+    or by :func:`.write_snapshot`.
+
+    .. versionadded:: 0.8.0
+
+    """
+
+    def __init__(self, snapshot, dialect):
+        if snapshot.get('format') != SNAPSHOT_FORMAT:
+            raise util.CommandError(
+                "Unsupported schema snapshot format: %r" %
+                snapshot.get('format'))
+        if snapshot['dialect'] != dialect.name:
+            raise util.CommandError(
+                "Schema snapshot was taken from a %s database; can't "
+                "compare it using the %s dialect" % (
+                    snapshot['dialect'], dialect.name))
+
+        self.snapshot = snapshot
+        self.dialect = dialect
+        self.bind = self.engine = _SnapshotBind(self, dialect)
+        self.info_cache = {}
+        self._type_lookup = _type_lookup(dialect)
+        self._tables = dict(
+            ((schema['name'], tname), table_info)
+            for schema in snapshot['schemas']
+            for tname, table_info in schema['tables'].items()
+        )
+
+    @classmethod
+    def from_file(cls, path, dialect):
+        """Produce a :class:`.SnapshotInspector` from the snapshot file
+        at the given path."""
+
+        with open(path) as file_:
+            return cls(json.load(file_), dialect)
+
+    @property
+    def default_schema_name(self):
+        return self.snapshot['default_schema_name']
+
+    def _table_info(self, table_name, schema):
+        if schema == self.default_schema_name:
+            schema = None
+        try:
+            return self._tables[(schema, table_name)]
+        except KeyError:
+            raise sa_exc.NoSuchTableError(table_name)
+
+    def get_schema_names(self):
+        return list(self.snapshot['schema_names'])
+
+    def get_table_names(self, schema=None, order_by=None):
+        if schema == self.default_schema_name:
+            schema = None
+        return sorted(
+            tname for s, tname in self._tables if s == schema)
+
+    def get_view_names(self, schema=None):
+        return []
+
+    def get_table_options(self, table_name, schema=None, **kw):
+        return dict(self._table_info(table_name, schema)['table_options'])
+
+    def get_columns(self, table_name, schema=None, **kw):
+        columns = []
+        for column in self._table_info(table_name, schema)['columns']:
+            column_info = dict(column)
+            column_info['type'] = _type_from_dict(
+                column['type'], self._type_lookup)
+            columns.append(column_info)
+        return columns
+
+    def get_pk_constraint(self, table_name, schema=None, **kw):
+        return dict(self._table_info(table_name, schema)['pk_constraint'])
+
+    def get_primary_keys(self, table_name, schema=None, **kw):
+        return self.get_pk_constraint(
+            table_name, schema)['constrained_columns']
+
+    def get_foreign_keys(self, table_name, schema=None, **kw):
+        return [
+            dict(fk)
+            for fk in self._table_info(table_name, schema)['foreign_keys']
+        ]
+
+    def get_indexes(self, table_name, schema=None, **kw):
+        return [
+            dict(idx)
+            for idx in self._table_info(table_name, schema)['indexes']
+        ]
+
+    def get_unique_constraints(self, table_name, schema=None, **kw):
+        uniques = self._table_info(table_name, schema)['unique_constraints']
+        if uniques is None:
+            raise NotImplementedError()
+        return [dict(uq) for uq in uniques]
+
+
+class _SnapshotBind(object):
+    """Stands in for the connection of a :class:`.SnapshotInspector`.
+
+    Tables autoloaded during reflection, such as the targets of foreign
+    keys, pass the dialect's ``reflecttable()`` to :meth:`.run_callable`,
+    which would create a new inspector for this "connection"; they're
+    reflected from the snapshot instead.
+
+    """
+
+    def __init__(self, inspector, dialect):
+        self.inspector = inspector
+        self.dialect = dialect
+
+    @property
+    def engine(self):
+        return self
+
+    def run_callable(self, callable_, table, *arg, **kw):
+        return self.inspector.reflecttable(table, *arg, **kw)
@@ -148,6 +148,73 @@ def merge(config, revisions, message=None, branch_label=None, rev_id=None):
         **template_args)
 
 
+def squash(config, revision, message=None, rev_id=None):
+    """Create a new baseline revision reproducing the schema as of a
+    given revision.
+
+    The target database, as configured by ``env.py``, must be at the
+    given revision; its schema is reflected and rendered as a new
+    revision which creates it directly.  The new revision is marked with
+    ``squashes = <revision>``; upgrading a database which has no
+    version yet runs it in place of the given revision and all of its
+    ancestors, then continues from there, while existing databases
+    continue to use the full history.
+
+    The revision may also be given as a range starting at ``base``,
+    e.g. ``base:ae1027a6acf``.
+
+    Only the schema is reproduced; data steps within the squashed
+    revisions, such as :meth:`.Operations.bulk_insert` and
+    :meth:`.Operations.execute`, aren't part of the new revision, and
+    should be added to it by hand where a new database needs them.
+
+    .. versionadded:: 0.8.0
+
+    """
+
+    script_directory = ScriptDirectory.from_config(config)
+
+    if ":" in revision:
+        starting_rev, revision = revision.split(':', 2)
+        if starting_rev != "base":
+            raise util.CommandError(
+                "Squashed revisions must start from base")
+
+    target = script_directory.get_revision(revision)
+    if target is None:
+        raise util.CommandError("Can't squash to the base revision")
+
+    command_args = dict(
+        message=message, autogenerate=False, sql=False,
+        head="base", splice=False, branch_label=None,
+        version_path=None, rev_id=rev_id, squashes=target.revision
+    )
+    revision_context = autogen.RevisionContext(
+        config, script_directory, command_args)
+
+    def retrieve_migrations(rev, context):
+        revision_context.run_squash(rev, context)
+        return []
+
+    with EnvironmentContext(
+        config,
+        script_directory,
+        fn=retrieve_migrations,
+        template_args=revision_context.template_args,
+        revision_context=revision_context
+    ):
+        script_directory.run_env()
+
+    scripts = [
+        script for script in
+        revision_context.generate_scripts()
+    ]
+    if len(scripts) == 1:
+        return scripts[0]
+    else:
+        return scripts
+
+
 def upgrade(config, revision, sql=False, tag=None):
     """Upgrade to a later version."""
 
@@ -328,6 +395,105 @@ def current(config, verbose=False, head_only=False):
         script.run_env()
 
 
+def bundle(config, output=None):
+    """Pack all revision files into a single revision bundle."""
+
+    script = ScriptDirectory.from_config(config)
+    if output is None:
+        output = script.revision_bundle
+    if output is None:
+        raise util.CommandError(
+            "No output file specified; please pass --output or set "
+            "the 'revision_bundle' configuration option")
+
+    scripts = util.status(
+        "Writing revision bundle %s" % os.path.abspath(output),
+        script._write_bundle, output)
+    config.print_stdout("Bundled %d revision(s)", len(scripts))
+
+
+def snapshot(config, path):
+    """Write the reflected schema of the database to a snapshot file,
+    for use with the 'schema_snapshot' option."""
+
+    script = ScriptDirectory.from_config(config)
+
+    def write_snapshot(rev, context):
+        snapshot = util.status(
+            "Writing schema snapshot %s" % os.path.abspath(path),
+            autogen.write_snapshot, context, path)
+        config.print_stdout(
+            "Stored %d table(s)",
+            sum(len(schema['tables']) for schema in snapshot['schemas']))
+        return []
+
+    with EnvironmentContext(
+        config,
+        script,
+        fn=write_snapshot
+    ):
+        script.run_env()
+
+
+def check(config, fingerprint=False, stamp=False):
+    """Check that the database matches the target metadata."""
+
+    script = ScriptDirectory.from_config(config)
+    fingerprints_path = os.path.join(script.dir, "schema_fingerprints.json")
+
+    def check_database(rev, context):
+        heads = " ".join(sorted(rev))
+        dialect_name = context.dialect.name
+
+        if fingerprint or stamp:
+            current = autogen.schema_fingerprint(context)
+            fingerprints = autogen.fingerprint._read_fingerprints(
+                fingerprints_path)
+
+            if stamp:
+                if not heads:
+                    raise util.CommandError(
+                        "Database has no current revision to record "
+                        "a schema fingerprint for")
+                fingerprints.setdefault(heads, {})[dialect_name] = current
+                autogen.fingerprint._write_fingerprints(
+                    fingerprints_path, fingerprints)
+                config.print_stdout(
+                    "Recorded schema fingerprint %s for revision %s",
+                    current, heads)
+                return []
+
+            expected = fingerprints.get(heads, {}).get(dialect_name)
+            if expected == current:
+                config.print_stdout(
+                    "Schema fingerprint matches revision %s", heads)
+                return []
+            elif expected is None:
+                config.print_stdout(
+                    "No schema fingerprint recorded for revision %s; "
+                    "comparing to the target metadata", heads or "base")
+            else:
+                config.print_stdout(
+                    "Schema fingerprint differs from revision %s; "
+                    "comparing to the target metadata", heads)
+
+        diffs = autogen.compare_metadata(
+            context, context.opts['target_metadata'])
+        if diffs:
+            raise util.CommandError(
+                "Database doesn't match the target metadata:\n%s" %
+                "\n".join("  %r" % (diff, ) for diff in diffs))
+        config.print_stdout("No differences detected")
+        return []
+
+    with EnvironmentContext(
+        config,
+        script,
+        fn=check_database
+    ):
+        script.run_env()
+
+
 def stamp(config, revision, sql=False, tag=None):
     """'stamp' the revision table with the given revision; don't
     run any migrations."""
@@ -345,6 +345,28 @@ class CommandLine(object):
                         help="Deprecated.  Use --verbose for "
                         "additional output")
                 ),
+                'output': (
+                    "-o", "--output",
+                    dict(
+                        type=str,
+                        help="Specify the output file for 'bundle'; "
+                        "defaults to the 'revision_bundle' option")
+                ),
+                'fingerprint': (
+                    "--fingerprint",
+                    dict(
+                        action="store_true",
+                        help="Compare a fingerprint of the database "
+                        "schema to the one recorded for its revision "
+                        "before comparing in detail")
+                ),
+                'stamp': (
+                    "--stamp",
+                    dict(
+                        action="store_true",
+                        help="Record the fingerprint of the database "
+                        "schema for its current revision")
+                ),
                 'rev_range': (
                     "-r", "--rev-range",
                     dict(
@@ -356,7 +378,8 @@ class CommandLine(object):
             positional_help = {
                 'directory': "location of scripts directory",
                 'revision': "revision identifier",
-                'revisions': "one or more revisions, or 'heads' for all heads"
+                'revisions': "one or more revisions, or 'heads' for all heads",
+                'path': "location of the schema snapshot file"
 
             }
             for arg in kwargs:
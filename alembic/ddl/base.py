@@ -94,6 +94,28 @@ class DropColumn(AlterTable):
         self.column = column
 
 
+class CombinedAlterTable(AlterTable):
+    """Represent several :class:`.AlterTable` constructs against one
+    table, rendered as the comma-separated clauses of a single
+    ALTER TABLE statement."""
+
+    def __init__(self, elements):
+        super(CombinedAlterTable, self).__init__(
+            elements[0].table_name, schema=elements[0].schema)
+        self.elements = elements
+
+
+@compiles(CombinedAlterTable)
+def visit_combined_alter_table(element, compiler, **kw):
+    prefix = alter_table(compiler, element.table_name, element.schema)
+    clauses = []
+    for elem in element.elements:
+        text = compiler.process(elem, **kw)
+        assert text.startswith(prefix)
+        clauses.append(text[len(prefix):].strip())
+    return "%s %s" % (prefix, ", ".join(clauses))
+
+
 @compiles(RenameTable)
 def visit_rename_table(element, compiler, **kw):
     return "%s RENAME TO %s" % (
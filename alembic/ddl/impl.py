@@ -1,4 +1,8 @@
+from contextlib import contextmanager
+from itertools import groupby, islice
+
 from sqlalchemy import schema, text
+from sqlalchemy.sql.expression import ClauseElement
 from sqlalchemy import types as sqltypes
 
 from ..util.compat import (
@@ -38,6 +42,21 @@ class DefaultImpl(with_metaclass(ImplMeta)):
     transactional_ddl = False
     command_terminator = ";"
 
+    grouped_alter_constructs = ()
+    """:class:`.AlterTable` constructs which the database accepts as
+    clauses of a single ALTER TABLE statement; used by
+    :meth:`.DefaultImpl.group_alters`."""
+
+    concurrent_index_builds = False
+    """Whether indexes held back by the ``defer_index_builds`` option may
+    be built concurrently on separate connections."""
+
+    offline_bulk_insert_chunk_size = 1000
+    """Number of rows rendered per statement by the ``offline_bulk_insert``
+    option, when the rows aren't otherwise chunked."""
+
+    _alter_group = None
+
     def __init__(self, dialect, connection, as_sql,
                  transactional_ddl, output_buffer,
                  context_opts):
@@ -60,6 +79,13 @@ class DefaultImpl(with_metaclass(ImplMeta)):
                 raise util.CommandError(
                     "Can't use literal_binds setting without as_sql mode")
 
+        self.offline_bulk_insert = context_opts.get(
+            'offline_bulk_insert', 'row')
+        if self.offline_bulk_insert not in ('row', 'values', 'copy'):
+            raise util.CommandError(
+                "offline_bulk_insert should be one of "
+                "'row', 'values' or 'copy'")
+
     @classmethod
     def get_by_dialect(cls, dialect):
         return _impls[dialect.name]
@@ -92,9 +118,51 @@ class DefaultImpl(with_metaclass(ImplMeta)):
     def bind(self):
         return self.connection
 
+    @contextmanager
+    def group_alters(self):
+        """Within the block, combine consecutive ALTER TABLE constructs
+        against the same table into a single statement, where
+        :attr:`.grouped_alter_constructs` allows.
+
+        Other statements are emitted in their original order, after the
+        group collected so far.
+
+        """
+        self._alter_group = []
+        try:
+            yield
+            self._flush_alter_group()
+        finally:
+            self._alter_group = None
+
+    def _groups_with(self, group, construct):
+        return (group[0].table_name, group[0].schema) == \
+            (construct.table_name, construct.schema)
+
+    def _flush_alter_group(self):
+        group = self._alter_group
+        self._alter_group = None
+        try:
+            if len(group) == 1:
+                self._exec(group[0])
+            elif group:
+                self._exec(base.CombinedAlterTable(group))
+        finally:
+            self._alter_group = []
+
     def _exec(self, construct, execution_options=None,
               multiparams=(),
               params=util.immutabledict()):
+        if self._alter_group is not None:
+            if isinstance(construct, self.grouped_alter_constructs) and \
+                    not execution_options:
+                if self._alter_group and \
+                        not self._groups_with(self._alter_group, construct):
+                    self._flush_alter_group()
+                self._alter_group.append(construct)
+                return
+            self._flush_alter_group()
+
         if isinstance(construct, string_types):
             construct = text(construct)
         if self.as_sql:
@@ -208,12 +276,29 @@ class DefaultImpl(with_metaclass(ImplMeta)):
     def drop_index(self, index):
         self._exec(schema.DropIndex(index))
 
-    def bulk_insert(self, table, rows, multiinsert=True):
-        if not isinstance(rows, list):
-            raise TypeError("List expected")
-        elif rows and not isinstance(rows[0], dict):
-            raise TypeError("List of dictionaries expected")
-        if self.as_sql:
+    def bulk_insert(
+            self, table, rows, multiinsert=True, chunk_size=None,
+            progress=None):
+        if isinstance(rows, dict) or not hasattr(rows, '__iter__'):
+            raise TypeError("List or other iterable expected")
+        if chunk_size is None and self.as_sql and \
+                self.offline_bulk_insert != 'row':
+            # each chunk is rendered as a single statement
+            chunk_size = self.offline_bulk_insert_chunk_size
+        count = 0
+        for chunk in _chunks(rows, chunk_size):
+            if not isinstance(chunk[0], dict):
+                raise TypeError("List of dictionaries expected")
+            self._bulk_insert_chunk(table, chunk, multiinsert)
+            count += len(chunk)
+            if progress is not None:
+                progress(count)
+
+    def _bulk_insert_chunk(self, table, rows, multiinsert):
+        if self.as_sql and self.offline_bulk_insert != 'row' and \
+                self.dialect.supports_multivalues_insert:
+            self._render_bulk_insert(table, rows)
+        elif self.as_sql:
             for row in rows:
                 self._exec(table.insert(inline=True).values(**dict(
                     (k,
@@ -227,12 +312,34 @@ class DefaultImpl(with_metaclass(ImplMeta)):
             # work around http://www.sqlalchemy.org/trac/ticket/2461
             if not hasattr(table, '_autoincrement_column'):
                 table._autoincrement_column = None
-            if rows:
-                if multiinsert:
-                    self._exec(table.insert(inline=True), multiparams=rows)
-                else:
-                    for row in rows:
-                        self._exec(table.insert(inline=True).values(**row))
+            if multiinsert:
+                self._exec(table.insert(inline=True), multiparams=rows)
+            else:
+                for row in rows:
+                    self._exec(table.insert(inline=True).values(**row))
+
+    def _render_bulk_insert(self, table, rows):
+        """Render the given rows as multiple row INSERT statements, for the
+        ``offline_bulk_insert`` option.
+
+        The literal values of each row are rendered directly by a single
+        compiler, rather than compiling an INSERT statement per row.
+
+        """
+        preparer = self.dialect.identifier_preparer
+        compiler = self.dialect.statement_compiler(self.dialect, None)
+        for keys, group in _bulk_insert_groups(table, rows):
+            columns = [table.c[key] for key in keys]
+            self.static_output(
+                "INSERT INTO %s (%s) VALUES %s%s" % (
+                    preparer.format_table(table),
+                    ", ".join(preparer.format_column(col) for col in columns),
+                    ", ".join(
+                        "(%s)" % ", ".join(
+                            _render_literal(compiler, row[col.key], col.type)
+                            for col in columns)
+                        for row in group),
+                    self.command_terminator))
 
     def compare_type(self, inspector_column, metadata_column):
 
@@ -266,11 +373,42 @@ class DefaultImpl(with_metaclass(ImplMeta)):
                                rendered_inspector_default):
         return rendered_inspector_default != rendered_metadata_default
 
+    def compare_server_defaults(self, comparisons):
+        """Compare a series of server defaults at once.
+
+        ``comparisons`` is a list of tuples, each consisting of the
+        arguments passed to :meth:`.DefaultImpl.compare_server_default`;
+        a list of the results of that method is returned, in the same
+        order.   Dialects which need to compare defaults using the
+        database can override this to do so in fewer round trips.
+
+        """
+        return [
+            self.compare_server_default(*comparison)
+            for comparison in comparisons
+        ]
+
     def correct_for_autogen_constraints(self, conn_uniques, conn_indexes,
                                         metadata_unique_constraints,
                                         metadata_indexes):
         pass
 
+    def autogen_reflect_tables(self, inspector, schema, table_names):
+        """A hook called during the autogenerate process to retrieve
+        reflection information for many tables of a schema at once.
+
+        Returns a dictionary keyed on table name, where each value is a
+        dictionary with any of the keys ``table_options``, ``columns``,
+        ``pk_constraint``, ``foreign_keys``, ``indexes`` and
+        ``unique_constraints``, each
+        holding what the corresponding ``get_<key>()`` method of the
+        dialect would return for that table.  Anything not present is
+        reflected table by table.  ``None`` indicates that the dialect
+        doesn't provide bulk reflection.
+
+        """
+        return None
+
     def _compat_autogen_column_reflect(self, inspector):
         if util.sqla_08:
             return self.autogen_column_reflect
@@ -338,3 +476,39 @@ _type_comparators = {
     sqltypes.String: _string_compare,
     sqltypes.Numeric: _numeric_compare
 }
+
+
+def _chunks(rows, chunk_size):
+    """Consume the given iterable in lists of up to ``chunk_size``
+    elements, or in one list if ``chunk_size`` is None."""
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _bulk_insert_groups(table, rows):
+    """Group consecutive rows by the table columns they have values for,
+    yielding the keys of those columns in table order along with each
+    group of rows."""
+
+    positions = dict((col.key, idx) for idx, col in enumerate(table.c))
+
+    def keys(row):
+        return tuple(sorted(row, key=lambda key: positions[key]))
+
+    return groupby(rows, keys)
+
+
+def _render_literal(compiler, value, type_):
+    if value is None:
+        return "NULL"
+    elif isinstance(value, sqla_compat._literal_bindparam):
+        return compiler.render_literal_bindparam(value)
+    elif isinstance(value, ClauseElement):
+        return compiler.process(value, literal_binds=True)
+    else:
+        return compiler.render_literal_value(value, type_)
@@ -6,7 +6,7 @@ from ..util.compat import string_types
 from .. import util
 from .impl import DefaultImpl
 from .base import ColumnNullable, ColumnName, ColumnDefault, \
-    ColumnType, AlterColumn, format_column_name, \
+    ColumnType, AlterColumn, AddColumn, DropColumn, format_column_name, \
     format_server_default
 from .base import alter_table
 from ..autogenerate import compare
@@ -17,6 +17,22 @@ class MySQLImpl(DefaultImpl):
 
     transactional_ddl = False
 
+    concurrent_index_builds = True
+
+    @util.memoized_property
+    def grouped_alter_constructs(self):
+        return (
+            MySQLChangeColumn, MySQLAlterDefault, AddColumn, DropColumn)
+
+    def _groups_with(self, group, construct):
+        if not super(MySQLImpl, self)._groups_with(group, construct):
+            return False
+        # each column may only be named once within the statement
+        names = set()
+        for elem in group:
+            names.update(_column_names(elem))
+        return not names.intersection(_column_names(construct))
+
     def alter_column(self, table_name, column_name,
                      nullable=None,
                      server_default=False,
@@ -159,6 +175,18 @@ class MySQLImpl(DefaultImpl):
                 conn_indexes.discard(conn_ix_names[overlap])
 
 
+def _column_names(construct):
+    if isinstance(construct, AlterColumn):
+        names = set([construct.column_name])
+        if getattr(construct, 'newname', None) is not None:
+            names.add(construct.newname)
+        return names
+    elif isinstance(construct, (AddColumn, DropColumn)):
+        return set([construct.column.name])
+    else:
+        return set()
+
+
 class MySQLAlterDefault(AlterColumn):
 
     def __init__(self, name, column_name, default, schema=None):
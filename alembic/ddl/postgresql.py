@@ -1,11 +1,16 @@
+import collections
+import numbers
 import re
 
 from ..util import compat
 from .. import util
-from .base import compiles, alter_table, format_table_name, RenameTable
-from .impl import DefaultImpl
+from .base import compiles, alter_table, format_table_name, RenameTable, \
+    ColumnNullable, ColumnDefault, ColumnType, AddColumn, DropColumn
+from .impl import DefaultImpl, _bulk_insert_groups
 from sqlalchemy.dialects.postgresql import INTEGER, BIGINT
-from sqlalchemy import text, Numeric, Column
+from sqlalchemy import text, bindparam, Numeric, Column, Unicode
+from sqlalchemy import exc as sqla_exc
+from sqlalchemy import types as sqltypes
 
 if compat.sqla_08:
     from sqlalchemy.sql.expression import UnaryExpression
@@ -16,20 +21,104 @@ import logging
 
 log = logging.getLogger(__name__)
 
+# mirrors the parsing of pg_get_constraintdef() within
+# PGDialect.get_foreign_keys()
+_fk_regex = re.compile(
+    r'FOREIGN KEY \((.*?)\) REFERENCES (?:(.*?)\.)?(.*?)\((.*?)\)'
+    r'[\s]?(MATCH (FULL|PARTIAL|SIMPLE)+)?'
+    r'[\s]?(ON UPDATE '
+    r'(CASCADE|RESTRICT|NO ACTION|SET NULL|SET DEFAULT)+)?'
+    r'[\s]?(ON DELETE '
+    r'(CASCADE|RESTRICT|NO ACTION|SET NULL|SET DEFAULT)+)?'
+    r'[\s]?(DEFERRABLE|NOT DEFERRABLE)?'
+    r'[\s]?(INITIALLY (DEFERRED|IMMEDIATE)+)?'
+)
+
 
 class PostgresqlImpl(DefaultImpl):
     __dialect__ = 'postgresql'
     transactional_ddl = True
 
+    grouped_alter_constructs = (
+        ColumnNullable, ColumnDefault, ColumnType, AddColumn, DropColumn)
+
+    concurrent_index_builds = True
+
+    def _render_bulk_insert(self, table, rows):
+        if self.offline_bulk_insert != 'copy':
+            super(PostgresqlImpl, self)._render_bulk_insert(table, rows)
+            return
+
+        preparer = self.dialect.identifier_preparer
+        for keys, group in _bulk_insert_groups(table, rows):
+            group = list(group)
+            if not all(
+                    _copy_compatible(table.c[key].type, row[key])
+                    for row in group for key in keys):
+                # e.g. inline_literal(), SQL expressions, or types
+                # whose values are processed before they're rendered
+                super(PostgresqlImpl, self)._render_bulk_insert(
+                    table, group)
+                continue
+            self.static_output(
+                "COPY %s (%s) FROM stdin%s\n%s\n\\." % (
+                    preparer.format_table(table),
+                    ", ".join(
+                        preparer.format_column(table.c[key])
+                        for key in keys),
+                    self.command_terminator,
+                    "\n".join(
+                        "\t".join(_copy_value(row[key]) for key in keys)
+                        for row in group)))
+
     def prep_table_for_batch(self, table):
         for constraint in table.constraints:
             if constraint.name is not None:
                 self.drop_constraint(constraint)
 
+    # number of default comparisons evaluated within a single SELECT;
+    # well under the limit of 1664 entries in a target list
+    default_compare_chunk_size = 500
+
+    _sequence_owner_inspector = None
+
     def compare_server_default(self, inspector_column,
                                metadata_column,
                                rendered_metadata_default,
                                rendered_inspector_default):
+        result = self._server_default_comparison(
+            inspector_column, metadata_column,
+            rendered_metadata_default, rendered_inspector_default)
+        if isinstance(result, tuple):
+            return not self._evaluate_default_comparisons([result])[0]
+        return result
+
+    def compare_server_defaults(self, comparisons):
+        results = []
+        to_evaluate = []
+        for comparison in comparisons:
+            result = self._server_default_comparison(*comparison)
+            if isinstance(result, tuple):
+                to_evaluate.append((len(results), result))
+            results.append(result)
+
+        chunk_size = self.default_compare_chunk_size
+        for start in range(0, len(to_evaluate), chunk_size):
+            chunk = to_evaluate[start:start + chunk_size]
+            equal = self._evaluate_default_comparisons(
+                [exprs for idx, exprs in chunk])
+            for (idx, exprs), value in zip(chunk, equal):
+                results[idx] = not value
+        return results
+
+    def _server_default_comparison(self, inspector_column,
+                                   metadata_column,
+                                   rendered_metadata_default,
+                                   rendered_inspector_default):
+        """Return the result of a server default comparison if it can
+        be determined without the database, else the pair of SQL
+        expressions to be compared."""
+
         # don't do defaults for SERIAL columns
         if metadata_column.primary_key and \
                 metadata_column is metadata_column.table._autoincrement_column:
@@ -49,12 +138,40 @@ class PostgresqlImpl(DefaultImpl):
                 # otherwise a comparison such as SELECT 5 = '5.0' will fail
             rendered_metadata_default = "'%s'" % rendered_metadata_default
 
-        return not self.connection.scalar(
-            "SELECT %s = %s" % (
-                conn_col_default,
-                rendered_metadata_default
-            )
-        )
+        return conn_col_default, rendered_metadata_default
+
+    def _evaluate_default_comparisons(self, exprs):
+        if self.as_sql:
+            # comparing against a schema snapshot, with no database
+            # to evaluate the expressions; compare them as rendered,
+            # less the casts Postgresql adds to reflected defaults
+            return [
+                re.sub(r"(::[\w ]+(\[\])*)+$", "", conn_default) ==
+                metadata_default
+                for conn_default, metadata_default in exprs
+            ]
+
+        if len(exprs) > 1:
+            # a failing expression aborts the enclosing transaction,
+            # so the combined SELECT runs within a SAVEPOINT; upon
+            # failure each comparison is run on its own so that the
+            # error is raised for the offending expression only
+            trans = self.connection.begin_nested()
+            try:
+                row = self.connection.execute(
+                    "SELECT %s" % ", ".join(
+                        "(%s = %s)" % pair for pair in exprs)
+                ).first()
+            except sqla_exc.DBAPIError:
+                trans.rollback()
+            else:
+                trans.commit()
+                return list(row)
+
+        return [
+            self.connection.scalar("SELECT %s = %s" % pair)
+            for pair in exprs
+        ]
 
     def autogen_column_reflect(self, inspector, table, column_info):
         if column_info.get('default') and \
@@ -63,28 +180,304 @@ class PostgresqlImpl(DefaultImpl):
                 r"nextval\('(.+?)'::regclass\)",
                 column_info['default'])
             if seq_match:
-                info = inspector.bind.execute(text(
-                    "select c.relname, a.attname "
-                    "from pg_class as c join pg_depend d on d.objid=c.oid and "
-                    "d.classid='pg_class'::regclass and "
-                    "d.refclassid='pg_class'::regclass "
-                    "join pg_class t on t.oid=d.refobjid "
-                    "join pg_attribute a on a.attrelid=t.oid and "
-                    "a.attnum=d.refobjsubid "
-                    "where c.relkind='S' and c.relname=:seqname"
-                ), seqname=seq_match.group(1)).first()
-                if info:
-                    seqname, colname = info
-                    if colname == column_info['name']:
-                        log.info(
-                            "Detected sequence named '%s' as "
-                            "owned by integer column '%s(%s)', "
-                            "assuming SERIAL and omitting" % (
-                                seqname, table.name, colname
-                            ))
-                        # sequence, and the owner is this column,
-                        # its a SERIAL - whack it!
-                        del column_info['default']
+                seqname = seq_match.group(1)
+                if "." in seqname:
+                    schema, seqname = seqname.split(".", 1)
+                    schema = schema.strip('"')
+                else:
+                    schema = table.schema
+                seqname = seqname.strip('"')
+                owners = self._sequence_owners(
+                    inspector, schema or inspector.default_schema_name)
+                colname = owners.get(seqname)
+                if colname == column_info['name']:
+                    log.info(
+                        "Detected sequence named '%s' as "
+                        "owned by integer column '%s(%s)', "
+                        "assuming SERIAL and omitting" % (
+                            seqname, table.name, colname
+                        ))
+                    # sequence, and the owner is this column,
+                    # its a SERIAL - whack it!
+                    del column_info['default']
+
+    def _sequence_owners(self, inspector, schema_name):
+        """Return a dictionary of sequence name to owning column name
+        for the sequences of the given schema.
+
+        The sequences of a schema are loaded with one query and kept for
+        as long as the same inspector, i.e. the same autogenerate run,
+        is in use.
+
+        """
+        if self._sequence_owner_inspector is not inspector:
+            self._sequence_owner_inspector = inspector
+            self._sequence_owner_cache = {}
+
+        cache = self._sequence_owner_cache
+        if schema_name not in cache:
+            rows = inspector.bind.execute(text(
+                "select c.relname, a.attname "
+                "from pg_class as c join pg_depend d on d.objid=c.oid and "
+                "d.classid='pg_class'::regclass and "
+                "d.refclassid='pg_class'::regclass "
+                "join pg_namespace n on n.oid=c.relnamespace "
+                "join pg_class t on t.oid=d.refobjid "
+                "join pg_attribute a on a.attrelid=t.oid and "
+                "a.attnum=d.refobjsubid "
+                "where c.relkind='S' and n.nspname=:schema"
+            ), schema=schema_name)
+            cache[schema_name] = dict(
+                (seqname, colname) for seqname, colname in rows)
+        return cache[schema_name]
+
+    def autogen_reflect_tables(self, inspector, schema, table_names):
+        # the per-table reflection methods of PGDialect each run one or
+        # more queries against the table's oid; here the same catalog
+        # queries are run once for the whole schema.  The results are
+        # processed as PGDialect does, for the SQLAlchemy 1.0 series.
+        if not util.sqla_100 or inspector.dialect.server_version_info < \
+                (8, 5) or not _pg_dialect_compatible(inspector.dialect):
+            return None
+
+        schema_name = schema or inspector.dialect.default_schema_name
+        reflected = dict((tname, {}) for tname in table_names)
+
+        try:
+            attnames = self._reflect_columns(
+                inspector, schema, schema_name, reflected)
+        except TypeError as err:
+            # the private PGDialect methods used have changed
+            log.warning(
+                "Bulk reflection isn't available with this version of "
+                "SQLAlchemy, reflecting table by table: %s", err)
+            return None
+        self._reflect_constraints(
+            inspector, schema_name, reflected, attnames)
+        self._reflect_foreign_keys(
+            inspector, schema, schema_name, reflected)
+        self._reflect_indexes(inspector, schema_name, reflected)
+        return reflected
+
+    def _reflect_columns(self, inspector, schema, schema_name, reflected):
+        dialect = inspector.dialect
+        rows = inspector.bind.execute(
+            text(
+                "SELECT c.relname, a.attname, "
+                "pg_catalog.format_type(a.atttypid, a.atttypmod), "
+                "(SELECT pg_catalog.pg_get_expr(d.adbin, d.adrelid) "
+                "FROM pg_catalog.pg_attrdef d "
+                "WHERE d.adrelid = a.attrelid AND d.adnum = a.attnum "
+                "AND a.atthasdef) AS default, "
+                "a.attnotnull, a.attnum "
+                "FROM pg_catalog.pg_attribute a "
+                "JOIN pg_catalog.pg_class c ON c.oid = a.attrelid "
+                "JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace "
+                "WHERE n.nspname = :schema "
+                "AND c.relkind IN ('r', 'v', 'm', 'f') "
+                "AND a.attnum > 0 AND NOT a.attisdropped "
+                "ORDER BY c.relname, a.attnum"
+            ).bindparams(bindparam('schema', type_=Unicode)).columns(
+                relname=Unicode, attname=Unicode, default=Unicode),
+            schema=schema_name
+        ).fetchall()
+
+        domains = dialect._load_domains(inspector.bind)
+        enums = dict(
+            (
+                "%s.%s" % (rec['schema'], rec['name'])
+                if not rec['visible'] else rec['name'], rec) for rec in
+            dialect._load_enums(inspector.bind, schema='*')
+        )
+
+        attnames = collections.defaultdict(dict)
+        for relname, name, format_type, default, notnull, attnum in rows:
+            if relname not in reflected:
+                continue
+            attnames[relname][attnum] = name
+            reflected[relname].setdefault('columns', []).append(
+                dialect._get_column_info(
+                    name, format_type, default, notnull,
+                    domains, enums, schema)
+            )
+        return attnames
+
+    def _reflect_constraints(
+            self, inspector, schema_name, reflected, attnames):
+        rows = inspector.bind.execute(
+            text(
+                "SELECT c.relname, r.conname, r.contype, r.conkey "
+                "FROM pg_catalog.pg_constraint r "
+                "JOIN pg_catalog.pg_class c ON c.oid = r.conrelid "
+                "JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace "
+                "WHERE n.nspname = :schema AND r.contype IN ('p', 'u') "
+                "ORDER BY c.relname, r.conname"
+            ).bindparams(bindparam('schema', type_=Unicode)).columns(
+                relname=Unicode, conname=Unicode),
+            schema=schema_name
+        ).fetchall()
+
+        for table_info in reflected.values():
+            table_info['pk_constraint'] = {
+                'constrained_columns': [], 'name': None}
+            table_info['unique_constraints'] = []
+
+        for relname, conname, contype, conkey in rows:
+            if relname not in reflected:
+                continue
+            column_names = [attnames[relname][attnum] for attnum in conkey]
+            if contype == 'p':
+                reflected[relname]['pk_constraint'] = {
+                    'constrained_columns': column_names, 'name': conname}
+            else:
+                reflected[relname]['unique_constraints'].append(
+                    {'name': conname, 'column_names': column_names})
+
+    def _reflect_foreign_keys(self, inspector, schema, schema_name, reflected):
+        preparer = inspector.dialect.identifier_preparer
+        rows = inspector.bind.execute(
+            text(
+                "SELECT c.relname, r.conname, "
+                "pg_catalog.pg_get_constraintdef(r.oid, true) AS condef, "
+                "rn.nspname AS conschema "
+                "FROM pg_catalog.pg_constraint r "
+                "JOIN pg_catalog.pg_class c ON c.oid = r.conrelid "
+                "JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace "
+                "JOIN pg_catalog.pg_class rc ON rc.oid = r.confrelid "
+                "JOIN pg_catalog.pg_namespace rn "
+                "ON rn.oid = rc.relnamespace "
+                "WHERE n.nspname = :schema AND r.contype = 'f' "
+                "ORDER BY c.relname, r.conname"
+            ).bindparams(bindparam('schema', type_=Unicode)).columns(
+                relname=Unicode, conname=Unicode, condef=Unicode),
+            schema=schema_name
+        ).fetchall()
+
+        for table_info in reflected.values():
+            table_info['foreign_keys'] = []
+
+        for relname, conname, condef, conschema in rows:
+            if relname not in reflected:
+                continue
+            constrained_columns, referred_schema, \
+                referred_table, referred_columns, \
+                _, match, _, onupdate, _, ondelete, \
+                deferrable, _, initially = _fk_regex.search(condef).groups()
+
+            if deferrable is not None:
+                deferrable = deferrable == 'DEFERRABLE'
+            if referred_schema:
+                referred_schema = \
+                    preparer._unquote_identifier(referred_schema)
+            elif schema is not None and schema == conschema:
+                referred_schema = schema
+
+            reflected[relname]['foreign_keys'].append({
+                'name': conname,
+                'constrained_columns': [
+                    preparer._unquote_identifier(x)
+                    for x in re.split(r'\s*,\s*', constrained_columns)],
+                'referred_schema': referred_schema,
+                'referred_table': preparer._unquote_identifier(
+                    referred_table),
+                'referred_columns': [
+                    preparer._unquote_identifier(x)
+                    for x in re.split(r'\s*,\s', referred_columns)],
+                'options': {
+                    'onupdate': onupdate,
+                    'ondelete': ondelete,
+                    'deferrable': deferrable,
+                    'initially': initially,
+                    'match': match
+                }
+            })
+
+    def _reflect_indexes(self, inspector, schema_name, reflected):
+        rows = inspector.bind.execute(
+            text(
+                "SELECT t.relname AS table_name, i.relname AS relname, "
+                "ix.indisunique, ix.indexprs, ix.indpred, "
+                "a.attname, a.attnum, c.conrelid, ix.indkey::varchar, "
+                "i.reloptions, am.amname "
+                "FROM pg_catalog.pg_class t "
+                "JOIN pg_catalog.pg_namespace n ON n.oid = t.relnamespace "
+                "JOIN pg_catalog.pg_index ix ON t.oid = ix.indrelid "
+                "JOIN pg_catalog.pg_class i ON i.oid = ix.indexrelid "
+                "LEFT OUTER JOIN pg_catalog.pg_attribute a "
+                "ON t.oid = a.attrelid AND a.attnum = ANY(ix.indkey) "
+                "LEFT OUTER JOIN pg_catalog.pg_constraint c "
+                "ON (ix.indrelid = c.conrelid AND "
+                "ix.indexrelid = c.conindid AND "
+                "c.contype IN ('p', 'u', 'x')) "
+                "LEFT OUTER JOIN pg_catalog.pg_am am ON i.relam = am.oid "
+                "WHERE n.nspname = :schema "
+                "AND t.relkind IN ('r', 'v', 'f', 'm') "
+                "AND ix.indisprimary = 'f' "
+                "ORDER BY t.relname, i.relname"
+            ).bindparams(bindparam('schema', type_=Unicode)).columns(
+                table_name=Unicode, relname=Unicode, attname=Unicode),
+            schema=schema_name
+        ).fetchall()
+
+        indexes = collections.defaultdict(collections.OrderedDict)
+        skipped = set()
+        for row in rows:
+            (table_name, idx_name, unique, expr, prd, col,
+             col_num, conrelid, idx_key, options, amname) = row
+            if table_name not in reflected:
+                continue
+
+            if expr:
+                if idx_name not in skipped:
+                    util.warn(
+                        "Skipped unsupported reflection of "
+                        "expression-based index %s" % idx_name)
+                    skipped.add(idx_name)
+                continue
+
+            if prd and idx_name not in skipped:
+                util.warn(
+                    "Predicate of partial index %s ignored during "
+                    "reflection" % idx_name)
+                skipped.add(idx_name)
+
+            index = indexes[table_name].get(idx_name)
+            if index is None:
+                index = indexes[table_name][idx_name] = {
+                    'cols': {},
+                    'key': [int(k.strip()) for k in idx_key.split()],
+                    'unique': unique
+                }
+                if conrelid is not None:
+                    index['duplicates_constraint'] = idx_name
+                if options:
+                    index['options'] = dict(
+                        [option.split("=") for option in options])
+                if amname and amname != 'btree':
+                    index['amname'] = amname
+            if col is not None:
+                index['cols'][col_num] = col
+
+        for table_name, table_info in reflected.items():
+            result = table_info['indexes'] = []
+            for name, idx in indexes[table_name].items():
+                entry = {
+                    'name': name,
+                    'unique': idx['unique'],
+                    'column_names': [idx['cols'][i] for i in idx['key']]
+                }
+                if 'duplicates_constraint' in idx:
+                    entry['duplicates_constraint'] = \
+                        idx['duplicates_constraint']
+                if 'options' in idx:
+                    entry.setdefault(
+                        'dialect_options', {}
+                    )["postgresql_with"] = idx['options']
+                if 'amname' in idx:
+                    entry.setdefault(
+                        'dialect_options', {}
+                    )["postgresql_using"] = idx['amname']
+                result.append(entry)
 
     def correct_for_autogen_constraints(self, conn_unique_constraints,
                                         conn_indexes,
@@ -121,6 +514,56 @@ class PostgresqlImpl(DefaultImpl):
                     metadata_indexes.discard(idx)
 
 
+def _pg_dialect_compatible(dialect):
+    """Return True if the private PGDialect methods used for bulk
+    reflection have the signatures of the SQLAlchemy 1.0 series."""
+
+    get_column_info = getattr(dialect, '_get_column_info', None)
+    load_enums = getattr(dialect, '_load_enums', None)
+    load_domains = getattr(dialect, '_load_domains', None)
+    if get_column_info is None or load_enums is None or \
+            load_domains is None:
+        return False
+    return compat.inspect_getargspec(get_column_info).args == [
+        'self', 'name', 'format_type', 'default', 'notnull',
+        'domains', 'enums', 'schema'] and \
+        compat.inspect_getargspec(load_enums).args == [
+            'self', 'connection', 'schema'] and \
+        compat.inspect_getargspec(load_domains).args == [
+            'self', 'connection']
+
+
+def _copy_compatible(type_, value):
+    """Return True if the given value of a column of the given type is
+    rendered the same way by COPY FROM as by str().
+
+    Only plain string and numeric types qualify; the values of other
+    types, such as TypeDecorator, Enum, binary and date types, are
+    rendered as VALUES instead.
+
+    """
+    if isinstance(type_, (sqltypes.TypeDecorator, sqltypes.Enum)):
+        return False
+    elif isinstance(type_, sqltypes.String):
+        return value is None or isinstance(
+            value, compat.string_types + (compat.text_type, ))
+    elif isinstance(type_, (sqltypes.Integer, sqltypes.Numeric)):
+        return value is None or (
+            isinstance(value, numbers.Number) and
+            not isinstance(value, bool))
+    else:
+        return False
+
+
+def _copy_value(value):
+    """Render a value in the text format of COPY FROM."""
+
+    if value is None:
+        return "\\N"
+    return compat.text_type(value).replace("\\", "\\\\").\
+        replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
 @compiles(RenameTable, "postgresql")
 def visit_rename_table(element, compiler, **kw):
     return "%s RENAME TO %s" % (
@@ -1,3 +1,5 @@
+from sqlalchemy.engine.reflection import Inspector
+
 from .. import util
 from .impl import DefaultImpl
 import re
@@ -11,21 +13,105 @@ class SQLiteImpl(DefaultImpl):
     see: http://bugs.python.org/issue10740
     """
 
+    _sqlite_version_info = None
+
     def requires_recreate_in_batch(self, batch_op):
         """Return True if the given :class:`.BatchOperationsImpl`
         would need the table to be recreated and copied in order to
         proceed.
 
         Normally, only returns True on SQLite when operations other
-        than add_column are present.
+        than add_column are present.  Column renames are also run in
+        place when the SQLite library in use is version 3.25 or greater,
+        as are drops of columns which aren't part of a key, index,
+        constraint, trigger or view when it's version 3.35 or greater.
 
         """
-        for op in batch_op.batch:
-            if op[0] not in ('add_column', 'create_index', 'drop_index'):
+        added = set()
+        renamed = {}
+        for opname, arg, kw in batch_op.batch:
+            if opname == 'add_column':
+                added.add(arg[1].name)
+            elif opname == 'create_index':
+                added.update(col.name for col in arg[0].columns)
+            elif opname == 'drop_index':
+                pass
+            elif opname == 'alter_column' and \
+                    self._native_rename_column(*arg, **kw):
+                renamed[kw['name']] = renamed.pop(arg[1], arg[1])
+            elif opname == 'drop_column' and \
+                    arg[1].name not in added and \
+                    self._native_drop_column(
+                        arg[0], renamed.get(arg[1].name, arg[1].name),
+                        kw.get('schema')):
+                pass
+            else:
                 return True
         else:
             return False
 
+    def _server_version_info(self):
+        if self.as_sql:
+            # the library which will run the script isn't known
+            return None
+        if self._sqlite_version_info is None:
+            self._sqlite_version_info = tuple(
+                int(token) for token in
+                self.connection.scalar("select sqlite_version()").split(".")
+            )
+        return self._sqlite_version_info
+
+    def _native_rename_column(self, table_name, column_name,
+                              name=None, nullable=None,
+                              server_default=False, type_=None,
+                              autoincrement=None, **kw):
+        if name is None or nullable is not None or \
+                server_default is not False or type_ is not None or \
+                autoincrement is not None:
+            return False
+        version = self._server_version_info()
+        return version is not None and version >= (3, 25)
+
+    def _native_drop_column(self, table_name, column_name, schema):
+        version = self._server_version_info()
+        if version is None or version < (3, 35):
+            return False
+
+        inspector = Inspector.from_engine(self.connection)
+        in_use = set(inspector.get_pk_constraint(
+            table_name, schema=schema)['constrained_columns'])
+        for idx in inspector.get_indexes(table_name, schema=schema):
+            in_use.update(idx['column_names'])
+        for uq in inspector.get_unique_constraints(
+                table_name, schema=schema):
+            in_use.update(uq['column_names'])
+        for fk in inspector.get_foreign_keys(table_name, schema=schema):
+            in_use.update(fk['constrained_columns'])
+        if column_name in in_use:
+            return False
+
+        # CHECK constraints, generated columns, partial indexes, triggers
+        # and views aren't reflected; look for them within the DDL
+        if schema:
+            master = "%s.sqlite_master" % \
+                self.dialect.identifier_preparer.quote_identifier(schema)
+        else:
+            master = "sqlite_master"
+        rows = self.connection.execute(
+            "SELECT type, name, sql FROM %s WHERE sql IS NOT NULL" % master)
+        column_token = re.compile(
+            r"\b%s\b" % re.escape(column_name), re.I)
+        for type_, name, sql in rows:
+            if type_ == 'table':
+                # any mention other than the column's own definition
+                if name == table_name and \
+                        len(column_token.findall(sql)) > 1:
+                    return False
+            elif type_ in ('index', 'trigger', 'view') and \
+                    column_token.search(sql):
+                return False
+        return True
+
     def add_constraint(self, const):
         # attempt to distinguish between an
         # auto-gen constraint and an explicit one
@@ -1,5 +1,7 @@
 from contextlib import contextmanager
 
+from sqlalchemy import Column, Constraint
+
 from .. import util
 from ..util import sqla_compat
 from . import batch
@@ -163,7 +165,7 @@ class Operations(util.ModuleClsProxy):
             self, table_name, schema=None, recreate="auto", copy_from=None,
             table_args=(), table_kwargs=util.immutabledict(),
             reflect_args=(), reflect_kwargs=util.immutabledict(),
-            naming_convention=None):
+            naming_convention=None, defer_indexes=False):
         """Invoke a series of per-table migrations in batch.
 
         Batch mode allows a series of operations specific to a table
@@ -281,6 +283,13 @@ class Operations(util.ModuleClsProxy):
 
          .. versionadded:: 0.7.1
 
+        :param defer_indexes: when the table is recreated, create the new
+         table without its indexes and build them once the data has been
+         copied and the new table renamed, rather than maintaining them
+         for every row copied.  The time taken by each step is logged.
+
+         .. versionadded:: 0.8.0
+
         .. note:: batch mode requires SQLAlchemy 0.8 or above.
 
         .. seealso::
@@ -291,7 +300,7 @@ class Operations(util.ModuleClsProxy):
         impl = batch.BatchOperationsImpl(
             self, table_name, schema, recreate,
             copy_from, table_args, table_kwargs, reflect_args,
-            reflect_kwargs, naming_convention)
+            reflect_kwargs, naming_convention, defer_indexes)
         batch_op = BatchOperations(self.migration_context, impl=impl)
         yield batch_op
         impl.flush()
@@ -313,8 +322,44 @@ class Operations(util.ModuleClsProxy):
         """
         fn = self._to_impl.dispatch(
             operation, self.migration_context.impl.__dialect__)
+        if self._record_operation(operation):
+            from .ops import CreateTableOp
+            if isinstance(operation, CreateTableOp):
+                # op.create_table() returns a Table as usual, such as
+                # for use with op.bulk_insert(); it's built from copies
+                # of the columns, which are created along with the
+                # operation later on
+                return CreateTableOp(
+                    operation.table_name,
+                    [elem.copy() for elem in operation.columns
+                     if isinstance(elem, (Column, Constraint))],
+                    schema=operation.schema, **operation.kw
+                ).to_table(self.migration_context)
+            return
+        self._batch_barrier(operation)
+        if self._index_barrier(operation):
+            return
         return fn(self, operation)
 
+    def _record_operation(self, operation):
+        return self.migration_context._record_operation(operation)
+
+    def _index_barrier(self, operation):
+        return self.migration_context._index_barrier(operation)
+
+    def _batch_barrier(self, operation):
+        table_name = getattr(operation, 'table_name', None)
+        if table_name is None:
+            # op.execute() and the like may refer to any table
+            self.migration_context._batch_barrier()
+        else:
+            schema = getattr(operation, 'schema', None)
+            table_keys = [(schema, table_name)]
+            new_table_name = getattr(operation, 'new_table_name', None)
+            if new_table_name is not None:
+                table_keys.append((schema, new_table_name))
+            self.migration_context._batch_barrier(table_keys)
+
     def f(self, name):
         """Indicate a string name that has already had a naming convention
         applied to it.
@@ -416,6 +461,8 @@ class Operations(util.ModuleClsProxy):
         In a SQL script context, this value is ``None``. [TODO: verify this]
 
         """
+        self.migration_context._flush_recorded_ops()
+        self.migration_context._batch_barrier()
         return self.migration_context.impl.bind
 
 
@@ -436,6 +483,17 @@ class BatchOperations(Operations):
 
     """
 
+    def _batch_barrier(self, operation):
+        # operations within the batch are collected by
+        # BatchOperationsImpl, rather than run
+        pass
+
+    def _record_operation(self, operation):
+        return False
+
+    def _index_barrier(self, operation):
+        return False
+
     def _noop(self, operation):
         raise NotImplementedError(
             "The %s method does not apply to a batch table alter operation."
@@ -1,3 +1,6 @@
+import logging
+import time
+
 from sqlalchemy import Table, MetaData, Index, select, Column, \
     ForeignKeyConstraint, cast
 from sqlalchemy import types as sqltypes
@@ -6,11 +9,14 @@ from sqlalchemy.util import OrderedDict
 from .. import util
 from ..util.sqla_compat import _columns_for_constraint, _is_type_bound
 
+log = logging.getLogger(__name__)
+
 
 class BatchOperationsImpl(object):
     def __init__(self, operations, table_name, schema, recreate,
                  copy_from, table_args, table_kwargs,
-                 reflect_args, reflect_kwargs, naming_convention):
+                 reflect_args, reflect_kwargs, naming_convention,
+                 defer_indexes=False):
         if not util.sqla_08:
             raise NotImplementedError(
                 "batch mode requires SQLAlchemy 0.8 or greater.")
@@ -27,6 +33,7 @@ class BatchOperationsImpl(object):
         self.reflect_args = reflect_args
         self.reflect_kwargs = reflect_kwargs
         self.naming_convention = naming_convention
+        self.defer_indexes = defer_indexes
         self.batch = []
 
     @property
@@ -45,36 +52,101 @@ class BatchOperationsImpl(object):
         else:
             return False
 
+    def _can_coalesce(self):
+        return self.recreate != 'never' and self.copy_from is None and \
+            not self.table_args and not self.reflect_args
+
+    def _renames_column(self):
+        return any(
+            opname == 'alter_column' and
+            kw.get('name') not in (None, arg[1])
+            for opname, arg, kw in self.batch
+        )
+
     def flush(self):
+        context = self.operations.migration_context
+        table_key = (self.schema, self.table_name)
+        context._flush_recorded_ops()
+        context._build_indexes(table_keys=[table_key])
+
+        pending = context._pending_batches.get(table_key)
+        if pending is not None:
+            if pending.accepts(self):
+                pending.add(self)
+                return
+            context._flush_batches(table_key)
+
         should_recreate = self._should_recreate()
 
         if not should_recreate:
-            for opname, arg, kw in self.batch:
-                fn = getattr(self.operations.impl, opname)
-                fn(*arg, **kw)
-        else:
-            if self.naming_convention:
-                m1 = MetaData(naming_convention=self.naming_convention)
+            if context._batch_tables:
+                context._batch_tables.pop(table_key, None)
+            if context.opts.get('combine_batch_alters'):
+                with self.impl.group_alters():
+                    self._run_in_place()
             else:
-                m1 = MetaData()
+                self._run_in_place()
+        elif context._coalesce_batch_recreates and self._can_coalesce():
+            context._pending_batches[table_key] = _PendingRecreate(self)
+        else:
+            self._recreate([self])
 
-            if self.copy_from is not None:
-                existing_table = self.copy_from
-            else:
+    def _run_in_place(self):
+        for opname, arg, kw in self.batch:
+            fn = getattr(self.operations.impl, opname)
+            fn(*arg, **kw)
+
+    def _recreate(self, batches):
+        if self.naming_convention:
+            m1 = MetaData(naming_convention=self.naming_convention)
+        else:
+            m1 = MetaData()
+
+        if self.copy_from is not None:
+            existing_table = self.copy_from
+        else:
+            existing_table = self._cached_table(m1)
+            if existing_table is None:
                 existing_table = Table(
                     self.table_name, m1,
                     schema=self.schema,
                     autoload=True,
-                    autoload_with=self.operations.get_bind(),
+                    autoload_with=self.impl.bind,
                     *self.reflect_args, **self.reflect_kwargs)
 
-            batch_impl = ApplyBatchImpl(
-                existing_table, self.table_args, self.table_kwargs)
-            for opname, arg, kw in self.batch:
+        batch_impl = ApplyBatchImpl(
+            existing_table, self.table_args, self.table_kwargs)
+        for batch_op in batches:
+            for opname, arg, kw in batch_op.batch:
                 fn = getattr(batch_impl, opname)
                 fn(*arg, **kw)
 
-            batch_impl._create(self.impl)
+        batch_impl._create(self.impl, defer_indexes=self.defer_indexes)
+        self._cache_table(batch_impl, batches)
+
+    def _cached_table(self, metadata):
+        tables = self.operations.migration_context._batch_tables
+        if not tables or self.reflect_args or self.reflect_kwargs:
+            return None
+        table = tables.get((self.schema, self.table_name))
+        if table is None:
+            return None
+        return table.tometadata(metadata)
+
+    def _cache_table(self, batch_impl, batches):
+        tables = self.operations.migration_context._batch_tables
+        if tables is None:
+            return
+        table_key = (self.schema, self.table_name)
+        if any(batch_op._renames_column() for batch_op in batches):
+            # renamed columns keep their original key within the new
+            # table, which ApplyBatchImpl doesn't expect of a reflected one
+            tables.pop(table_key, None)
+        else:
+            table = tables[table_key] = batch_impl.new_table.tometadata(
+                MetaData(), name=self.table_name)
+            if self.defer_indexes:
+                batch_impl._create_indexes(table)
 
     def alter_column(self, *arg, **kw):
         self.batch.append(("alter_column", arg, kw))
@@ -107,6 +179,35 @@ class BatchOperationsImpl(object):
         raise NotImplementedError("Can't drop table in batch mode")
 
 
+class _PendingRecreate(object):
+    """The batch operations against one table whose "move and copy" is
+    held back by the ``coalesce_batch_recreates`` option, so that they're
+    applied with a single copy of the table."""
+
+    def __init__(self, batch_op):
+        self.batches = []
+        self.closed = False
+        self.add(batch_op)
+
+    def accepts(self, batch_op):
+        first = self.batches[0]
+        return not self.closed and batch_op._can_coalesce() and \
+            batch_op.table_kwargs == first.table_kwargs and \
+            batch_op.reflect_kwargs == first.reflect_kwargs and \
+            batch_op.naming_convention == first.naming_convention and \
+            batch_op.defer_indexes == first.defer_indexes
+
+    def add(self, batch_op):
+        self.batches.append(batch_op)
+        # renamed columns keep their original key within ApplyBatchImpl,
+        # so later operations can't refer to them by their new name
+        if batch_op._renames_column():
+            self.closed = True
+
+    def apply(self):
+        self.batches[0]._recreate(self.batches)
+
+
 class ApplyBatchImpl(object):
     def __init__(self, table, table_args, table_kwargs):
         self.table = table  # this is a Table object
@@ -142,7 +243,7 @@ class ApplyBatchImpl(object):
         for k in self.table.kwargs:
             self.table_kwargs.setdefault(k, self.table.kwargs[k])
 
-    def _transfer_elements_to_new_table(self):
+    def _transfer_elements_to_new_table(self, defer_indexes=False):
         assert self.new_table is None, "Can only create new table once"
 
         m = MetaData()
@@ -167,11 +268,17 @@ class ApplyBatchImpl(object):
                 self._setup_referent(m, const)
             new_table.append_constraint(const_copy)
 
-        for index in self.indexes.values():
+        if not defer_indexes:
+            self._create_indexes(new_table)
+
+    def _create_indexes(self, table):
+        return [
             Index(index.name,
                   unique=index.unique,
-                  *[new_table.c[col] for col in index.columns.keys()],
+                  *[table.c[col] for col in index.columns.keys()],
                   **index.kwargs)
+            for index in self.indexes.values()
+        ]
 
     def _setup_referent(self, metadata, constraint):
         spec = constraint.elements[0]._get_colspec()
@@ -199,13 +306,18 @@ class ApplyBatchImpl(object):
                          for elem in constraint.elements]],
                     schema=referent_schema)
 
-    def _create(self, op_impl):
-        self._transfer_elements_to_new_table()
+    def _create(self, op_impl, defer_indexes=False):
+        timings = []
+        start = time.time()
+
+        self._transfer_elements_to_new_table(defer_indexes=defer_indexes)
 
         op_impl.prep_table_for_batch(self.table)
         op_impl.create_table(self.new_table)
+        timings.append(("create table", time.time() - start))
 
         try:
+            start = time.time()
             op_impl._exec(
                 self.new_table.insert(inline=True).from_select(
                     list(k for k, transfer in
@@ -217,6 +329,8 @@ class ApplyBatchImpl(object):
                     ])
                 )
             )
+            timings.append(("copy rows", time.time() - start))
+            start = time.time()
             op_impl.drop_table(self.table)
         except:
             op_impl.drop_table(self.new_table)
@@ -227,6 +341,25 @@ class ApplyBatchImpl(object):
                 self.table.name,
                 schema=self.table.schema
             )
+            timings.append(("replace table", time.time() - start))
+
+        if defer_indexes:
+            # indexes are built against the table under its final name;
+            # this also avoids clashing with the names of the indexes of
+            # the table which was dropped
+            start = time.time()
+            renamed_table = Table(
+                self.table.name, MetaData(),
+                *[Column(col.name, col.type, key=col.key)
+                  for col in self.new_table.c],
+                schema=self.table.schema)
+            for index in self._create_indexes(renamed_table):
+                op_impl.create_index(index)
+            timings.append(("build indexes", time.time() - start))
+
+        log.info(
+            "Recreated table %s: %s", self.table.name,
+            ", ".join("%s %.3fs" % timing for timing in timings))
 
     def alter_column(self, table_name, column_name,
                      nullable=None,
@@ -247,7 +380,9 @@ class ApplyBatchImpl(object):
         if type_ is not None:
             type_ = sqltypes.to_instance(type_)
             existing.type = type_
-            existing_transfer["expr"] = cast(existing_transfer["expr"], type_)
+            if 'expr' in existing_transfer:
+                existing_transfer["expr"] = cast(
+                    existing_transfer["expr"], type_)
         if nullable is not None:
             existing.nullable = nullable
         if server_default is not False:
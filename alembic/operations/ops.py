@@ -1339,13 +1339,19 @@ class DropColumnOp(AlterTableOp):
 class BulkInsertOp(MigrateOperation):
     """Represent a bulk insert operation."""
 
-    def __init__(self, table, rows, multiinsert=True):
+    def __init__(
+            self, table, rows, multiinsert=True, chunk_size=None,
+            progress=None):
         self.table = table
         self.rows = rows
         self.multiinsert = multiinsert
+        self.chunk_size = chunk_size
+        self.progress = progress
 
     @classmethod
-    def bulk_insert(cls, operations, table, rows, multiinsert=True):
+    def bulk_insert(
+            cls, operations, table, rows, multiinsert=True, chunk_size=None,
+            progress=None):
         """Issue a "bulk insert" operation using the current
         migration context.
 
@@ -1414,7 +1420,11 @@ class BulkInsertOp(MigrateOperation):
 
         :param table: a table object which represents the target of the INSERT.
 
-        :param rows: a list of dictionaries indicating rows.
+        :param rows: a list of dictionaries indicating rows, or any other
+           iterable of dictionaries, such as a generator.
+
+           .. versionchanged:: 0.8.0 an iterable other than a list may be
+              passed.
 
         :param multiinsert: when at its default of True and --sql mode is not
            enabled, the INSERT statement will be executed using
@@ -1427,9 +1437,33 @@ class BulkInsertOp(MigrateOperation):
 
            .. versionadded:: 0.6.4
 
+        :param chunk_size: if present, the rows are consumed and inserted
+           this many at a time, with one "executemany()" per chunk, so that
+           only one chunk of the rows is held in memory at once, e.g.::
+
+                def account_rows():
+                    with open("accounts.csv") as file_:
+                        for id_, name in csv.reader(file_):
+                            yield {'id': int(id_), 'name': name}
+
+                op.bulk_insert(
+                    accounts_table, account_rows(), chunk_size=10000)
+
+           Otherwise, all of the rows are inserted at once.
+
+           .. versionadded:: 0.8.0
+
+        :param progress: optional callable, which is called after each
+           chunk of rows is inserted with the number of rows inserted so
+           far.
+
+           .. versionadded:: 0.8.0
+
           """
 
-        op = cls(table, rows, multiinsert=multiinsert)
+        op = cls(
+            table, rows, multiinsert=multiinsert, chunk_size=chunk_size,
+            progress=progress)
         operations.invoke(op)
 
 
@@ -0,0 +1,290 @@
+"""Reduce a series of migration operations to their net effect, for
+upgrades of a new database using the ``optimize_fresh_upgrade`` option.
+
+Only operations whose effect is fully described by the operation itself
+are considered; the series passed in is always delimited by operations
+such as :meth:`.Operations.execute` and :meth:`.Operations.bulk_insert`,
+which are run as they occur.
+
+"""
+
+import logging
+
+from sqlalchemy import schema as sa_schema
+
+from ..util.compat import string_types
+from . import ops
+
+log = logging.getLogger(__name__)
+
+NET_OPERATIONS = (
+    ops.CreateTableOp, ops.DropTableOp, ops.RenameTableOp,
+    ops.AddColumnOp, ops.DropColumnOp, ops.AlterColumnOp,
+    ops.CreateIndexOp, ops.DropIndexOp,
+    ops.CreatePrimaryKeyOp, ops.CreateUniqueConstraintOp,
+    ops.CreateForeignKeyOp, ops.CreateCheckConstraintOp,
+    ops.DropConstraintOp
+)
+"""Operations which are collected for optimization, rather than run
+as they occur."""
+
+
+def net_operations(operations):
+    """Return the given list of operations with those which cancel each
+    other out removed, and others merged.
+
+    * a table which is created and later dropped is omitted, along with
+      the operations against it in between, unless some other operation
+      refers to it;
+
+    * a column which is added and later dropped is omitted, along with
+      alterations of it in between, unless some other operation refers to
+      it;
+
+    * an index which is created and later dropped is omitted;
+
+    * a column added to a table just created is included in the CREATE
+      TABLE, unless it refers to a table created in between;
+
+    * successive renames of a column are merged into one.
+
+    """
+    operations = list(operations)
+    count = len(operations)
+    rules = (
+        _cancel_table, _cancel_column, _cancel_index,
+        _merge_add_column, _merge_column_rename)
+    changed = True
+    while changed:
+        changed = any(rule(operations) for rule in rules)
+    if len(operations) != count:
+        log.info(
+            "Reduced %d operations to %d net operations",
+            count, len(operations))
+    return operations
+
+
+def _fk_tables(elements):
+    tables = set()
+    for element in elements:
+        if isinstance(element, sa_schema.Column):
+            fks = element.foreign_keys
+        elif isinstance(element, sa_schema.ForeignKeyConstraint):
+            fks = element.elements
+        else:
+            continue
+        for fk in fks:
+            parts = fk._get_colspec().split(".")
+            if len(parts) == 3:
+                tables.add((parts[0], parts[1]))
+            else:
+                tables.add((None, parts[-2]))
+    return tables
+
+
+def _tables(op):
+    """Return the ``(schema, table_name)`` keys of the tables the given
+    operation refers to, or None if they aren't known."""
+
+    if isinstance(op, ops.CreateForeignKeyOp):
+        return set([
+            (op.kw.get('source_schema'), op.source_table),
+            (op.kw.get('referent_schema'), op.referent_table)])
+    elif isinstance(op, ops.CreateTableOp):
+        return set([(op.schema, op.table_name)]).union(
+            _fk_tables(op.columns))
+    elif isinstance(op, ops.AddColumnOp):
+        return set([(op.schema, op.table_name)]).union(
+            _fk_tables([op.column]))
+    elif isinstance(op, ops.RenameTableOp):
+        return set([
+            (op.schema, op.table_name), (op.schema, op.new_table_name)])
+    elif isinstance(op, NET_OPERATIONS) and op.table_name is not None:
+        return set([(op.schema, op.table_name)])
+    else:
+        return None
+
+
+def _columns(op):
+    """Return the names of the columns of its table the given operation
+    refers to, or None if they aren't known."""
+
+    if isinstance(op, ops.AddColumnOp):
+        return set([op.column.name])
+    elif isinstance(op, ops.DropColumnOp):
+        return set([op.column_name])
+    elif isinstance(op, ops.AlterColumnOp):
+        return set([op.column_name, op.modify_name])
+    elif isinstance(op, (
+            ops.CreateIndexOp, ops.CreatePrimaryKeyOp,
+            ops.CreateUniqueConstraintOp)):
+        if not all(isinstance(col, string_types) for col in op.columns):
+            return None
+        return set(op.columns)
+    elif isinstance(op, (ops.DropIndexOp, ops.DropConstraintOp)):
+        return set()
+    else:
+        return None
+
+
+def _refers_to(op, table_key):
+    tables = _tables(op)
+    return tables is None or table_key in tables
+
+
+def _is_rename(op):
+    return isinstance(op, ops.AlterColumnOp) and \
+        op.modify_name is not None and \
+        op.modify_nullable is None and \
+        op.modify_server_default is False and \
+        op.modify_type is None and \
+        all(key.startswith("existing_") for key in op.kw)
+
+
+def _last_before(operations, end, match):
+    for idx in range(end - 1, -1, -1):
+        if match(operations[idx]):
+            return idx
+    return None
+
+
+def _cancel_table(operations):
+    for end, op in enumerate(operations):
+        if not isinstance(op, ops.DropTableOp):
+            continue
+        start = _last_before(
+            operations, end,
+            lambda other: isinstance(other, ops.CreateTableOp) and
+            (other.table_name, other.schema) == (op.table_name, op.schema))
+        if start is None:
+            continue
+
+        table_key = (op.schema, op.table_name)
+        omitted = [start, end]
+        for idx in range(start + 1, end):
+            tables = _tables(operations[idx])
+            if tables is None:
+                break
+            elif table_key in tables:
+                if tables != set([table_key]) or \
+                        isinstance(operations[idx], ops.RenameTableOp):
+                    break
+                omitted.append(idx)
+        else:
+            for idx in sorted(omitted, reverse=True):
+                del operations[idx]
+            return True
+    return False
+
+
+def _cancel_column(operations):
+    for end, op in enumerate(operations):
+        if not isinstance(op, ops.DropColumnOp):
+            continue
+        start = _last_before(
+            operations, end,
+            lambda other: isinstance(other, ops.AddColumnOp) and
+            (other.table_name, other.schema, other.column.name) ==
+            (op.table_name, op.schema, op.column_name))
+        if start is None:
+            continue
+
+        omitted = [start, end]
+        for idx in range(start + 1, end):
+            other = operations[idx]
+            if not _refers_to(other, (op.schema, op.table_name)):
+                continue
+            columns = _columns(other)
+            if columns is None:
+                break
+            elif op.column_name in columns:
+                if isinstance(other, ops.AlterColumnOp) and \
+                        other.column_name == op.column_name and \
+                        other.modify_name is None:
+                    omitted.append(idx)
+                else:
+                    break
+        else:
+            for idx in sorted(omitted, reverse=True):
+                del operations[idx]
+            return True
+    return False
+
+
+def _cancel_index(operations):
+    for end, op in enumerate(operations):
+        if not isinstance(op, ops.DropIndexOp):
+            continue
+        start = _last_before(
+            operations, end,
+            lambda other: isinstance(other, ops.CreateIndexOp) and
+            (other.index_name, other.schema) == (op.index_name, op.schema))
+        if start is None:
+            continue
+        table_name = operations[start].table_name
+        if op.table_name not in (None, table_name):
+            continue
+
+        for idx in range(start + 1, end):
+            other = operations[idx]
+            if not _refers_to(other, (op.schema, table_name)):
+                continue
+            if not isinstance(other, (
+                    ops.AddColumnOp, ops.CreateIndexOp, ops.DropIndexOp)) \
+                    or getattr(other, 'index_name', None) == op.index_name:
+                break
+        else:
+            del operations[end]
+            del operations[start]
+            return True
+    return False
+
+
+def _merge_add_column(operations):
+    for end, op in enumerate(operations):
+        if not isinstance(op, ops.AddColumnOp):
+            continue
+        start = _last_before(
+            operations, end,
+            lambda other: _refers_to(other, (op.schema, op.table_name)))
+        if start is None:
+            continue
+        create = operations[start]
+        if isinstance(create, ops.CreateTableOp) and \
+                (create.table_name, create.schema) == \
+                (op.table_name, op.schema) and \
+                create._orig_table is None and \
+                not any(
+                    _refers_to(operations[idx], table_key)
+                    for idx in range(start + 1, end)
+                    for table_key in _fk_tables([op.column])):
+            create.columns = list(create.columns) + [op.column]
+            del operations[end]
+            return True
+    return False
+
+
+def _merge_column_rename(operations):
+    for end, op in enumerate(operations):
+        if not _is_rename(op):
+            continue
+        start = _last_before(
+            operations, end,
+            lambda other: _refers_to(
+                other, (op.schema, op.table_name)) and (
+                _columns(other) is None or
+                op.column_name in _columns(other)))
+        if start is None:
+            continue
+        first = operations[start]
+        if _is_rename(first) and \
+                (first.table_name, first.schema, first.modify_name) == \
+                (op.table_name, op.schema, op.column_name):
+            if op.modify_name == first.column_name:
+                del operations[end]
+                del operations[start]
+            else:
+                first.modify_name = op.modify_name
+                del operations[end]
+            return True
+    return False
@@ -85,7 +85,8 @@ def drop_column(operations, operation):
 @Operations.implementation_for(ops.CreateIndexOp)
 def create_index(operations, operation):
     idx = operation.to_index(operations.migration_context)
-    operations.impl.create_index(idx)
+    if not operations.migration_context._defer_index(idx):
+        operations.impl.create_index(idx)
 
 
 @Operations.implementation_for(ops.DropIndexOp)
@@ -151,7 +152,8 @@ def drop_constraint(operations, operation):
 @Operations.implementation_for(ops.BulkInsertOp)
 def bulk_insert(operations, operation):
     operations.impl.bulk_insert(
-        operation.table, operation.rows, multiinsert=operation.multiinsert)
+        operation.table, operation.rows, multiinsert=operation.multiinsert,
+        chunk_size=operation.chunk_size, progress=operation.progress)
 
 
 @Operations.implementation_for(ops.ExecuteSQLOp)
@@ -296,6 +296,7 @@ class EnvironmentContext(util.ModuleClsProxy):
                   target_metadata=None,
                   include_symbol=None,
                   include_object=None,
+                  include_name=None,
                   include_schemas=False,
                   process_revision_directives=None,
                   compare_type=False,
@@ -390,6 +391,22 @@ class EnvironmentContext(util.ModuleClsProxy):
 
             :meth:`.Operations.inline_literal`
 
+        :param offline_bulk_insert: when using ``--sql`` to generate SQL
+         scripts, selects how the rows of :meth:`.Operations.bulk_insert`
+         are rendered.  The default of ``"row"`` renders an INSERT
+         statement per row.  ``"values"`` renders multiple row
+         ``INSERT .. VALUES (..), (..)`` statements, of up to 1000 rows each
+         or of the :paramref:`~.Operations.bulk_insert.chunk_size` given, on
+         backends which support them.  ``"copy"`` additionally renders
+         ``COPY .. FROM stdin`` blocks on Postgresql, as accepted by
+         ``psql``, for rows whose columns are all of plain string, integer
+         or numeric types holding values of the same kind.  Other rows,
+         such as those containing SQL expressions, or values of
+         :class:`~sqlalchemy.types.TypeDecorator`, enum, binary or date
+         types, are rendered as INSERT statements.
+
+         .. versionadded:: 0.8.0
+
         :param starting_rev: Override the "starting revision" argument
          when using ``--sql`` mode.
         :param tag: a string tag for usage by custom ``env.py`` scripts.
@@ -405,6 +422,116 @@ class EnvironmentContext(util.ModuleClsProxy):
          The default is ``'alembic_version'``.
         :param version_table_schema: Optional schema to place version
          table within.
+        :param defer_version_writes: if True, and the full series of
+         migrations runs within a single transaction, i.e. transactional DDL
+         is in use and
+         :paramref:`.EnvironmentContext.configure.transaction_per_migration`
+         is not set, the set of heads in the version table is tracked in
+         memory as each migration runs, and only the net change to the
+         version table is written once all migrations have completed, rather
+         than an UPDATE, INSERT or DELETE for every migration.  The same
+         checks that each UPDATE or DELETE matches exactly one row are
+         applied when the changes are written.  Has no effect when
+         migrations are not run within a single transaction.
+
+         .. versionadded:: 0.8.0
+
+        :param coalesce_batch_recreates: if True, the "move and copy"
+         of a table within :meth:`.Operations.batch_alter_table` is held
+         back, so that the directives of further batch operations against
+         the same table are applied along with it, copying the table just
+         once.  The pending work is applied at the end of the migration
+         run, or before any other operation which refers to the table,
+         :meth:`.Operations.execute`, or a call to
+         :meth:`.Operations.get_bind`.  Has no effect when
+         :paramref:`.EnvironmentContext.configure.transaction_per_migration`
+         is set.  As the version table is updated ahead of the held back
+         changes, this is intended for runs such as the upgrade of a new
+         database, which may simply be discarded if they fail.
+
+         .. versionadded:: 0.8.0
+
+         .. seealso::
+
+            :ref:`batch_coalesce`
+
+        :param combine_batch_alters: if True, consecutive column
+         alterations within a :meth:`.Operations.batch_alter_table` block
+         which doesn't recreate the table are combined into a single
+         ALTER TABLE statement, on backends which support it; currently
+         Postgresql and MySQL.
+
+         .. versionadded:: 0.8.0
+
+         .. seealso::
+
+            :ref:`batch_combine_alters`
+
+        :param cache_batch_reflection: if True, the structure of each table
+         recreated by :meth:`.Operations.batch_alter_table` is retained
+         for the remainder of the migration run, so that a later batch
+         operation against the same table proceeds from it rather than
+         reflecting the table again.  The retained structure is discarded
+         when any other operation refers to the table, when the table is
+         altered in place, or when a column is renamed; it's discarded for
+         all tables by :meth:`.Operations.execute` and
+         :meth:`.Operations.get_bind`.  Batch operations which make use of
+         :paramref:`~.Operations.batch_alter_table.reflect_args` or
+         :paramref:`~.Operations.batch_alter_table.reflect_kwargs` always
+         reflect.  Requires SQLAlchemy 1.0 or greater; the option has no
+         effect with earlier versions.
+
+         .. versionadded:: 0.8.0
+
+        :param optimize_fresh_upgrade: if True, and the version table has
+         no current revision, i.e. migrations are run against a new
+         database, the schema operations of the run such as
+         :meth:`.Operations.create_table`, :meth:`.Operations.add_column`
+         and :meth:`.Operations.create_index` are collected rather than run
+         as they occur, and only their net effect is applied; a table or
+         column created and later dropped is omitted, columns added to a
+         table just created are included in its CREATE TABLE, and
+         successive renames are merged.  Operations such as
+         :meth:`.Operations.execute`, :meth:`.Operations.bulk_insert`,
+         :meth:`.Operations.batch_alter_table` and
+         :meth:`.Operations.get_bind` first apply the operations collected
+         so far, so that data migrations see the schema they expect.  The
+         version table is written once all migrations have completed.  Has
+         no effect when
+         :paramref:`.EnvironmentContext.configure.transaction_per_migration`
+         is set.
+
+         .. versionadded:: 0.8.0
+
+        :param defer_index_builds: if True, the non-unique indexes created
+         by :meth:`.Operations.create_index` are held back, and built once
+         all migrations have run, so that rows added by
+         :meth:`.Operations.bulk_insert` in the meantime don't have to
+         maintain them.  An index is built earlier when some other
+         operation refers to its table or to the index itself, or when
+         :meth:`.Operations.execute` is called;
+         :meth:`.MigrationContext.build_deferred_indexes` may also be
+         called from a migration script.  An index which is dropped, or
+         whose table is dropped, before it's built is discarded.  Each
+         index which fails to build is logged, and all failures are
+         reported together in a single :class:`.CommandError`.
+
+         .. versionadded:: 0.8.0
+
+        :param index_build_workers: used with
+         :paramref:`.EnvironmentContext.configure.defer_index_builds`; the
+         number of connections over which the indexes held back until the
+         end of the run are built concurrently.  Applies to Postgresql and
+         MySQL, when no transaction is in progress on the migration
+         connection once the migrations have run, as other connections
+         wouldn't see the tables created within it.  The
+         ``with context.begin_transaction():`` block of the standard
+         ``env.py`` spans the whole run, so this requires
+         :paramref:`.EnvironmentContext.configure.transaction_per_migration`
+         to be set as well; otherwise the indexes are built one at a time.
+         Defaults to 1.
+
+         .. versionadded:: 0.8.0
 
         Parameters specific to the autogenerate feature, when
         ``alembic revision`` is run with the ``--autogenerate`` feature:
@@ -535,6 +662,49 @@ class EnvironmentContext(util.ModuleClsProxy):
 
             :paramref:`.EnvironmentContext.configure.include_schemas`
 
+        :param include_name: A callable function which is given the
+         chance to return ``True`` or ``False`` for the name of a schema
+         or table, indicating if it should be considered in the
+         autogenerate sweep.   Unlike
+         :paramref:`.EnvironmentContext.configure.include_object`, this
+         hook is consulted before any reflection takes place, so that
+         tables which are omitted aren't reflected at all.
+
+         The function accepts the following positional arguments:
+
+         * ``name``: the name of the object; for a schema, ``None``
+           indicates the default schema.
+         * ``type``: a string describing the type of object; currently
+           ``"schema"`` or ``"table"``.  Schema names are only passed
+           when :paramref:`.EnvironmentContext.configure.include_schemas`
+           is set to ``True``.
+         * ``parent_names``: a dictionary of the names of the objects
+           containing this one; for a table, it has the key
+           ``"schema_name"``, which is ``None`` for the default schema.
+
+         The names of tables present in the target
+         :class:`~sqlalchemy.schema.MetaData` are passed as well, so that
+         a table omitted here isn't detected as added.
+
+         E.g.::
+
+            def include_name(name, type_, parent_names):
+                if type_ == "table":
+                    return not name.startswith("legacy_")
+                else:
+                    return True
+
+            context.configure(
+                # ...
+                include_name = include_name
+            )
+
+         .. versionadded:: 0.8.0
+
+         .. seealso::
+
+            :paramref:`.EnvironmentContext.configure.include_object`
+
         :param include_symbol: A callable function which, given a table name
          and schema name (may be ``None``), returns ``True`` or ``False``,
          indicating if the given table should be considered in the
@@ -585,6 +755,47 @@ class EnvironmentContext(util.ModuleClsProxy):
 
             :paramref:`.EnvironmentContext.configure.include_object`
 
+            :paramref:`.EnvironmentContext.configure.include_name`
+
+        :param autogenerate_workers: When set to an integer greater than
+         one, autogenerate reflects existing tables concurrently using up
+         to this many threads, each using its own connection from the
+         engine of the connection given to :meth:`.configure`.  The
+         comparison itself takes place on the given connection once
+         reflection is complete, so that the diffs produced, and their
+         order, are the same as without this option.  The schema should
+         not be changed by the given connection's current transaction, as
+         other connections won't see those changes.  Has no effect for
+         SQLite memory databases.
+
+         .. versionadded:: 0.8.0
+
+        :param autogenerate_cache: Path to a local file in which
+         autogenerate records the tables it found to be the same in the
+         database as in the target metadata, along with a fingerprint of
+         each such :class:`~sqlalchemy.schema.Table`.  Subsequent runs skip
+         reflecting and comparing those tables whose fingerprint is
+         unchanged, as long as the revisions stamped in the version
+         table, the list of tables in the database and the comparison
+         options, including the code of filters such as
+         ``include_object``, are the same as when the file was written;
+         the schema of the database is assumed to change only by way of
+         migrations.  The file may be deleted at any time to force a full
+         comparison.
+
+         .. versionadded:: 0.8.0
+
+        :param schema_snapshot: Path to a schema snapshot file, as
+         written by the ``alembic snapshot`` command.  When given,
+         autogenerate compares against the schema stored within the
+         snapshot using a :class:`.SnapshotInspector`, rather than
+         reflecting the database; :func:`.compare_metadata` may then be
+         used in "offline" mode as well.  In that mode, server defaults
+         on Postgresql are compared as rendered, rather than evaluated
+         by the database.
+
+         .. versionadded:: 0.8.0
+
         :param render_item: Callable that can be used to override how
          any schema item, i.e. column, constraint, type,
          etc., is rendered for autogenerate.  The callable receives a
@@ -730,6 +941,7 @@ class EnvironmentContext(util.ModuleClsProxy):
         opts['target_metadata'] = target_metadata
         opts['include_symbol'] = include_symbol
         opts['include_object'] = include_object
+        opts['include_name'] = include_name
         opts['include_schemas'] = include_schemas
         opts['render_as_batch'] = render_as_batch
         opts['upgrade_token'] = upgrade_token
@@ -1,10 +1,13 @@
 import logging
 import sys
+import threading
 from contextlib import contextmanager
 
 from sqlalchemy import MetaData, Table, Column, String, literal_column
+from sqlalchemy import exc as sqla_exc, schema as sa_schema
 from sqlalchemy.engine.strategies import MockEngineStrategy
 from sqlalchemy.engine import url as sqla_url
+from sqlalchemy.util import OrderedDict
 
 from ..util.compat import callable, EncodedIO
 from .. import ddl, util
@@ -69,6 +72,19 @@ class MigrationContext(object):
 
         self._transaction_per_migration = opts.get(
             "transaction_per_migration", False)
+        self._defer_version_writes = opts.get("defer_version_writes", False)
+        self._coalesce_batch_recreates = opts.get(
+            "coalesce_batch_recreates", False) and \
+            not self._transaction_per_migration
+        self._pending_batches = OrderedDict()
+        # retained tables are copied using Table.tometadata(name=...),
+        # new in SQLAlchemy 1.0
+        self._batch_tables = {} if opts.get("cache_batch_reflection") \
+            and util.sqla_100 else None
+        self._recorded_ops = None
+        self._deferred_indexes = [] if opts.get("defer_index_builds") \
+            else None
+        self._index_build_workers = opts.get("index_build_workers", 1)
 
         if as_sql:
             self.connection = self._stdout_connection(connection)
@@ -297,7 +313,17 @@ class MigrationContext(object):
         if not self.as_sql and not heads:
             self._ensure_version_table()
 
-        head_maintainer = HeadMaintainer(self, heads)
+        optimize = self.opts.get("optimize_fresh_upgrade", False) and \
+            not heads and not self._transaction_per_migration
+        if optimize:
+            self._recorded_ops = []
+
+        head_maintainer = HeadMaintainer(
+            self, heads,
+            deferred=optimize or (
+                self._defer_version_writes and
+                self.impl.transactional_ddl and
+                not self._transaction_per_migration))
 
         for step in self._migrations_fn(heads, self):
             with self.begin_transaction(_per_migration=True):
@@ -317,9 +343,259 @@ class MigrationContext(object):
                 # just to run the operations on every version
                 head_maintainer.update_to_step(step)
 
+        if optimize:
+            self._flush_recorded_ops()
+            self._recorded_ops = None
+        self._flush_batches()
+        self._build_indexes(concurrent=True)
+        head_maintainer.flush()
+
         if self.as_sql and not head_maintainer.heads:
             self._version.drop(self.connection)
 
+    def _flush_batches(self, table_key=None):
+        """Apply the batch operations held back by the
+        ``coalesce_batch_recreates`` option, for the given
+        ``(schema, table_name)`` key or for all tables."""
+
+        if table_key is not None:
+            pending = self._pending_batches.pop(table_key, None)
+            if pending is not None:
+                pending.apply()
+        else:
+            while self._pending_batches:
+                table_key = next(iter(self._pending_batches))
+                self._pending_batches.pop(table_key).apply()
+
+    def _record_operation(self, operation):
+        """Hold back the given operation for the ``optimize_fresh_upgrade``
+        option, returning True if it was held back.
+
+        Operations which can't be reduced along with others, such as
+        :meth:`.Operations.execute`, first run those held back so far.
+
+        """
+        if self._recorded_ops is None:
+            return False
+        from ..operations import optimize
+        if isinstance(operation, optimize.NET_OPERATIONS):
+            self._recorded_ops.append(operation)
+            return True
+        self._flush_recorded_ops()
+        return False
+
+    def _flush_recorded_ops(self):
+        """Run the net effect of the operations held back by the
+        ``optimize_fresh_upgrade`` option."""
+
+        if not self._recorded_ops:
+            return
+        from ..operations import Operations, optimize
+        recorded, self._recorded_ops = self._recorded_ops, None
+        try:
+            operations = Operations(self)
+            for operation in optimize.net_operations(recorded):
+                operations.invoke(operation)
+        finally:
+            self._recorded_ops = []
+
+    def _defer_index(self, index):
+        """Hold back the given index for the ``defer_index_builds``
+        option, returning True if it was held back.
+
+        Unique indexes aren't held back, as they enforce the integrity of
+        the rows added in the meantime.
+
+        """
+        if self._deferred_indexes is None or index.unique:
+            return False
+        self._deferred_indexes.append(index)
+        return True
+
+    def _index_barrier(self, operation):
+        """Ahead of the given operation, build the indexes held back by
+        the ``defer_index_builds`` option which it may depend on,
+        returning True if the operation itself is to be skipped.
+
+        Indexes are held back past further index creation and
+        :meth:`.Operations.bulk_insert`.  Those which are dropped, or
+        whose table is dropped, are discarded without being built, along
+        with the DROP INDEX itself; other operations build the indexes of
+        the tables they refer to, or all of them if those tables aren't
+        known, as with :meth:`.Operations.execute`.
+
+        """
+        if not self._deferred_indexes:
+            return False
+        from ..operations import ops
+        if isinstance(operation, (ops.CreateIndexOp, ops.BulkInsertOp)):
+            return False
+        elif isinstance(operation, ops.DropIndexOp):
+            discarded = [
+                index for index in self._deferred_indexes
+                if (index.table.schema, index.name) ==
+                (operation.schema, operation.index_name)
+            ]
+            for index in discarded:
+                self._deferred_indexes.remove(index)
+            if discarded:
+                return True
+        elif isinstance(operation, ops.DropTableOp):
+            self._deferred_indexes = [
+                index for index in self._deferred_indexes
+                if (index.table.schema, index.table.name) !=
+                (operation.schema, operation.table_name)
+            ]
+
+        table_name = getattr(operation, 'table_name', None)
+        index_name = getattr(operation, 'index_name', None)
+        if table_name is None and index_name is None:
+            self._build_indexes()
+        else:
+            schema = getattr(operation, 'schema', None)
+            table_keys = [
+                (schema, name) for name in
+                (table_name, getattr(operation, 'new_table_name', None))
+                if name is not None
+            ]
+            self._build_indexes(table_keys=table_keys, index_name=index_name)
+        return False
+
+    def build_deferred_indexes(self):
+        """Build the indexes held back so far by the ``defer_index_builds``
+        option.
+
+        These are otherwise built once all migrations have run; this method
+        may be called from within a migration script, as
+        ``op.get_context().build_deferred_indexes()``, ahead of a data
+        migration which relies upon them.
+
+        .. versionadded:: 0.8.0
+
+        .. seealso::
+
+            :paramref:`.EnvironmentContext.configure.defer_index_builds`
+
+        """
+        self._build_indexes()
+
+    def _build_indexes(
+            self, table_keys=None, index_name=None, concurrent=False):
+        if not self._deferred_indexes:
+            return
+
+        if table_keys is None and index_name is None:
+            indexes, self._deferred_indexes = self._deferred_indexes, []
+        else:
+            indexes = []
+            for index in list(self._deferred_indexes):
+                if (index.table.schema, index.table.name) in \
+                        (table_keys or ()) or \
+                        (index_name is not None and index.name == index_name):
+                    indexes.append(index)
+                    self._deferred_indexes.remove(index)
+            if not indexes:
+                return
+
+        not_attempted = []
+        if concurrent and self._index_build_workers > 1 and \
+                len(indexes) > 1 and not self.as_sql and \
+                self.impl.concurrent_index_builds and \
+                not self.connection.in_transaction():
+            failures = self._build_indexes_concurrently(indexes)
+        else:
+            failures = []
+            for idx, index in enumerate(indexes):
+                try:
+                    self.impl.create_index(index)
+                except sqla_exc.SQLAlchemyError as err:
+                    failures.append((index, err))
+                    if self.impl.transactional_ddl:
+                        # the transaction can't proceed
+                        not_attempted = indexes[idx + 1:]
+                        break
+
+        if failures:
+            messages = []
+            for index, err in failures:
+                log.error(
+                    "Failed to build index %s on %s: %s",
+                    index.name, index.table.name, err)
+                messages.append(
+                    "  %s on %s: %s" % (index.name, index.table.name, err))
+            if not_attempted:
+                messages.append(
+                    "  not attempted: %s" %
+                    ", ".join(index.name for index in not_attempted))
+            raise util.CommandError(
+                "Failed to build %d deferred index(es):\n%s" %
+                (len(failures), "\n".join(messages)))
+
+    def _build_indexes_concurrently(self, indexes):
+        """Build the given indexes over a pool of separate connections,
+        returning a list of ``(index, exception)`` for those which failed."""
+
+        pending = list(indexes)
+        failures = []
+        connect_errors = []
+        lock = threading.Lock()
+        engine = self.connection.engine
+
+        def build():
+            try:
+                connection = engine.connect()
+            except sqla_exc.SQLAlchemyError as err:
+                with lock:
+                    connect_errors.append(err)
+                return
+            try:
+                while True:
+                    with lock:
+                        if not pending:
+                            return
+                        index = pending.pop(0)
+                    try:
+                        connection.execute(sa_schema.CreateIndex(index))
+                    except sqla_exc.SQLAlchemyError as err:
+                        with lock:
+                            failures.append((index, err))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=build)
+            for i in range(min(self._index_build_workers, len(indexes)))
+        ]
+        log.info(
+            "Building %d indexes over %d connections",
+            len(indexes), len(threads))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # no connection could be made
+        failures.extend(
+            (index, connect_errors[0]) for index in pending)
+        return sorted(
+            failures, key=lambda failure: indexes.index(failure[0]))
+
+    def _batch_barrier(self, table_keys=None):
+        """Ahead of an operation which refers to the given
+        ``(schema, table_name)`` keys, or to any table, apply pending batch
+        operations and discard the tables cached by the
+        ``cache_batch_reflection`` option."""
+
+        if table_keys is None:
+            self._flush_batches()
+            if self._batch_tables:
+                self._batch_tables.clear()
+        else:
+            for table_key in table_keys:
+                self._flush_batches(table_key)
+                if self._batch_tables:
+                    self._batch_tables.pop(table_key, None)
+
     def execute(self, sql, execution_options=None):
         """Execute a SQL construct or string statement.
 
@@ -329,6 +605,7 @@ class MigrationContext(object):
         the current SQLAlchemy connection.
 
         """
+        self._flush_recorded_ops()
         self.impl._exec(sql, execution_options)
 
     def _stdout_connection(self, connection):
@@ -393,38 +670,96 @@ class MigrationContext(object):
                                 metadata_column,
                                 rendered_metadata_default,
                                 rendered_column_default):
+        return self._compare_server_defaults([
+            (inspector_column, metadata_column,
+             rendered_metadata_default, rendered_column_default)
+        ])[0]
 
+    def _compare_server_defaults(self, comparisons):
         if self._user_compare_server_default is False:
-            return False
+            return [False] * len(comparisons)
 
+        results = [None] * len(comparisons)
         if callable(self._user_compare_server_default):
-            user_value = self._user_compare_server_default(
-                self,
-                inspector_column,
-                metadata_column,
-                rendered_column_default,
-                metadata_column.server_default,
-                rendered_metadata_default
-            )
-            if user_value is not None:
-                return user_value
+            for idx, (inspector_column, metadata_column,
+                      rendered_metadata_default,
+                      rendered_column_default) in enumerate(comparisons):
+                results[idx] = self._user_compare_server_default(
+                    self,
+                    inspector_column,
+                    metadata_column,
+                    rendered_column_default,
+                    metadata_column.server_default,
+                    rendered_metadata_default
+                )
 
-        return self.impl.compare_server_default(
-            inspector_column,
-            metadata_column,
-            rendered_metadata_default,
-            rendered_column_default)
+        impl_idx = [idx for idx, value in enumerate(results) if value is None]
+        if impl_idx:
+            impl_results = self.impl.compare_server_defaults(
+                [comparisons[idx] for idx in impl_idx])
+            for idx, value in zip(impl_idx, impl_results):
+                results[idx] = value
+        return results
 
 
 class HeadMaintainer(object):
-    def __init__(self, context, heads):
+    def __init__(self, context, heads, deferred=False):
         self.context = context
         self.heads = set(heads)
+        self.deferred = deferred
+
+        # the heads as currently present in the version table
+        self._flushed_heads = set(heads)
 
     def _insert_version(self, version):
         assert version not in self.heads
         self.heads.add(version)
 
+        if not self.deferred:
+            self._emit_insert(version)
+
+    def _delete_version(self, version):
+        self.heads.remove(version)
+
+        if not self.deferred:
+            self._emit_delete(version)
+
+    def _update_version(self, from_, to_):
+        assert to_ not in self.heads
+        self.heads.remove(from_)
+        self.heads.add(to_)
+
+        if not self.deferred:
+            self._emit_update(from_, to_)
+
+    def flush(self):
+        """Write the net difference between the heads present in the
+        version table and those tracked in memory, when in deferred mode.
+
+        Pairs of removed and added heads are written as UPDATE statements,
+        so that the rowcount checks applied are the same as those of
+        non-deferred mode.
+
+        """
+        if not self.deferred:
+            return
+
+        removed = sorted(self._flushed_heads.difference(self.heads))
+        added = sorted(self.heads.difference(self._flushed_heads))
+
+        for from_, to_ in zip(removed, added):
+            log.debug("update %s to %s", from_, to_)
+            self._emit_update(from_, to_)
+        for version in removed[len(added):]:
+            log.debug("delete %s", version)
+            self._emit_delete(version)
+        for version in added[len(removed):]:
+            log.debug("insert %s", version)
+            self._emit_insert(version)
+
+        self._flushed_heads = set(self.heads)
+
+    def _emit_insert(self, version):
         self.context.impl._exec(
             self.context._version.insert().
             values(
@@ -432,9 +767,7 @@ class HeadMaintainer(object):
             )
         )
 
-    def _delete_version(self, version):
-        self.heads.remove(version)
-
+    def _emit_delete(self, version):
         ret = self.context.impl._exec(
             self.context._version.delete().where(
                 self.context._version.c.version_num ==
@@ -447,11 +780,7 @@ class HeadMaintainer(object):
                 % (version,
                    self.context.version_table, ret.rowcount))
 
-    def _update_version(self, from_, to_):
-        assert to_ not in self.heads
-        self.heads.remove(from_)
-        self.heads.add(to_)
-
+    def _emit_update(self, from_, to_):
         ret = self.context.impl._exec(
             self.context._version.update().
             values(version_num=literal_column("'%s'" % to_)).where(
@@ -590,11 +919,10 @@ class RevisionStep(MigrationStep):
             if not downrev._is_real_branch_point:
                 return False
 
-            descendants = set(
-                r.revision for r in self.revision_map._get_descendant_nodes(
-                    self.revision_map.get_revisions(downrev._all_nextrev),
-                    check=False
-                )
+            index = self.revision_map._index
+            descendants = index.revision_ids(
+                index.descendants(
+                    self.revision_map.get_revisions(downrev._all_nextrev))
             )
 
             # the downrev is a branchpoint, and other members or descendants
@@ -625,12 +953,9 @@ class RevisionStep(MigrationStep):
         other_heads = set(heads).difference(self.from_revisions)
 
         if other_heads:
-            ancestors = set(
-                r.revision for r in
-                self.revision_map._get_ancestor_nodes(
-                    self.revision_map.get_revisions(other_heads),
-                    check=False
-                )
+            index = self.revision_map._index
+            ancestors = index.revision_ids(
+                index.ancestors(self.revision_map.get_revisions(other_heads))
             )
             from_revisions = list(
                 set(self.from_revisions).difference(ancestors))
@@ -646,12 +971,9 @@ class RevisionStep(MigrationStep):
     def unmerge_branch_idents(self, heads):
         other_heads = set(heads).difference([self.revision.revision])
         if other_heads:
-            ancestors = set(
-                r.revision for r in
-                self.revision_map._get_ancestor_nodes(
-                    self.revision_map.get_revisions(other_heads),
-                    check=False
-                )
+            index = self.revision_map._index
+            ancestors = index.revision_ids(
+                index.ancestors(self.revision_map.get_revisions(other_heads))
             )
             to_revisions = list(set(self.to_revisions).difference(ancestors))
         else:
@@ -796,3 +1118,21 @@ class StampStep(MigrationStep):
 
     def should_unmerge_branches(self, heads):
         return len(self.to_) > 1
+
+
+class SquashStep(StampStep):
+    """Run a squashed baseline revision in place of the revisions it
+    squashes, recording the squashed revision as the new version."""
+
+    def __init__(self, revision):
+        super(SquashStep, self).__init__((), revision.squashes, True, True)
+        self.revision = revision
+        self.migration_fn = revision.module.upgrade
+
+    @property
+    def doc(self):
+        return self.revision.doc
+
+    def __eq__(self, other):
+        return isinstance(other, SquashStep) and \
+            other.revision == self.revision
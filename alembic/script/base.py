@@ -1,7 +1,13 @@
+import ast
+import binascii
 import datetime
+import json
+import mmap
 import os
 import re
 import shutil
+import zipfile
+from multiprocessing.pool import ThreadPool
 from .. import util
 from ..util import compat
 from . import revision
@@ -16,6 +22,9 @@ _mod_def_re = re.compile(r'(upgrade|downgrade)_([a-z0-9]+)')
 _slug_re = re.compile(r'\w+')
 _default_file_template = "%(rev)s_%(slug)s"
 _split_on_space_comma = re.compile(r',|(?: +)')
+_revision_header_names = frozenset(
+    ['revision', 'down_revision', 'branch_labels', 'depends_on',
+     'squashes'])
 
 
 class ScriptDirectory(object):
@@ -42,13 +51,19 @@ class ScriptDirectory(object):
     def __init__(self, dir, file_template=_default_file_template,
                  truncate_slug_length=40,
                  version_locations=None,
-                 sourceless=False, output_encoding="utf-8"):
+                 sourceless=False, output_encoding="utf-8",
+                 revision_map_cache=None, lazy_scripts=False,
+                 revision_load_workers=None, revision_bundle=None):
         self.dir = dir
         self.file_template = file_template
         self.version_locations = version_locations
         self.truncate_slug_length = truncate_slug_length or 40
         self.sourceless = sourceless
         self.output_encoding = output_encoding
+        self.revision_map_cache = revision_map_cache
+        self.lazy_scripts = lazy_scripts
+        self.revision_load_workers = revision_load_workers
+        self.revision_bundle = revision_bundle
         self.revision_map = revision.RevisionMap(self._load_revisions)
 
         if not os.access(dir, os.F_OK):
@@ -74,7 +89,51 @@ class ScriptDirectory(object):
         else:
             return (os.path.abspath(os.path.join(self.dir, 'versions')),)
 
+    def _using_bundle(self):
+        return bool(self.revision_bundle) and \
+            os.path.exists(self.revision_bundle)
+
     def _load_revisions(self):
+        if self._using_bundle():
+            bundle = _RevisionBundle(self.revision_bundle)
+            self._warn_stale_bundle(bundle)
+            return bundle.scripts()
+        else:
+            return self._load_revision_files()
+
+    def _warn_stale_bundle(self, bundle):
+        """Warn of revision files within the version locations which
+        were added or changed since the given bundle was written, as
+        they're otherwise ignored."""
+
+        if self.sourceless:
+            rev_file = _sourceless_rev_file
+        else:
+            rev_file = _only_source_rev_file
+        bundled = set(
+            _sourceless_rev_file.match(os.path.basename(name)).group(1)
+            for name in bundle.names())
+        bundle_mtime = os.path.getmtime(bundle.path)
+
+        stale = []
+        for vers in self._version_locations:
+            if not os.path.exists(vers):
+                continue
+            for file_ in os.listdir(vers):
+                py_match = rev_file.match(file_)
+                if py_match and (
+                        py_match.group(1) not in bundled or
+                        os.path.getmtime(os.path.join(vers, file_)) >
+                        bundle_mtime):
+                    stale.append(os.path.join(vers, file_))
+        if stale:
+            util.warn(
+                "Revision file(s) %s are newer than the revision bundle "
+                "%s or missing from it, and are ignored; please re-run "
+                "the 'bundle' command" % (
+                    ", ".join(sorted(stale)), bundle.path))
+
+    def _load_revision_files(self):
         if self.version_locations:
             paths = [
                 vers for vers in self._version_locations
@@ -82,12 +141,60 @@ class ScriptDirectory(object):
         else:
             paths = [self.versions]
 
-        for vers in paths:
-            for file_ in os.listdir(vers):
-                script = Script._from_filename(self, vers, file_)
-                if script is None:
-                    continue
-                yield script
+        if self.revision_map_cache:
+            cache = _RevisionMapCache(self.revision_map_cache)
+        else:
+            cache = None
+
+        files = [
+            (vers, file_) for vers in paths for file_ in os.listdir(vers)]
+
+        def load(entry):
+            vers, file_ = entry
+            return Script._from_filename(self, vers, file_, cache=cache)
+
+        if self.revision_load_workers and self.revision_load_workers > 1:
+            scripts = self._load_parallel(load, files)
+        else:
+            scripts = (load(entry) for entry in files)
+
+        for script in scripts:
+            if script is None:
+                continue
+            yield script
+
+        if cache is not None:
+            cache.save()
+
+    def _load_parallel(self, load, files):
+        """Run the given loader against each (directory, filename) entry
+        using a pool of threads, returning the results in the same order
+        as the entries were given.
+
+        """
+
+        # files of the same name in different version locations are
+        # imported under the same module name, so are loaded serially
+        # within a single task
+        by_filename = {}
+        for idx, entry in enumerate(files):
+            by_filename.setdefault(entry[1], []).append((idx, entry))
+
+        def load_group(group):
+            return [(idx, load(entry)) for idx, entry in group]
+
+        pool = ThreadPool(self.revision_load_workers)
+        try:
+            loaded = pool.map(load_group, list(by_filename.values()))
+        finally:
+            pool.close()
+            pool.join()
+
+        results = [None] * len(files)
+        for group in loaded:
+            for idx, script in group:
+                results[idx] = script
+        return results
 
     @classmethod
     def from_config(cls, config):
@@ -109,6 +216,12 @@ class ScriptDirectory(object):
         version_locations = config.get_main_option("version_locations")
         if version_locations:
             version_locations = _split_on_space_comma.split(version_locations)
+
+        revision_load_workers = config.get_main_option(
+            "revision_load_workers")
+        if revision_load_workers is not None:
+            revision_load_workers = int(revision_load_workers)
+
         return ScriptDirectory(
             util.coerce_resource_to_filename(script_location),
             file_template=config.get_main_option(
@@ -117,7 +230,11 @@ class ScriptDirectory(object):
             truncate_slug_length=truncate_slug_length,
             sourceless=config.get_main_option("sourceless") == "true",
             output_encoding=config.get_main_option("output_encoding", "utf-8"),
-            version_locations=version_locations
+            version_locations=version_locations,
+            revision_map_cache=config.get_main_option("revision_map_cache"),
+            lazy_scripts=config.get_main_option("lazy_scripts") == "true",
+            revision_load_workers=revision_load_workers,
+            revision_bundle=config.get_main_option("revision_bundle")
         )
 
     @contextmanager
@@ -301,7 +418,14 @@ class ScriptDirectory(object):
             revs = self.revision_map.iterate_revisions(
                 destination, current_rev, implicit_base=True)
             revs = list(revs)
+            squashes = []
+            if not util.to_tuple(current_rev, default=()):
+                # a fresh database; run squashed baselines in place
+                # of the history they reproduce
+                squashes, revs = self.revision_map._squashed_upgrade(revs)
             return [
+                migration.SquashStep(script) for script in squashes
+            ] + [
                 migration.MigrationStep.upgrade_from_script(
                     self.revision_map, script)
                 for script in reversed(list(revs))
@@ -333,6 +457,9 @@ class ScriptDirectory(object):
 
             steps = []
 
+            index = self.revision_map._index
+            filtered_heads_bits = index.bits(filtered_heads)
+
             dests = self.get_revisions(revision) or [None]
             for dest in dests:
                 if dest is None:
@@ -349,20 +476,19 @@ class ScriptDirectory(object):
 
                 # figure out if the dest is a descendant or an
                 # ancestor of the selected nodes
-                descendants = set(
-                    self.revision_map._get_descendant_nodes([dest]))
-                ancestors = set(self.revision_map._get_ancestor_nodes([dest]))
+                descendants = index.descendants([dest])
+                ancestors = index.ancestors([dest])
 
-                if descendants.intersection(filtered_heads):
+                if descendants & filtered_heads_bits:
                     # heads are above the target, so this is a downgrade.
                     # we can treat them as a "merge", single step.
-                    assert not ancestors.intersection(filtered_heads)
+                    assert not ancestors & filtered_heads_bits
                     todo_heads = [head.revision for head in filtered_heads]
                     step = migration.StampStep(
                         todo_heads, dest.revision, False, False)
                     steps.append(step)
                     continue
-                elif ancestors.intersection(filtered_heads):
+                elif ancestors & filtered_heads_bits:
                     # heads are below the target, so this is an upgrade.
                     # we can treat them as a "merge", single step.
                     todo_heads = [head.revision for head in filtered_heads]
@@ -378,6 +504,15 @@ class ScriptDirectory(object):
                     continue
             return steps
 
+    def _write_bundle(self, path):
+        """Write all revision files present in the version locations
+        to a single revision bundle at the given path.
+
+        """
+        scripts = list(self._load_revision_files())
+        _RevisionBundle.write(path, scripts)
+        return scripts
+
     def run_env(self):
         """Run the script environment.
 
@@ -417,7 +552,7 @@ class ScriptDirectory(object):
     def generate_revision(
             self, revid, message, head=None,
             refresh=False, splice=False, branch_labels=None,
-            version_path=None, depends_on=None, **kw):
+            version_path=None, depends_on=None, squashes=None, **kw):
         """Generate a new revision file.
 
         This runs the ``script.py.mako`` template, given
@@ -437,8 +572,19 @@ class ScriptDirectory(object):
          actual head; otherwise, the selected head must be a head
          (e.g. endpoint) revision.
         :param refresh: deprecated.
+        :param squashes: for a squashed baseline revision, the revision
+         whose schema it reproduces; see :func:`.command.squash`.
+
+         .. versionadded:: 0.8.0
 
         """
+        if self._using_bundle():
+            raise util.CommandError(
+                "Revisions are read from the revision bundle %s, which "
+                "wouldn't include the new revision; please remove it to "
+                "generate revisions, then re-run the 'bundle' command" %
+                self.revision_bundle)
+
         if head is None:
             head = "head"
 
@@ -500,6 +646,7 @@ class ScriptDirectory(object):
             create_date=create_date,
             comma=util.format_as_comma,
             message=message if message is not None else ("empty message"),
+            squashes=squashes,
             **kw
         )
         script = Script._from_path(self, path)
@@ -511,6 +658,14 @@ class ScriptDirectory(object):
                 "'branch_labels' section?" % (
                     script.revision, branch_labels, script.path
                 ))
+        if squashes and script.squashes != squashes:
+            raise util.CommandError(
+                "Version %s squashes %s, however the "
+                "migration file %s does not say so; have you upgraded "
+                "your script.py.mako to include the "
+                "'squashes' section?" % (
+                    script.revision, squashes, script.path
+                ))
 
         self.revision_map.add_revision(script)
         return script
@@ -552,7 +707,8 @@ class Script(revision.Revision):
             branch_labels=util.to_tuple(
                 getattr(module, 'branch_labels', None), default=()),
             dependencies=util.to_tuple(
-                getattr(module, 'depends_on', None), default=())
+                getattr(module, 'depends_on', None), default=()),
+            squashes=getattr(module, 'squashes', None)
         )
 
     module = None
@@ -679,7 +835,7 @@ class Script(revision.Revision):
         return cls._from_filename(scriptdir, dir_, filename)
 
     @classmethod
-    def _from_filename(cls, scriptdir, dir_, filename):
+    def _from_filename(cls, scriptdir, dir_, filename, cache=None):
         if scriptdir.sourceless:
             py_match = _sourceless_rev_file.match(filename)
         else:
@@ -706,11 +862,34 @@ class Script(revision.Revision):
             if py_exists or is_o and pyc_exists:
                 return None
 
-        module = util.load_python_file(dir_, filename)
+        path = os.path.join(dir_, filename)
+        if cache is not None:
+            stat = os.stat(path)
+            entry = cache.get(path, stat)
+            if entry is not None:
+                return _LazyScript(
+                    path, entry['revision'], entry['down_revision'],
+                    branch_labels=entry['branch_labels'],
+                    dependencies=entry['depends_on'],
+                    squashes=entry.get('squashes'))
+
+        script = None
+        if scriptdir.lazy_scripts and not is_c and not is_o:
+            script = _LazyScript._from_source(path)
+
+        if script is None:
+            script = cls._from_module(
+                util.load_python_file(dir_, filename), path)
+        if cache is not None:
+            cache.put(path, stat, script)
+        return script
 
+    @classmethod
+    def _from_module(cls, module, path):
         if not hasattr(module, "revision"):
             # attempt to get the revision id from the script name,
             # this for legacy only
+            filename = os.path.basename(path)
             m = _legacy_rev.match(filename)
             if not m:
                 raise util.CommandError(
@@ -723,4 +902,279 @@ class Script(revision.Revision):
                 revision = m.group(1)
         else:
             revision = module.revision
-        return Script(module, revision, os.path.join(dir_, filename))
+        return Script(module, revision, path)
+
+
+class _LazyScript(Script):
+    """A :class:`.Script` whose revision identifiers are known up front,
+    and whose Python module is only imported when first accessed.
+
+    Instances are produced from the revision map cache, as well as from
+    the static parse of a revision file when the ``lazy_scripts``
+    option is in use; accessing :attr:`.Script.module`, :attr:`.Script.doc`
+    or running the migration functions imports the real module.
+
+    """
+
+    def __init__(
+            self, path, rev_id, down_revision,
+            branch_labels=None, dependencies=None, squashes=None):
+        self.path = path
+        revision.Revision.__init__(
+            self, rev_id, down_revision,
+            branch_labels=branch_labels, dependencies=dependencies,
+            squashes=squashes)
+
+    @util.memoized_property
+    def module(self):
+        dir_, filename = os.path.split(self.path)
+        return util.load_python_file(dir_, filename)
+
+    @classmethod
+    def _from_source(cls, path):
+        """Produce a :class:`._LazyScript` from the top-level assignments
+        of ``revision``, ``down_revision``, ``branch_labels``,
+        ``depends_on`` and ``squashes`` in the given source file, without
+        executing it.
+
+        Returns None if the identifiers can't be determined statically,
+        e.g. they are computed or missing, in which case the caller
+        should import the module normally.
+
+        """
+        with open(path, 'rb') as file_:
+            source = file_.read()
+        try:
+            tree = ast.parse(source, path)
+        except SyntaxError:
+            # let the regular import report the error
+            return None
+
+        values = {}
+        for node in tree.body:
+            if not isinstance(node, ast.Assign) or \
+                    len(node.targets) != 1 or \
+                    not isinstance(node.targets[0], ast.Name):
+                continue
+            name = node.targets[0].id
+            if name not in _revision_header_names:
+                continue
+            try:
+                values[name] = ast.literal_eval(node.value)
+            except ValueError:
+                return None
+
+        if 'revision' not in values or 'down_revision' not in values:
+            return None
+
+        return cls(
+            path, values['revision'],
+            _cache_rev_value(values['down_revision']),
+            branch_labels=_cache_rev_value(values.get('branch_labels')),
+            dependencies=_cache_rev_value(values.get('depends_on')),
+            squashes=values.get('squashes')
+        )
+
+
+def _cache_rev_value(value):
+    # JSON has no tuples; normalize the way Script itself does
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    else:
+        return value
+
+
+class _RevisionMapCache(object):
+    """Persist the revision identifiers of each script file to a
+    JSON file, keyed on path, modification time and size, so that the
+    revision map can be assembled without importing every module.
+
+    Entries for files which are no longer present are dropped when
+    the cache is saved.
+
+    """
+
+    format_version = 1
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = self._read()
+        self._current = {}
+
+    def _read(self):
+        try:
+            with open(self.path) as file_:
+                data = json.load(file_)
+        except (IOError, OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or \
+                data.get('version') != self.format_version:
+            return {}
+        return data.get('scripts', {})
+
+    def get(self, path, stat):
+        entry = self._entries.get(path)
+        if entry is None or entry['mtime'] != stat.st_mtime or \
+                entry['size'] != stat.st_size:
+            return None
+        self._current[path] = entry
+        return dict(
+            (key, _cache_rev_value(value)) for key, value in entry.items())
+
+    def put(self, path, stat, script):
+        self._current[path] = {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'revision': script.revision,
+            'down_revision': script.down_revision,
+            'branch_labels': list(script._orig_branch_labels),
+            'depends_on': script.dependencies,
+            'squashes': script.squashes
+        }
+
+    def save(self):
+        if self._current == self._entries:
+            return
+        tmp_path = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            with open(tmp_path, 'w') as file_:
+                json.dump(
+                    {'version': self.format_version,
+                     'scripts': self._current},
+                    file_, sort_keys=True)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError) as err:
+            util.warn(
+                "Could not write revision map cache %s: %s" %
+                (self.path, err))
+        else:
+            self._entries = self._current
+
+
+class _BundledScript(_LazyScript):
+    """A :class:`.Script` which is read from a revision bundle."""
+
+    def __init__(
+            self, bundle, name, rev_id, down_revision,
+            branch_labels=None, dependencies=None, squashes=None):
+        self.bundle = bundle
+        self.name = name
+        super(_BundledScript, self).__init__(
+            os.path.join(bundle.path, name), rev_id, down_revision,
+            branch_labels=branch_labels, dependencies=dependencies,
+            squashes=squashes)
+
+    @util.memoized_property
+    def module(self):
+        return self.bundle.load_module(self.name)
+
+
+class _RevisionBundle(object):
+    """A single zip archive holding every revision file, along with an
+    index of their revision identifiers.
+
+    The archive is opened with a single file handle which is memory
+    mapped; :class:`.Script` objects are produced from the index, and
+    their modules are compiled from the archive on first access.
+
+    Revision files of a ``sourceless`` environment are stored as
+    their compiled .pyc or .pyo contents, with the interpreter's magic
+    number recorded in the index; such a bundle can only be read by
+    the same version of Python.
+
+    """
+
+    index_name = "alembic_bundle.json"
+    format_version = 1
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            # an empty file can't be mapped
+            with open(path, 'rb') as file_:
+                self._mmap = mmap.mmap(
+                    file_.fileno(), 0, access=mmap.ACCESS_READ)
+            self._zip = zipfile.ZipFile(self._mmap)
+            index = json.loads(
+                self._zip.read(self.index_name).decode('utf-8'))
+        except (zipfile.BadZipfile, KeyError, ValueError):
+            index = None
+        if not isinstance(index, dict) or \
+                index.get('version') != self.format_version:
+            raise util.CommandError(
+                "File %s is not a revision bundle compatible with "
+                "this version of Alembic; please re-run the "
+                "'bundle' command" % path)
+        self._index = index['scripts']
+
+        magic = binascii.hexlify(compat.pyc_magic).decode('ascii')
+        for entry in self._index:
+            if entry.get('magic', magic) != magic:
+                raise util.CommandError(
+                    "Revision bundle %s contains code compiled by a "
+                    "different version of Python; please re-run the "
+                    "'bundle' command" % path)
+
+    def names(self):
+        return [entry['name'] for entry in self._index]
+
+    def scripts(self):
+        for entry in self._index:
+            yield _BundledScript(
+                self, entry['name'], entry['revision'],
+                _cache_rev_value(entry['down_revision']),
+                branch_labels=_cache_rev_value(entry['branch_labels']),
+                dependencies=_cache_rev_value(entry['depends_on']),
+                squashes=entry.get('squashes')
+            )
+
+    def load_module(self, name):
+        module_id = re.sub(r'\W', "_", os.path.basename(name))
+        if name.endswith(".py"):
+            load = util.load_python_source
+        else:
+            load = util.load_python_compiled
+        return load(
+            module_id, self._zip.read(name), os.path.join(self.path, name))
+
+    @classmethod
+    def write(cls, path, scripts):
+        index = []
+        names = set()
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED) as zip_:
+            for script in scripts:
+                # keep the original filename where possible, so that
+                # module names remain the same
+                name = os.path.basename(script.path)
+                counter = 1
+                while name in names:
+                    name = "%d/%s" % (counter, os.path.basename(script.path))
+                    counter += 1
+                names.add(name)
+
+                zip_.write(script.path, name)
+                entry = {
+                    'name': name,
+                    'revision': script.revision,
+                    'down_revision': script.down_revision,
+                    'branch_labels': list(script._orig_branch_labels),
+                    'depends_on': script.dependencies,
+                    'squashes': script.squashes
+                }
+                if not name.endswith(".py"):
+                    with open(script.path, 'rb') as file_:
+                        entry['magic'] = binascii.hexlify(
+                            file_.read(4)).decode('ascii')
+                index.append(entry)
+            zip_.writestr(
+                cls.index_name,
+                json.dumps(
+                    {'version': cls.format_version, 'scripts': index},
+                    sort_keys=True)
+            )
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(tmp_path, path)
@@ -1,5 +1,6 @@
 import re
 import collections
+from operator import attrgetter
 
 from .. import util
 from sqlalchemy import util as sqlautil
@@ -113,6 +114,7 @@ class RevisionMap(object):
         _real_heads = sqlautil.OrderedSet()
         self.bases = ()
         self._real_bases = ()
+        self._squash_revisions = ()
 
         has_branch_labels = set()
         for revision in self._generator():
@@ -121,6 +123,10 @@ class RevisionMap(object):
                 util.warn("Revision %s is present more than once" %
                           revision.revision)
             map_[revision.revision] = revision
+            if revision.squashes:
+                # squashed baselines aren't part of the graph itself
+                self._squash_revisions += (revision, )
+                continue
             if revision.branch_labels:
                 has_branch_labels.add(revision)
             heads.add(revision.revision)
@@ -131,6 +137,8 @@ class RevisionMap(object):
                 self._real_bases += (revision.revision, )
 
         for rev in map_.values():
+            if rev.squashes:
+                continue
             for downrev in rev._all_down_revisions:
                 if downrev not in map_:
                     util.warn("Revision %s referenced from %s is not present"
@@ -141,6 +149,9 @@ class RevisionMap(object):
                     heads.discard(downrev)
                 _real_heads.discard(downrev)
 
+        for revision in self._squash_revisions:
+            self._check_squash(revision, map_)
+
         map_[None] = map_[()] = None
         self.heads = tuple(heads)
         self._real_heads = tuple(_real_heads)
@@ -149,6 +160,11 @@ class RevisionMap(object):
             self._add_branches(revision, map_)
         return map_
 
+    def _check_squash(self, revision, map_):
+        if revision.squashes not in map_:
+            util.warn("Revision %s squashed by %s is not present"
+                      % (revision.squashes, revision))
+
     def _add_branches(self, revision, map_):
         if revision.branch_labels:
             for branch_label in revision._orig_branch_labels:
@@ -175,6 +191,14 @@ class RevisionMap(object):
                 else:
                     break
 
+    @util.memoized_property
+    def _index(self):
+        """memoized attribute, a :class:`._ReachabilityIndex` against
+        the full revision map.
+
+        """
+        return _ReachabilityIndex(self._revision_map)
+
     def add_revision(self, revision, _replace=False):
         """add a single revision to an existing map.
 
@@ -189,7 +213,15 @@ class RevisionMap(object):
         elif _replace and revision.revision not in map_:
             raise Exception("revision %s not in map" % revision.revision)
 
+        replaces_existing = revision.revision in map_
+
         map_[revision.revision] = revision
+        if revision.squashes:
+            self._check_squash(revision, map_)
+            self._squash_revisions += (revision, )
+            self.__dict__.pop('_index', None)
+            return
+
         self._add_branches(revision, map_)
         if revision.is_base:
             self.bases += (revision.revision, )
@@ -202,6 +234,13 @@ class RevisionMap(object):
                     % (downrev, revision)
                 )
             map_[downrev].add_nextrev(revision)
+
+        if '_index' in self.__dict__:
+            if replaces_existing:
+                # the node may now have different edges; rebuild lazily
+                del self.__dict__['_index']
+            else:
+                self._index.add_revision(revision)
         if revision._is_real_head:
             self._real_heads = tuple(
                 head for head in self._real_heads
@@ -215,6 +254,44 @@ class RevisionMap(object):
                 set(revision._versioned_down_revisions).union([revision.revision])
             ) + (revision.revision,)
 
+    def _squashed_upgrade(self, revisions):
+        """Given the revisions to be applied, in any order, to a database
+        which has no version yet, return the squashed baseline revisions
+        which may be run in their place, along with the remaining
+        revisions in their original order.
+
+        A squashed revision is used only if everything it squashes is
+        to be applied; where several apply, those squashing the most
+        history are preferred.
+
+        """
+        map_ = self._revision_map
+        if not self._squash_revisions:
+            return [], revisions
+
+        index = self._index
+        pending = index.bits(revisions)
+
+        candidates = []
+        for squash in self._squash_revisions:
+            target = map_.get(squash.squashes)
+            if target is None:
+                continue
+            covered = index.ancestors([target])
+            candidates.append((bin(covered).count("1"), covered, squash))
+        candidates.sort(key=lambda candidate: -candidate[0])
+
+        squashes = []
+        for count, covered, squash in candidates:
+            if covered & pending == covered:
+                pending &= ~covered
+                squashes.append(squash)
+
+        positions = index._positions
+        return squashes, [
+            rev for rev in revisions
+            if pending >> positions[rev.revision] & 1]
+
     def get_current_head(self, branch_label=None):
         """Return the current head revision.
 
@@ -374,12 +451,18 @@ class RevisionMap(object):
             in util.to_tuple(test_against_revs, default=())
         ]
 
+        # the target shares lineage with one of the test revisions if
+        # it's among their ancestors or descendants
+        index = self._index
         return bool(
-            set(self._get_descendant_nodes([target],
-                include_dependencies=include_dependencies))
-            .union(self._get_ancestor_nodes([target],
-                   include_dependencies=include_dependencies))
-            .intersection(test_against_revs)
+            index.bits([target]) & (
+                index.ancestors(
+                    test_against_revs,
+                    include_dependencies=include_dependencies) |
+                index.descendants(
+                    test_against_revs,
+                    include_dependencies=include_dependencies)
+            )
         )
 
     def _resolve_revision_number(self, id_):
@@ -544,6 +627,7 @@ class RevisionMap(object):
         if map_ is None:
             map_ = self._revision_map
 
+        seen = set()
         todo = collections.deque()
         for target in targets:
             todo.append(target)
@@ -551,10 +635,16 @@ class RevisionMap(object):
                 per_target = set()
             while todo:
                 rev = todo.pop()
-                todo.extend(
-                    map_[rev_id] for rev_id in fn(rev))
                 if check:
                     per_target.add(rev)
+
+                # a node reachable along several paths, e.g. below
+                # a merge point, is only traversed once
+                if rev in seen:
+                    continue
+                seen.add(rev)
+                todo.extend(
+                    map_[rev_id] for rev_id in fn(rev))
                 yield rev
             if check and per_target.intersection(targets).difference([target]):
                 raise RevisionError(
@@ -585,21 +675,21 @@ class RevisionMap(object):
         if not uppers and not requested_lowers:
             raise StopIteration()
 
-        upper_ancestors = set(self._get_ancestor_nodes(uppers, check=True))
+        index = self._index
+        upper_ancestors = index.ancestors(uppers, check=True)
 
         if limit_to_lower_branch:
             lowers = self.get_revisions(self._get_base_revisions(lower))
         elif implicit_base and requested_lowers:
-            lower_ancestors = set(
-                self._get_ancestor_nodes(requested_lowers)
-            )
-            lower_descendants = set(
-                self._get_descendant_nodes(requested_lowers)
-            )
+            lower_ancestors = index.ancestors(requested_lowers)
+            lower_descendants = index.descendants(requested_lowers)
             base_lowers = set()
-            candidate_lowers = upper_ancestors.\
-                difference(lower_ancestors).\
-                difference(lower_descendants)
+            candidate_lowers = set(
+                index.revisions(
+                    upper_ancestors &
+                    ~(lower_ancestors | lower_descendants)
+                )
+            )
             for rev in candidate_lowers:
                 for downrev in rev._all_down_revisions:
                     if self._revision_map[downrev] in candidate_lowers:
@@ -616,10 +706,8 @@ class RevisionMap(object):
             lowers = requested_lowers
 
         # represents all nodes we will produce
-        total_space = set(
-            rev.revision for rev in upper_ancestors).intersection(
-            rev.revision for rev
-            in self._get_descendant_nodes(lowers, check=True)
+        total_space = index.revision_ids(
+            upper_ancestors & index.descendants(lowers, check=True)
         )
 
         if not total_space:
@@ -679,6 +767,181 @@ class RevisionMap(object):
         assert not branch_todo
 
 
+class _ReachabilityIndex(object):
+    """Answer ancestor / descendant queries against a revision map
+    using integer bitsets.
+
+    Each revision is assigned a bit position in topological order, with
+    new revisions appended at the end.  The ancestor and descendant
+    closures of a revision are computed on first request, reusing any
+    closures already computed for the nodes traversed, and are then
+    memoized; so membership of a revision within a closure, and
+    intersections between closures, are answered with integer
+    operations.
+
+    """
+
+    def __init__(self, map_):
+        self._positions = {}
+        self._revisions = []
+
+        # (is_descendant, include_dependencies) -> {position: bits}
+        self._closures = dict(
+            (key, {}) for key in
+            [(False, True), (False, False), (True, True), (True, False)]
+        )
+
+        revisions = [
+            rev for key, rev in map_.items()
+            if rev is not None and key == rev.revision
+        ]
+        for rev in self._topological_order(revisions, map_):
+            self._append(rev)
+
+        # not expected, but don't lose track of any nodes that are
+        # part of a cycle
+        for rev in revisions:
+            if rev.revision not in self._positions:
+                self._append(rev)
+
+    def _topological_order(self, revisions, map_):
+        pending = dict(
+            (rev.revision, len(set(rev._all_down_revisions)))
+            for rev in revisions
+        )
+        todo = collections.deque(
+            rev for rev in revisions if not pending[rev.revision])
+        while todo:
+            rev = todo.popleft()
+            yield rev
+            for nextrev in sorted(rev._all_nextrev):
+                pending[nextrev] -= 1
+                if not pending[nextrev]:
+                    todo.append(map_[nextrev])
+
+    def _append(self, revision):
+        self._positions[revision.revision] = len(self._revisions)
+        self._revisions.append(revision)
+
+    def add_revision(self, revision):
+        """Add a new revision, which must not have descendants, to the
+        index, updating memoized descendant closures to include it."""
+
+        self._append(revision)
+        bit = self.bits([revision])
+        for include_dependencies in (True, False):
+            ancestors = self.ancestors(
+                [revision], include_dependencies=include_dependencies)
+            closures = self._closures[(True, include_dependencies)]
+            for position, closure in closures.items():
+                if ancestors >> position & 1:
+                    closures[position] = closure | bit
+
+    def bits(self, revisions):
+        """Return the bitset for the given collection of revisions."""
+
+        positions = self._positions
+        return _bits_from_positions(
+            positions[rev.revision] for rev in revisions
+            if rev is not None
+        )
+
+    def revisions(self, bits):
+        """Return the revisions represented by a bitset, in index order."""
+
+        return [self._revisions[pos] for pos in _positions_from_bits(bits)]
+
+    def revision_ids(self, bits):
+        """Return the set of revision identifiers represented by a bitset."""
+
+        return set(
+            self._revisions[pos].revision
+            for pos in _positions_from_bits(bits))
+
+    def ancestors(self, targets, include_dependencies=True, check=False):
+        """Return the bitset of the given revisions and all their
+        ancestors.
+
+        """
+        return self._union(targets, False, include_dependencies, check)
+
+    def descendants(self, targets, include_dependencies=True, check=False):
+        """Return the bitset of the given revisions and all their
+        descendants.
+
+        """
+        return self._union(targets, True, include_dependencies, check)
+
+    def _union(self, targets, is_descendant, include_dependencies, check):
+        targets = [target for target in targets if target is not None]
+        result = 0
+        if check:
+            target_bits = self.bits(targets)
+        for target in targets:
+            closure = self._closure(
+                target, is_descendant, include_dependencies)
+            if check and \
+                    closure & target_bits & ~self.bits([target]):
+                raise RevisionError(
+                    "Requested revision %s overlaps with "
+                    "other requested revisions" % target.revision)
+            result |= closure
+        return result
+
+    def _closure(self, target, is_descendant, include_dependencies):
+        closures = self._closures[(is_descendant, include_dependencies)]
+        positions = self._positions
+        position = positions[target.revision]
+        if position in closures:
+            return closures[position]
+
+        if is_descendant:
+            if include_dependencies:
+                fn = attrgetter('_all_nextrev')
+            else:
+                fn = attrgetter('nextrev')
+        else:
+            if include_dependencies:
+                fn = attrgetter('_all_down_revisions')
+            else:
+                fn = attrgetter('_versioned_down_revisions')
+
+        seen = set([position])
+        known = 0
+        todo = [target]
+        while todo:
+            rev = todo.pop()
+            for rev_id in fn(rev):
+                pos = positions[rev_id]
+                if pos in seen:
+                    continue
+                seen.add(pos)
+                if pos in closures:
+                    known |= closures[pos]
+                else:
+                    todo.append(self._revisions[pos])
+
+        closures[position] = result = known | _bits_from_positions(seen)
+        return result
+
+
+def _bits_from_positions(positions):
+    bits = 0
+    for pos in positions:
+        bits |= 1 << pos
+    return bits
+
+
+def _positions_from_bits(bits):
+    # bin() gives '0b<most significant bit first>'; reverse it
+    # and strip the '0b' so that string offsets are bit positions
+    digits = bin(bits)[:1:-1]
+    pos = digits.find('1')
+    while pos != -1:
+        yield pos
+        pos = digits.find('1', pos + 1)
+
+
 class Revision(object):
     """Base class for revisioned objects.
 
@@ -719,12 +982,23 @@ class Revision(object):
     """Optional string/tuple of symbolic names to apply to this
     revision's branch"""
 
+    squashes = None
+    """For a squashed baseline revision, the revision whose schema it
+    reproduces.
+
+    A squashed revision is not part of the revision graph; it is used
+    in place of that revision and all of its ancestors when upgrading
+    a database which has no version yet.
+
+    """
+
     def __init__(
             self, revision, down_revision,
-            dependencies=None, branch_labels=None):
+            dependencies=None, branch_labels=None, squashes=None):
         self.revision = revision
         self.down_revision = tuple_rev_as_scalar(down_revision)
         self.dependencies = tuple_rev_as_scalar(dependencies)
+        self.squashes = squashes
         self._orig_branch_labels = util.to_tuple(branch_labels, default=())
         self.branch_labels = set(self._orig_branch_labels)
 
@@ -14,6 +14,9 @@ revision = ${repr(up_revision)}
 down_revision = ${repr(down_revision)}
 branch_labels = ${repr(branch_labels)}
 depends_on = ${repr(depends_on)}
+% if squashes:
+squashes = ${repr(squashes)}
+% endif
 
 from alembic import op
 import sqlalchemy as sa
@@ -112,3 +112,10 @@ class SuiteRequirements(Requirements):
             lambda config: not util.sqla_094,
             "SQLAlchemy 0.9.4 or greater required"
         )
+
+    @property
+    def sqlalchemy_100(self):
+        return exclusions.skip_if(
+            lambda config: not util.sqla_100,
+            "SQLAlchemy 1.0.0 or greater required"
+        )
@@ -5,7 +5,8 @@ from .messaging import (  # noqa
     write_outstream, status, err, obfuscate_url_pw, warn, msg, format_as_comma)
 from .pyfiles import (  # noqa
     template_to_file, coerce_resource_to_filename, simple_pyc_file_from_path,
-    pyc_file_from_path, load_python_file)
+    pyc_file_from_path, load_python_file, load_python_source,
+    load_python_compiled)
 from .sqla_compat import (  # noqa
     sqla_07, sqla_079, sqla_08, sqla_083, sqla_084, sqla_09, sqla_092,
     sqla_094, sqla_094, sqla_099, sqla_100, sqla_105)
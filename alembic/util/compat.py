@@ -1,5 +1,7 @@
 import io
+import marshal
 import sys
+import types
 from sqlalchemy import __version__ as sa_version
 
 if sys.version_info < (2, 6):
@@ -50,6 +52,11 @@ else:
 
     range = xrange
 
+if py3k:
+    from inspect import getfullargspec as inspect_getargspec
+else:
+    from inspect import getargspec as inspect_getargspec  # noqa
+
 if py3k:
     from configparser import ConfigParser as SafeConfigParser
     import configparser
@@ -89,6 +96,22 @@ else:
             # no source encoding here
             return mod
 
+try:
+    from importlib.util import MAGIC_NUMBER as pyc_magic
+except ImportError:
+    from imp import get_magic
+    pyc_magic = get_magic()
+
+if sys.version_info >= (3, 7):
+    # magic, flags, mtime, size; see PEP 552
+    _pyc_header_size = 16
+elif py33:
+    # magic, mtime, size
+    _pyc_header_size = 12
+else:
+    # magic, mtime
+    _pyc_header_size = 8
+
 try:
     exec_ = getattr(compat_builtins, 'exec')
 except AttributeError:
@@ -96,6 +119,27 @@ except AttributeError:
     def exec_(func_text, globals_, lcl):
         exec('exec func_text in globals_, lcl')
 
+
+def load_module_source(module_id, source, path):
+    module = types.ModuleType(module_id)
+    module.__file__ = path
+    sys.modules[module_id] = module
+    exec_(compile(source, path, 'exec'), module.__dict__, module.__dict__)
+    if py2k:
+        source_encoding = parse_encoding(io.BytesIO(source))
+        if source_encoding:
+            module._alembic_source_encoding = source_encoding
+    return module
+
+
+def load_module_compiled(module_id, data, path):
+    module = types.ModuleType(module_id)
+    module.__file__ = path
+    sys.modules[module_id] = module
+    code = marshal.loads(data[_pyc_header_size:])
+    exec_(code, module.__dict__, module.__dict__)
+    return module
+
 ################################################
 # cross-compatible metaclass implementation
 # Copyright (c) 2010-2012 Benjamin Peterson
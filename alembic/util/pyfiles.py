@@ -1,7 +1,8 @@
 import sys
 import os
 import re
-from .compat import load_module_py, load_module_pyc
+from .compat import load_module_py, load_module_pyc, load_module_source, \
+    load_module_compiled
 from mako.template import Template
 
 
@@ -78,3 +79,23 @@ def load_python_file(dir_, filename):
         module = load_module_pyc(module_id, path)
     del sys.modules[module_id]
     return module
+
+
+def load_python_source(module_id, source, path):
+    """Load a Python module from the given source, which is not
+    necessarily present on the filesystem; ``path`` is used as the
+    module's filename."""
+
+    module = load_module_source(module_id, source, path)
+    del sys.modules[module_id]
+    return module
+
+
+def load_python_compiled(module_id, data, path):
+    """Load a Python module from the contents of a .pyc or .pyo file,
+    which must have been compiled by the running interpreter; ``path``
+    is used as the module's filename."""
+
+    module = load_module_compiled(module_id, data, path)
+    del sys.modules[module_id]
+    return module
@@ -35,6 +35,26 @@ else:
     from sqlalchemy.sql.expression import _TextClause as TextClause
 
 
+def _prime_reflection_cache(inspector, method, table_name, schema, value):
+    """Store the result of a dialect-level reflection method for a table
+    within the Inspector's cache, so that it is returned from the
+    Inspector rather than being queried for.
+
+    The key mirrors that of the ``sqlalchemy.engine.reflection.cache``
+    decorator used by dialects for the Inspector-invoked methods, as
+    called with the table name and schema only.
+
+    """
+    key = (
+        method,
+        tuple(
+            arg for arg in (table_name, schema)
+            if isinstance(arg, compat.string_types)),
+        ()
+    )
+    inspector.info_cache[key] = value
+
+
 def _table_for_constraint(constraint):
     if isinstance(constraint, ForeignKeyConstraint):
         return constraint.parent
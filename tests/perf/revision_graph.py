@@ -0,0 +1,284 @@
+"""Benchmarks for revision graph operations against large, synthetic
+revision maps.
+
+Graphs are assembled from in-memory :class:`.Revision` objects, so no
+script directory or database is needed.  Each measurement is written as
+one JSON object per line, so that results can be collected and compared
+across runs::
+
+    python -m tests.perf.revision_graph
+    python -m tests.perf.revision_graph --sizes 100,1000 --shapes linear
+    python -m tests.perf.revision_graph --format text
+
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+
+import alembic
+from alembic.script import ScriptDirectory
+from alembic.script.revision import Revision, RevisionMap
+
+
+class GraphShape(object):
+    """Produces revision constructor arguments for a graph of roughly
+    the requested size, along with identifiers to run operations against.
+
+    """
+
+    name = None
+
+    label = "main"
+
+    def __init__(self, size):
+        self.size = size
+        self.specs = list(self._generate())
+
+        # a revision along the labeled branch, used as the start / stop
+        # point for ranges and stamps; kept far enough from the head
+        # that relative "+5" ranges are satisfied on small graphs
+        labeled = self._labeled_revisions()
+        self.midpoint = labeled[max(0, len(labeled) // 2 - 5)]
+
+    def _labeled_revisions(self):
+        return [spec[0] for spec in self.specs]
+
+    def _generate(self):
+        raise NotImplementedError()
+
+    def revisions(self):
+        for rev_id, down_revision, dependencies, branch_labels in self.specs:
+            yield Revision(
+                rev_id, down_revision,
+                dependencies=dependencies, branch_labels=branch_labels)
+
+    def revision_map(self):
+        map_ = RevisionMap(self.revisions)
+        map_._revision_map
+        return map_
+
+
+class Linear(GraphShape):
+    """A single unbranched chain."""
+
+    name = "linear"
+
+    def _generate(self):
+        down = ()
+        for idx in range(self.size):
+            rev_id = "r%d" % idx
+            yield rev_id, down, None, self.label if not idx else None
+            down = rev_id
+
+
+class BranchMerge(GraphShape):
+    """A trunk that repeatedly fans out into parallel branches which are
+    merged back together."""
+
+    name = "branch_merge"
+
+    width = 8
+    length = 4
+
+    def _generate(self):
+        count = 0
+        down = ()
+        while count < self.size:
+            point = "bp%d" % count
+            yield point, down, None, self.label if not count else None
+            count += 1
+
+            tips = []
+            for branch in range(self.width):
+                down = point
+                for idx in range(self.length):
+                    rev_id = "%s_%d_%d" % (point, branch, idx)
+                    yield rev_id, down, None, None
+                    down = rev_id
+                    count += 1
+                tips.append(down)
+
+            down = "mp%d" % count
+            yield down, tuple(tips), None, None
+            count += 1
+
+    def _labeled_revisions(self):
+        # revisions along the trunk only
+        return [
+            spec[0] for spec in self.specs
+            if spec[0].startswith(("bp", "mp"))]
+
+
+class CrossDependency(GraphShape):
+    """Several independently-based, labeled branches which depend on
+    each other at regular intervals via ``depends_on``."""
+
+    name = "cross_dependency"
+
+    branches = 10
+    depends_every = 20
+
+    label = "b0"
+
+    def _generate(self):
+        tips = [None] * self.branches
+        for idx in range(self.size):
+            branch = idx % self.branches
+            position = idx // self.branches
+            rev_id = "b%d_%d" % (branch, position)
+
+            dependencies = None
+            other = tips[(branch + 1) % self.branches]
+            if position and not position % self.depends_every and other:
+                dependencies = other
+
+            yield (
+                rev_id, tips[branch] or (), dependencies,
+                "b%d" % branch if not position else None
+            )
+            tips[branch] = rev_id
+
+    def _labeled_revisions(self):
+        return [
+            spec[0] for spec in self.specs if spec[0].startswith("b0_")]
+
+
+shapes = dict(
+    (shape.name, shape) for shape in [Linear, BranchMerge, CrossDependency])
+
+
+def _script_directory(map_):
+    # _stamp_revs lives on ScriptDirectory; give it the in-memory map
+    script = ScriptDirectory(tempfile.gettempdir())
+    script.revision_map = map_
+    return script
+
+
+def _op_build(graph, map_):
+    return graph.revision_map
+
+
+def _op_heads(graph, map_):
+    return lambda: map_.get_revisions("heads")
+
+
+def _op_iterate_up(graph, map_):
+    return lambda: list(
+        map_.iterate_revisions("%s@+5" % graph.label, graph.midpoint))
+
+
+def _op_iterate_down(graph, map_):
+    head = map_.get_current_head(graph.label)
+    return lambda: list(
+        map_.iterate_revisions(head, "%s@-3" % graph.label))
+
+
+def _op_stamp(graph, map_):
+    script = _script_directory(map_)
+    return lambda: script._stamp_revs(graph.midpoint, map_._real_heads)
+
+
+def _op_filter_for_lineage(graph, map_):
+    return lambda: map_.filter_for_lineage(map_._real_heads, graph.midpoint)
+
+
+operations = [
+    ("build", _op_build),
+    ("get_heads", _op_heads),
+    ("iterate_relative_up", _op_iterate_up),
+    ("iterate_relative_down", _op_iterate_down),
+    ("stamp_revs", _op_stamp),
+    ("filter_for_lineage", _op_filter_for_lineage),
+]
+
+
+def run(shape_names, sizes, repeat, operation_names=None):
+    """Run benchmarks, yielding a result dictionary per measurement.
+
+    Each repetition of an operation other than "build" runs against a
+    newly built revision map, so that timings include the cost of any
+    memoized structures the operation relies upon, as is the case for
+    a single ``alembic`` command invocation.
+
+    """
+    for shape_name in shape_names:
+        for size in sizes:
+            graph = shapes[shape_name](size)
+            for op_name, op in operations:
+                if operation_names and op_name not in operation_names:
+                    continue
+                timings = []
+                for i in range(repeat):
+                    if op_name == "build":
+                        fn = op(graph, None)
+                    else:
+                        fn = op(graph, graph.revision_map())
+                    start = time.time()
+                    fn()
+                    timings.append(time.time() - start)
+
+                yield {
+                    "shape": shape_name,
+                    "size": size,
+                    "nodes": len(graph.specs),
+                    "operation": op_name,
+                    "repeat": repeat,
+                    "min": min(timings),
+                    "max": max(timings),
+                    "mean": sum(timings) / len(timings),
+                    "alembic_version": alembic.__version__,
+                    "python_version": "%d.%d.%d" % sys.version_info[0:3],
+                }
+
+
+def _csv(type_):
+    def convert(value):
+        return [type_(elem) for elem in value.split(",") if elem]
+    return convert
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark revision graph operations")
+    parser.add_argument(
+        "--shapes", type=_csv(str), default=sorted(shapes),
+        help="comma-separated graph shapes; one or more of %s" %
+        ", ".join(sorted(shapes)))
+    parser.add_argument(
+        "--sizes", type=_csv(int), default=[100, 1000, 10000, 50000],
+        help="comma-separated approximate node counts")
+    parser.add_argument(
+        "--operations", type=_csv(str), default=None,
+        help="comma-separated operations to run; one or more of %s" %
+        ", ".join(name for name, op in operations))
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="number of times each operation is timed")
+    parser.add_argument(
+        "--format", choices=["json", "text"], default="json",
+        help="json (one object per line) or a text table")
+    parser.add_argument(
+        "--output", type=argparse.FileType("w"), default=sys.stdout,
+        help="file to write results to; defaults to stdout")
+    options = parser.parse_args(argv)
+
+    for shape_name in options.shapes:
+        if shape_name not in shapes:
+            parser.error("unknown shape: %s" % shape_name)
+
+    for result in run(
+            options.shapes, options.sizes, options.repeat,
+            options.operations):
+        if options.format == "json":
+            options.output.write(json.dumps(result, sort_keys=True) + "\n")
+        else:
+            options.output.write(
+                "%(shape)-18s %(nodes)8d %(operation)-22s "
+                "min %(min).6f  mean %(mean).6f\n" % result)
+        options.output.flush()
+
+
+if __name__ == "__main__":
+    main()
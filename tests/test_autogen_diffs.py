@@ -1,5 +1,9 @@
+import os
 import sys
+import re
+import threading
 
+from sqlalchemy import event, create_engine
 from sqlalchemy import MetaData, Column, Table, Integer, String, Text, \
     Numeric, CHAR, ForeignKey, INTEGER, Index, UniqueConstraint, \
     TypeDecorator, CheckConstraint, text, PrimaryKeyConstraint
@@ -7,13 +11,18 @@ from sqlalchemy.types import NULLTYPE
 from sqlalchemy.engine.reflection import Inspector
 
 from alembic import autogenerate
+from alembic.autogenerate.fingerprint import _option_state
 from alembic.migration import MigrationContext
+from alembic.ddl.impl import DefaultImpl
 from alembic.testing import TestBase
 from alembic.testing import config
 from alembic.testing import assert_raises_message
-from alembic.testing.mock import Mock
+from alembic.testing.mock import Mock, patch
 from alembic.testing import eq_
 from alembic.util import CommandError
+from alembic.util.compat import exec_
+from alembic.testing.env import staging_env, clear_staging_env, \
+    _sqlite_file_db
 from ._autogen_fixtures import \
     AutogenTest, AutogenFixtureTest, _default_object_filters
 
@@ -134,6 +143,27 @@ class AutogenCrossSchemaTest(AutogenTest, TestBase):
         eq_(diffs[0][0], "remove_table")
         eq_(diffs[0][1].schema, config.test_schema)
 
+    def test_schema_omitted_by_name(self):
+        diffs = []
+
+        def include_name(name, type_, parent_names):
+            if type_ == "schema":
+                return name is None
+            else:
+                return True
+
+        self.autogen_context.update({
+            'object_filters': [],
+            'name_filters': [include_name],
+            'include_schemas': True,
+            'metadata': self.m2
+        })
+        autogenerate._produce_net_changes(self.autogen_context, diffs)
+        eq_(
+            sorted((d[0], d[1].schema, d[1].name) for d in diffs),
+            [('add_table', None, 't3'), ('remove_table', None, 't1')]
+        )
+
 
 class AutogenDefaultSchemaTest(AutogenFixtureTest, TestBase):
     __only_on__ = 'postgresql'
@@ -187,6 +217,399 @@ class AutogenDefaultSchemaTest(AutogenFixtureTest, TestBase):
         eq_(diffs[0][1].c.keys(), ['x'])
 
 
+class AutogenBulkReflectionTest(AutogenFixtureTest, TestBase):
+    __only_on__ = 'sqlite'
+
+    def _tables(self):
+        m1 = MetaData()
+        m2 = MetaData()
+        for m in (m1, m2):
+            Table('a', m, Column('id', Integer, primary_key=True),
+                  Column('x', Integer))
+            Table('b', m, Column('id', Integer, primary_key=True),
+                  Column('a_id', Integer, ForeignKey('a.id')))
+            Table('c', m, Column('id', Integer, primary_key=True),
+                  Column('b_id', Integer, ForeignKey('b.id')))
+        return m1, m2
+
+    def test_hook_receives_tables_by_schema(self):
+        m1, m2 = self._tables()
+        with patch(
+                "alembic.ddl.sqlite.SQLiteImpl.autogen_reflect_tables",
+                return_value=None) as hook:
+            diffs = self._fixture(m1, m2)
+        eq_(diffs, [])
+        eq_(
+            [(call[0][1], call[0][2]) for call in hook.call_args_list],
+            [(None, ['a', 'b', 'c'])]
+        )
+
+    def test_reflected_info_used(self):
+        m1, m2 = self._tables()
+        reflected = {
+            'a': {
+                'indexes': [
+                    {'name': 'ix_bulk', 'unique': False,
+                     'column_names': ['x']}
+                ]
+            }
+        }
+        with patch(
+                "alembic.ddl.sqlite.SQLiteImpl.autogen_reflect_tables",
+                return_value=reflected):
+            diffs = self._fixture(m1, m2)
+        eq_(diffs[0][0], "remove_index")
+        eq_(diffs[0][1].name, "ix_bulk")
+        eq_(diffs[0][1].table.name, "a")
+
+    def test_reflection_order(self):
+        m1, m2 = self._tables()
+        m1.create_all(self.bind)
+        self.metadata = m1
+        inspector = Inspector.from_engine(self.bind)
+        eq_(
+            autogenerate.compare._reflection_order(
+                set([(None, 'c'), (None, 'b'), (None, 'a')]), inspector),
+            [(None, 'a'), (None, 'b'), (None, 'c')]
+        )
+        eq_(
+            autogenerate.compare._reflection_order(
+                set([(None, 'c'), (None, 'a')]), inspector),
+            [(None, 'a'), (None, 'c')]
+        )
+
+
+class AutogenConcurrentReflectionTest(TestBase):
+    __only_on__ = 'sqlite'
+
+    def setUp(self):
+        staging_env()
+        self.bind = _sqlite_file_db()
+
+        self.m1 = MetaData()
+        self.m2 = MetaData()
+        for idx in range(6):
+            Table('t%d' % idx, self.m1,
+                  Column('id', Integer, primary_key=True),
+                  Column('x', String(20)),
+                  Column('parent_id', Integer,
+                         ForeignKey('t%d.id' % (idx - 1)) if idx else None),
+                  Index('ix_t%d_x' % idx, 'x'))
+            Table('t%d' % idx, self.m2,
+                  Column('id', Integer, primary_key=True),
+                  Column('x', String(20), nullable=False),
+                  Column('y', Integer),
+                  UniqueConstraint('x', name='uq_t%d_x' % idx))
+        self.m1.create_all(self.bind)
+
+    def tearDown(self):
+        self.m1.drop_all(self.bind)
+        clear_staging_env()
+
+    def _diffs(self, workers):
+        with self.bind.connect() as conn:
+            context = MigrationContext.configure(
+                connection=conn,
+                opts={
+                    'compare_type': True,
+                    'autogenerate_workers': workers
+                })
+            autogen_context = {
+                'imports': set(),
+                'connection': conn,
+                'dialect': conn.dialect,
+                'context': context,
+                'metadata': self.m2,
+                'object_filters': _default_object_filters,
+                'include_schemas': False
+            }
+            diffs = []
+            autogenerate._produce_net_changes(autogen_context, diffs)
+            return [
+                re.sub(r" at 0x[0-9a-f]+", "", repr(diff)) for diff in diffs]
+
+    def test_same_diffs(self):
+        eq_(self._diffs(3), self._diffs(None))
+
+    def test_reflects_in_worker_threads(self):
+        main_statements = []
+        worker_statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *arg):
+            if threading.current_thread() is main_thread:
+                main_statements.append(statement)
+            else:
+                worker_statements.append(statement)
+
+        main_thread = threading.current_thread()
+
+        event.listen(
+            self.bind, "before_cursor_execute", before_cursor_execute)
+        try:
+            self._diffs(3)
+        finally:
+            event.remove(
+                self.bind, "before_cursor_execute", before_cursor_execute)
+        eq_(
+            [stmt for stmt in main_statements if stmt.startswith("PRAGMA")],
+            [])
+        assert [
+            stmt for stmt in worker_statements if stmt.startswith("PRAGMA")]
+
+    def test_memory_database_not_concurrent(self):
+        eq_(
+            autogenerate.compare._supports_concurrent_reflection(
+                create_engine("sqlite://")),
+            False)
+        eq_(
+            autogenerate.compare._supports_concurrent_reflection(self.bind),
+            True)
+
+
+class AutogenIncludeNameTest(TestBase):
+    __only_on__ = 'sqlite'
+
+    def setUp(self):
+        staging_env()
+        self.bind = config.db
+
+        self.m1 = MetaData()
+        self.m2 = MetaData()
+        Table('a', self.m1, Column('id', Integer, primary_key=True))
+        Table('legacy_1', self.m1, Column('id', Integer, primary_key=True))
+        Table('legacy_2', self.m1, Column('id', Integer, primary_key=True))
+        Table('a', self.m2, Column('id', Integer, primary_key=True),
+              Column('x', Integer))
+        Table('b', self.m2, Column('id', Integer, primary_key=True))
+        Table('legacy_2', self.m2, Column('id', Integer, primary_key=True),
+              Column('x', Integer))
+        Table('legacy_3', self.m2, Column('id', Integer, primary_key=True))
+        self.m1.create_all(self.bind)
+
+    def tearDown(self):
+        self.m1.drop_all(self.bind)
+        clear_staging_env()
+
+    def test_names_omitted_before_reflection(self):
+        calls = []
+
+        def include_name(name, type_, parent_names):
+            calls.append((name, type_, parent_names))
+            return not name.startswith("legacy_")
+
+        with self.bind.connect() as conn:
+            context = MigrationContext.configure(
+                connection=conn,
+                opts={'include_name': include_name})
+            with patch.object(
+                    Inspector, "reflecttable", autospec=True,
+                    side_effect=Inspector.reflecttable) as reflecttable:
+                diffs = autogenerate.compare_metadata(context, self.m2)
+
+        eq_(
+            [call[0][1].name for call in reflecttable.call_args_list],
+            ['a']
+        )
+        eq_(
+            [(diff[0], diff[1]) if diff[0] == 'add_table'
+             else (diff[0], diff[2], diff[3].name) for diff in diffs],
+            [('add_table', self.m2.tables['b']), ('add_column', 'a', 'x')]
+        )
+        eq_(
+            sorted(call for call in calls if call[0] == 'legacy_1'),
+            [('legacy_1', 'table', {'schema_name': None})]
+        )
+
+
+class ComparisonCacheOptionStateTest(TestBase):
+    source = """
+def include_object(object_, name, type_, reflected, compare_to):
+    return not any(name.startswith(prefix) for prefix in ('tmp_', 'old_'))
+"""
+
+    def _include_object(self, source):
+        namespace = {}
+        exec_(compile(source, "env.py", "exec"), namespace, namespace)
+        return namespace['include_object']
+
+    def test_state_stable_across_compilations(self):
+        fn1 = self._include_object(self.source)
+        fn2 = self._include_object(self.source)
+        assert fn1.__code__ is not fn2.__code__
+        eq_(_option_state(fn1), _option_state(fn2))
+
+    def test_state_follows_code(self):
+        fn1 = self._include_object(self.source)
+        fn2 = self._include_object(self.source.replace('old_', 'new_'))
+        assert _option_state(fn1) != _option_state(fn2)
+
+
+class AutogenComparisonCacheTest(TestBase):
+    __only_on__ = 'sqlite'
+
+    def setUp(self):
+        self.env = staging_env()
+        self.bind = _sqlite_file_db()
+        self.cache = os.path.join(self.env.dir, "autogen_cache.json")
+
+        self.m1 = MetaData()
+        self.m2 = MetaData()
+        for m in (self.m1, self.m2):
+            Table('a', m, Column('id', Integer, primary_key=True),
+                  Column('x', String(20)))
+            Table('b', m, Column('id', Integer, primary_key=True),
+                  Column('a_id', Integer, ForeignKey('a.id')))
+        Table('c', self.m1, Column('id', Integer, primary_key=True))
+        Table('c', self.m2, Column('id', Integer, primary_key=True),
+              Column('y', Integer))
+        self.m1.create_all(self.bind)
+
+    def tearDown(self):
+        self.m1.drop_all(self.bind)
+        self.bind.execute("drop table if exists alembic_version")
+        clear_staging_env()
+
+    def _compare(self, **opts):
+        opts.update(compare_type=True, autogenerate_cache=self.cache)
+        with self.bind.connect() as conn:
+            context = MigrationContext.configure(connection=conn, opts=opts)
+            with patch.object(
+                    Inspector, "reflecttable", autospec=True,
+                    side_effect=Inspector.reflecttable) as reflecttable:
+                diffs = autogenerate.compare_metadata(context, self.m2)
+        return (
+            sorted(call[0][1].name for call in reflecttable.call_args_list),
+            [(diff[0], diff[2], diff[3].name) for diff in diffs]
+        )
+
+    def test_unchanged_tables_skipped(self):
+        eq_(
+            self._compare(),
+            (['a', 'b', 'c'], [('add_column', 'c', 'y')])
+        )
+        eq_(
+            self._compare(),
+            (['c'], [('add_column', 'c', 'y')])
+        )
+
+    def test_metadata_change(self):
+        self._compare()
+        self.m2.tables['a'].append_column(Column('z', Integer))
+        eq_(
+            self._compare(),
+            (['a', 'c'], [('add_column', 'a', 'z'), ('add_column', 'c', 'y')])
+        )
+
+    def test_filter_change(self):
+        def skip_z(object_, name, type_, reflected, compare_to):
+            return name != 'z'
+
+        def skip_y(object_, name, type_, reflected, compare_to):
+            return name != 'y'
+
+        self.m2.tables['a'].append_column(Column('z', Integer))
+        eq_(
+            self._compare(include_object=skip_z),
+            (['a', 'b', 'c'], [('add_column', 'c', 'y')])
+        )
+        eq_(
+            self._compare(include_object=skip_y),
+            (['a', 'b', 'c'], [('add_column', 'a', 'z')])
+        )
+
+    def test_database_revision_change(self):
+        self._compare()
+        self.bind.execute(
+            "create table alembic_version "
+            "(version_num varchar(32) not null)")
+        self.bind.execute("insert into alembic_version values ('abc')")
+        eq_(
+            self._compare(),
+            (['a', 'b', 'c'], [('add_column', 'c', 'y')])
+        )
+        eq_(
+            self._compare(),
+            (['c'], [('add_column', 'c', 'y')])
+        )
+
+
+class AutogenServerDefaultBatchTest(AutogenFixtureTest, TestBase):
+    __only_on__ = 'sqlite'
+
+    def _tables(self):
+        m1 = MetaData()
+        m2 = MetaData()
+        Table('a', m1, Column('id', Integer, primary_key=True),
+              Column('p', String(10), server_default='1'),
+              Column('q', String(10), server_default='1'),
+              Column('r', String(10), server_default='1'))
+        Table('b', m1, Column('id', Integer, primary_key=True),
+              Column('s', String(10), server_default='1'))
+        Table('a', m2, Column('id', Integer, primary_key=True),
+              Column('p', String(10), server_default='2'),
+              Column('q', String(20), server_default='2'),
+              Column('r', String(10), server_default='1'))
+        Table('b', m2, Column('id', Integer, primary_key=True),
+              Column('s', String(10), server_default='2'))
+        return m1, m2
+
+    def test_compared_in_one_call(self):
+        m1, m2 = self._tables()
+        with patch.object(
+                DefaultImpl, "compare_server_defaults", autospec=True,
+                side_effect=DefaultImpl.compare_server_defaults) as compare:
+            diffs = self._fixture(m1, m2)
+
+        eq_(compare.call_count, 1)
+        eq_(
+            [(c[1].table.name, c[1].name) for c in compare.call_args[0][1]],
+            [('a', 'p'), ('a', 'q'), ('a', 'r'), ('b', 's')]
+        )
+
+        eq_(
+            [[(d[0], d[2], d[3]) for d in col_diff] for col_diff in diffs],
+            [
+                [('modify_default', 'a', 'p')],
+                [('modify_type', 'a', 'q'), ('modify_default', 'a', 'q')],
+                [('modify_default', 'b', 's')]
+            ]
+        )
+        eq_(diffs[0][0][5], "'1'")
+        eq_(diffs[0][0][6].arg, '2')
+
+    def test_user_compare_server_default(self):
+        m1, m2 = self._tables()
+
+        def compare_server_default(context, inspected_column, metadata_column,
+                                   inspected_default, metadata_default,
+                                   rendered_metadata_default):
+            if metadata_column.name == 'p':
+                return False
+            elif metadata_column.name == 'r':
+                return True
+            return None
+
+        with patch.object(
+                DefaultImpl, "compare_server_defaults", autospec=True,
+                side_effect=DefaultImpl.compare_server_defaults) as compare:
+            diffs = self._fixture(
+                m1, m2,
+                opts={'compare_server_default': compare_server_default})
+
+        eq_(
+            [(c[1].table.name, c[1].name) for c in compare.call_args[0][1]],
+            [('a', 'q'), ('b', 's')]
+        )
+        eq_(
+            [[(d[0], d[2], d[3]) for d in col_diff] for col_diff in diffs],
+            [
+                [('modify_type', 'a', 'q'), ('modify_default', 'a', 'q')],
+                [('modify_default', 'a', 'r')],
+                [('modify_default', 'b', 's')]
+            ]
+        )
+
+
 class ModelOne(object):
     __requires__ = ('unique_constraint_reflection', )
 
@@ -0,0 +1,238 @@
+import json
+import os
+import re
+
+from sqlalchemy import MetaData, Column, Table, Integer, String, Numeric, \
+    ForeignKey, Index, UniqueConstraint, text
+from sqlalchemy.types import NullType
+
+from alembic import autogenerate, command
+from alembic.autogenerate import SnapshotInspector
+from alembic.migration import MigrationContext
+from alembic.testing import TestBase
+from alembic.testing import assert_raises_message
+from alembic.testing import eq_
+from alembic.testing import mock
+from alembic.testing.env import staging_env, clear_staging_env, \
+    _sqlite_file_db, _sqlite_testing_config, env_file_fixture
+from alembic.util import CommandError
+
+
+class SnapshotTest(TestBase):
+    __only_on__ = 'sqlite'
+
+    def setUp(self):
+        self.env = staging_env()
+        self.bind = _sqlite_file_db()
+        self.path = os.path.join(self.env.dir, "schema.json")
+
+        self.m1 = MetaData()
+        Table('account', self.m1,
+              Column('id', Integer, primary_key=True),
+              Column('name', String(50), nullable=False),
+              Column('balance', Numeric(10, 2), server_default="0"),
+              UniqueConstraint('name', name='uq_account_name'))
+        Table('address', self.m1,
+              Column('id', Integer, primary_key=True),
+              Column('account_id', Integer, ForeignKey('account.id')),
+              Column('email', String(50)),
+              Index('ix_address_email', 'email'))
+        Table('legacy', self.m1,
+              Column('id', Integer, primary_key=True))
+        Table('alembic_version', self.m1,
+              Column('version_num', String(32), nullable=False))
+        self.m1.create_all(self.bind)
+
+        self.m2 = MetaData()
+        Table('account', self.m2,
+              Column('id', Integer, primary_key=True),
+              Column('name', String(80), nullable=True),
+              Column('balance', Numeric(10, 2), server_default="5"),
+              Column('active', Integer))
+        Table('address', self.m2,
+              Column('id', Integer, primary_key=True),
+              Column('account_id', Integer, ForeignKey('account.id')),
+              Column('email', String(50)),
+              Index('ix_address_account_id', 'account_id'))
+        Table('user', self.m2,
+              Column('id', Integer, primary_key=True))
+
+    def tearDown(self):
+        self.m1.drop_all(self.bind)
+        clear_staging_env()
+
+    def _context(self, **opts):
+        opts.update(compare_type=True, compare_server_default=True)
+        return MigrationContext.configure(self.bind.connect(), opts=opts)
+
+    def _write_snapshot(self, **opts):
+        return autogenerate.write_snapshot(self._context(**opts), self.path)
+
+    def _diffs(self, context):
+        return [
+            re.sub(r" at 0x[0-9a-f]+", "", repr(diff))
+            for diff in autogenerate.compare_metadata(context, self.m2)
+        ]
+
+    def test_snapshot_contents(self):
+        self._write_snapshot()
+        with open(self.path) as file_:
+            snapshot = json.load(file_)
+
+        eq_(snapshot['dialect'], 'sqlite')
+        eq_([schema['name'] for schema in snapshot['schemas']], [None])
+        tables = snapshot['schemas'][0]['tables']
+        eq_(sorted(tables), ['account', 'address', 'legacy'])
+        eq_(
+            [(col['name'], col['type'], col['nullable'], col['default'])
+             for col in tables['account']['columns']],
+            [('id', {'name': 'INTEGER', 'args': [], 'kwargs': {}},
+              False, None),
+             ('name', {'name': 'VARCHAR', 'args': [],
+                       'kwargs': {'length': 50}}, False, None),
+             ('balance', {'name': 'NUMERIC', 'args': [],
+                          'kwargs': {'precision': 10, 'scale': 2}},
+              True, "'0'")]
+        )
+        eq_(
+            [idx['name'] for idx in tables['address']['indexes']],
+            ['ix_address_email']
+        )
+
+    def test_same_diffs_as_database(self):
+        self._write_snapshot()
+        eq_(
+            self._diffs(self._context(schema_snapshot=self.path)),
+            self._diffs(self._context())
+        )
+
+    def test_offline_compare(self):
+        self._write_snapshot()
+        context = MigrationContext.configure(
+            dialect_name="sqlite",
+            opts={
+                'as_sql': True,
+                'compare_type': True,
+                'compare_server_default': True,
+                'schema_snapshot': self.path
+            })
+        eq_(self._diffs(context), self._diffs(self._context()))
+
+    def test_offline_compare_requires_snapshot(self):
+        context = MigrationContext.configure(
+            dialect_name="sqlite", opts={'as_sql': True})
+        assert_raises_message(
+            CommandError,
+            "autogenerate can't use as_sql=True",
+            autogenerate.compare_metadata, context, self.m2
+        )
+
+    def test_include_name_keeps_foreign_key_targets(self):
+        def include_name(name, type_, parent_names):
+            return name == 'address'
+
+        snapshot = self._write_snapshot(include_name=include_name)
+        eq_(
+            sorted(snapshot['schemas'][0]['tables']),
+            ['account', 'address']
+        )
+
+    def test_inspector(self):
+        self._write_snapshot()
+        insp = SnapshotInspector.from_file(self.path, self.bind.dialect)
+        eq_(insp.get_table_names(), ['account', 'address', 'legacy'])
+        eq_(
+            insp.get_pk_constraint('account')['constrained_columns'],
+            ['id']
+        )
+        eq_(
+            [(fk['referred_table'], fk['referred_columns'])
+             for fk in insp.get_foreign_keys('address')],
+            [('account', ['id'])]
+        )
+
+        t = Table('address', MetaData())
+        insp.reflecttable(t, None)
+        eq_(sorted(t.c.keys()), ['account_id', 'email', 'id'])
+        eq_(sorted(t.metadata.tables), ['account', 'address'])
+
+    def test_types_from_dialect(self):
+        self._write_snapshot()
+        insp = SnapshotInspector.from_file(self.path, self.bind.dialect)
+        eq_(
+            [repr(col['type']) for col in insp.get_columns('account')],
+            ['INTEGER()', 'VARCHAR(length=50)',
+             'NUMERIC(precision=10, scale=2)']
+        )
+
+    def test_type_not_evaluated(self):
+        self._write_snapshot()
+        with open(self.path) as file_:
+            snapshot = json.load(file_)
+        snapshot['schemas'][0]['tables']['legacy']['columns'][0]['type'] = {
+            'name': '__import__', 'args': ['os'], 'kwargs': {}}
+        insp = SnapshotInspector(snapshot, self.bind.dialect)
+        with mock.patch("alembic.util.warn") as warn:
+            columns = insp.get_columns('legacy')
+        eq_(
+            warn.mock_calls,
+            [mock.call(
+                "Did not recognize type '__import__' in schema snapshot")]
+        )
+        assert isinstance(columns[0]['type'], NullType)
+
+    def test_dialect_mismatch(self):
+        self._write_snapshot()
+        context = MigrationContext.configure(
+            dialect_name="postgresql", opts={'as_sql': True})
+        assert_raises_message(
+            CommandError,
+            "Schema snapshot was taken from a sqlite database; can't "
+            "compare it using the postgresql dialect",
+            SnapshotInspector.from_file, self.path, context.dialect
+        )
+
+    def test_snapshot_command(self):
+        env_file_fixture("""
+
+from sqlalchemy import engine_from_config
+
+engine = engine_from_config(
+    config.get_section(config.config_ini_section),
+    prefix='sqlalchemy.')
+
+connection = engine.connect()
+
+context.configure(connection=connection)
+
+try:
+    with context.begin_transaction():
+        context.run_migrations()
+finally:
+    connection.close()
+
+""")
+        cfg = _sqlite_testing_config()
+        command.snapshot(cfg, self.path)
+
+        insp = SnapshotInspector.from_file(self.path, self.bind.dialect)
+        eq_(insp.get_table_names(), ['account', 'address', 'legacy'])
+
+
+class PGOfflineDefaultCompareTest(TestBase):
+
+    def test_defaults_compared_as_rendered(self):
+        context = MigrationContext.configure(
+            dialect_name="postgresql", opts={'as_sql': True})
+        t = Table('t', MetaData(),
+                  Column('a', String(), server_default="hello"),
+                  Column('b', Integer, server_default=text("5")),
+                  Column('c', Integer, server_default=text("5")))
+        eq_(
+            context.impl.compare_server_defaults([
+                (t.c.a, t.c.a, "hello", "'hello'::character varying"),
+                (t.c.b, t.c.b, "5", "5"),
+                (t.c.c, t.c.c, "5", "6"),
+            ]),
+            [False, False, True]
+        )
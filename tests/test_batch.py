@@ -7,8 +7,12 @@ from alembic.testing import TestBase, eq_, config
 from alembic.testing.fixtures import op_fixture
 from alembic.testing import mock
 from alembic.operations import Operations
-from alembic.operations.batch import ApplyBatchImpl
+from alembic.operations.batch import ApplyBatchImpl, BatchOperationsImpl
 from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from alembic.testing.env import staging_env, clear_staging_env, \
+    _sqlite_file_db, _sqlite_testing_config, write_script, env_file_fixture
+from alembic import command, util
 
 
 from sqlalchemy import Integer, Table, Column, String, MetaData, ForeignKey, \
@@ -17,7 +21,7 @@ from sqlalchemy import Integer, Table, Column, String, MetaData, ForeignKey, \
 from sqlalchemy.engine.reflection import Inspector
 from sqlalchemy.sql import column, text
 from sqlalchemy.schema import CreateTable, CreateIndex
-from sqlalchemy import exc
+from sqlalchemy import exc, event
 
 
 class BatchApplyTest(TestBase):
@@ -499,7 +503,9 @@ class BatchAPITest(TestBase):
     @contextmanager
     def _fixture(self, schema=None):
         migration_context = mock.Mock(
-            opts={}, impl=mock.MagicMock(__dialect__='sqlite'))
+            opts={}, impl=mock.MagicMock(__dialect__='sqlite'),
+            _pending_batches={}, _coalesce_batch_recreates=False,
+            _batch_tables=None)
         op = Operations(migration_context)
         batch = op.batch_alter_table(
             'tname', recreate='never', schema=schema).__enter__()
@@ -754,6 +760,33 @@ class CopyFromTest(TestBase):
             'ALTER TABLE _alembic_batch_temp RENAME TO foo'
         )
 
+    def test_defer_indexes(self):
+        context = self._fixture()
+        Index('ix_x', self.table.c.x)
+        with mock.patch("alembic.operations.batch.log") as log:
+            with self.op.batch_alter_table(
+                    "foo", copy_from=self.table, recreate='always',
+                    defer_indexes=True) as batch_op:
+                batch_op.alter_column('data', new_column_name='newdata')
+                batch_op.create_index('ix_id', ['id'], unique=True)
+
+        context.assert_(
+            'CREATE TABLE _alembic_batch_temp (id INTEGER NOT NULL, '
+            'newdata VARCHAR(50), x INTEGER, PRIMARY KEY (id))',
+            'INSERT INTO _alembic_batch_temp (id, newdata, x) '
+            'SELECT foo.id, foo.data, foo.x FROM foo',
+            'DROP TABLE foo',
+            'ALTER TABLE _alembic_batch_temp RENAME TO foo',
+            'CREATE INDEX ix_x ON foo (x)',
+            'CREATE UNIQUE INDEX ix_id ON foo (id)'
+        )
+        eq_(
+            [re.sub(r"[\d.]+s", "Ns", call[1][2])
+             for call in log.info.mock_calls],
+            ["create table Ns, copy rows Ns, replace table Ns, "
+             "build indexes Ns"]
+        )
+
     def test_create_drop_index_wo_always(self):
         context = self._fixture()
         with self.op.batch_alter_table(
@@ -812,6 +845,114 @@ class CopyFromTest(TestBase):
         )
 
 
+class BatchCombineAltersTest(TestBase):
+    __requires__ = ('sqlalchemy_08', )
+
+    def _fixture(self, dialect, as_sql=False, combine=True):
+        context = op_fixture(dialect=dialect, as_sql=as_sql)
+        context.opts['combine_batch_alters'] = combine
+        self.op = Operations(context)
+        return context
+
+    def _alters(self, **kw):
+        with self.op.batch_alter_table("foo", **kw) as batch_op:
+            batch_op.alter_column(
+                'data', type_=String(100), existing_type=String(50),
+                nullable=False)
+            batch_op.add_column(Column('y', Integer))
+            batch_op.drop_column('x')
+            batch_op.alter_column(
+                'q', server_default='5', existing_type=Integer)
+
+    def test_postgresql(self):
+        context = self._fixture('postgresql')
+        self._alters()
+        context.assert_(
+            'ALTER TABLE foo ALTER COLUMN data SET NOT NULL, '
+            'ALTER COLUMN data TYPE VARCHAR(100), '
+            'ADD COLUMN y INTEGER, DROP COLUMN x, '
+            "ALTER COLUMN q SET DEFAULT '5'"
+        )
+
+    def test_postgresql_offline(self):
+        context = self._fixture('postgresql', as_sql=True)
+        self._alters(recreate="never")
+        context.assert_(
+            'ALTER TABLE foo ALTER COLUMN data SET NOT NULL, '
+            'ALTER COLUMN data TYPE VARCHAR(100), '
+            'ADD COLUMN y INTEGER, DROP COLUMN x, '
+            "ALTER COLUMN q SET DEFAULT '5'"
+        )
+
+    def test_postgresql_rename_not_combined(self):
+        context = self._fixture('postgresql')
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.alter_column('data', nullable=False)
+            batch_op.alter_column('x', new_column_name='y')
+            batch_op.drop_column('q')
+            batch_op.drop_column('r')
+        context.assert_(
+            'ALTER TABLE foo ALTER COLUMN data SET NOT NULL',
+            'ALTER TABLE foo RENAME x TO y',
+            'ALTER TABLE foo DROP COLUMN q, DROP COLUMN r'
+        )
+
+    def test_mysql(self):
+        context = self._fixture('mysql')
+        self._alters()
+        context.assert_(
+            'ALTER TABLE foo MODIFY data VARCHAR(100) NOT NULL, '
+            'ADD COLUMN y INTEGER, DROP COLUMN x, '
+            "ALTER COLUMN q SET DEFAULT '5'"
+        )
+
+    def test_mysql_column_named_once(self):
+        context = self._fixture('mysql')
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.alter_column(
+                'data', new_column_name='newdata', existing_type=Integer)
+            batch_op.alter_column(
+                'newdata', nullable=False, existing_type=Integer)
+        context.assert_(
+            'ALTER TABLE foo CHANGE data newdata INTEGER NULL',
+            'ALTER TABLE foo MODIFY newdata INTEGER NOT NULL'
+        )
+
+    def test_mysql_added_dropped_column_named_once(self):
+        context = self._fixture('mysql')
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.drop_column('x')
+            batch_op.add_column(Column('x', String(10)))
+            batch_op.alter_column(
+                'x', server_default='5', existing_type=String(10))
+            batch_op.drop_column('q')
+        context.assert_(
+            'ALTER TABLE foo DROP COLUMN x',
+            'ALTER TABLE foo ADD COLUMN x VARCHAR(10)',
+            "ALTER TABLE foo ALTER COLUMN x SET DEFAULT '5', DROP COLUMN q"
+        )
+
+    def test_not_combined_by_default(self):
+        context = self._fixture('postgresql', combine=False)
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.drop_column('q')
+            batch_op.drop_column('r')
+        context.assert_(
+            'ALTER TABLE foo DROP COLUMN q',
+            'ALTER TABLE foo DROP COLUMN r'
+        )
+
+    def test_default_dialect_not_combined(self):
+        context = self._fixture('default')
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.drop_column('q')
+            batch_op.drop_column('r')
+        context.assert_(
+            'ALTER TABLE foo DROP COLUMN q',
+            'ALTER TABLE foo DROP COLUMN r'
+        )
+
+
 class BatchRoundTripTest(TestBase):
     __requires__ = ('sqlalchemy_08', )
     __only_on__ = "sqlite"
@@ -1131,6 +1272,460 @@ class BatchRoundTripTest(TestBase):
         )
 
 
+class BatchDeferIndexesRoundTripTest(TestBase):
+    __requires__ = ('sqlalchemy_08', )
+    __only_on__ = "sqlite"
+
+    def setUp(self):
+        self.conn = config.db.connect()
+        self.metadata = MetaData()
+        Table(
+            'foo', self.metadata,
+            Column('id', Integer, primary_key=True),
+            Column('data', String(50)),
+            Column('x', Integer),
+            Index('ix_foo_x', 'x')
+        )
+        self.metadata.create_all(self.conn)
+        self.conn.execute(
+            "insert into foo (id, data, x) values (1, 'd1', 5), (2, 'd2', 6)")
+        context = MigrationContext.configure(self.conn)
+        self.op = Operations(context)
+
+    def tearDown(self):
+        self.metadata.drop_all(self.conn)
+        self.conn.close()
+
+    def test_indexes_built_after_copy(self):
+        with self.op.batch_alter_table(
+                "foo", recreate="always", defer_indexes=True) as batch_op:
+            batch_op.alter_column('data', type_=String(100))
+            batch_op.create_index('ix_foo_data', ['data'], unique=True)
+
+        eq_(
+            [dict(row) for row in self.conn.execute(
+                "select * from foo order by id")],
+            [{"id": 1, "data": "d1", "x": 5}, {"id": 2, "data": "d2", "x": 6}]
+        )
+        eq_(
+            sorted(
+                (idx['name'], idx['column_names'], bool(idx['unique']))
+                for idx in Inspector.from_engine(self.conn).get_indexes('foo')
+            ),
+            [('ix_foo_data', ['data'], True), ('ix_foo_x', ['x'], False)]
+        )
+
+
+class BatchNativeAlterSQLiteTest(TestBase):
+    __requires__ = ('sqlalchemy_08', )
+    __only_on__ = "sqlite"
+
+    def setUp(self):
+        self.conn = config.db.connect()
+        self.metadata = MetaData()
+        t1 = Table(
+            'foo', self.metadata,
+            Column('id', Integer, primary_key=True),
+            Column('data', String(50)),
+            Column('x', Integer),
+            Column('y', Integer, CheckConstraint('y > 0')),
+            UniqueConstraint('x')
+        )
+        t1.create(self.conn)
+        self.conn.execute(
+            t1.insert(),
+            [{"id": 1, "data": "d1", "x": 5, "y": 1}]
+        )
+        context = MigrationContext.configure(self.conn)
+        self.op = Operations(context)
+
+        self.statements = statements = []
+
+        @event.listens_for(self.conn, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, *arg):
+            statements.append(statement)
+
+    def tearDown(self):
+        self.metadata.drop_all(self.conn)
+        self.conn.close()
+
+    def _recreated(self):
+        return any(
+            "_alembic_batch_temp" in statement
+            for statement in self.statements)
+
+    def _version_fixture(self, version):
+        return mock.patch.object(
+            self.op.impl, "_sqlite_version_info", version)
+
+    @exclusions.skip_if(
+        lambda config: config.db.dialect.server_version_info < (3, 35),
+        "SQLite 3.35 or greater required")
+    def test_rename_and_drop_in_place(self):
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.alter_column('data', new_column_name='newdata')
+
+        with self.op.batch_alter_table("foo", recreate="auto") as batch_op:
+            batch_op.drop_column('newdata')
+
+        assert not self._recreated()
+        eq_(
+            [dict(row) for row in self.conn.execute("select * from foo")],
+            [{"id": 1, "x": 5, "y": 1}]
+        )
+
+    def test_rename_old_library(self):
+        with self._version_fixture((3, 24, 0)):
+            with self.op.batch_alter_table("foo") as batch_op:
+                batch_op.alter_column('data', new_column_name='newdata')
+        assert self._recreated()
+
+    def test_drop_old_library(self):
+        with self._version_fixture((3, 34, 1)):
+            with self.op.batch_alter_table("foo") as batch_op:
+                batch_op.drop_column('data')
+        assert self._recreated()
+
+    def test_drop_unique_column(self):
+        with self._version_fixture((3, 35, 0)):
+            with self.op.batch_alter_table("foo") as batch_op:
+                batch_op.drop_column('x')
+        assert self._recreated()
+
+    def test_drop_renamed_unique_column(self):
+        batch = BatchOperationsImpl(
+            self.op, "foo", None, "auto", None, (), {}, (), {}, None)
+        batch.alter_column('foo', 'x', name='q')
+        batch.drop_column('foo', Column('q', Integer))
+        with self._version_fixture((3, 35, 0)):
+            assert self.op.impl.requires_recreate_in_batch(batch)
+
+    def test_drop_column_check_constraint(self):
+        with self._version_fixture((3, 35, 0)):
+            with self.op.batch_alter_table("foo") as batch_op:
+                batch_op.drop_column('y')
+        assert self._recreated()
+
+    def test_alter_type_recreates(self):
+        with self._version_fixture((3, 35, 0)):
+            with self.op.batch_alter_table("foo") as batch_op:
+                batch_op.alter_column(
+                    'data', new_column_name='newdata', type_=Integer)
+        assert self._recreated()
+
+
+class BatchCoalesceTest(TestBase):
+    __requires__ = ('sqlalchemy_08', )
+    __only_on__ = "sqlite"
+
+    def setUp(self):
+        self.conn = config.db.connect()
+        self.metadata = MetaData()
+        t1 = Table(
+            'foo', self.metadata,
+            Column('id', Integer, primary_key=True),
+            Column('data', String(50)),
+            Column('x', Integer)
+        )
+        t1.create(self.conn)
+        self.conn.execute(t1.insert(), [{"id": 1, "data": "d1", "x": 5}])
+        self.context = MigrationContext.configure(
+            self.conn, opts={'coalesce_batch_recreates': True})
+        self.op = Operations(self.context)
+
+        self.statements = statements = []
+
+        @event.listens_for(self.conn, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, *arg):
+            statements.append(statement)
+
+    def tearDown(self):
+        self.metadata.drop_all(self.conn)
+        self.conn.execute("drop table if exists bar")
+        self.conn.close()
+
+    def _recreates(self):
+        return len([
+            statement for statement in self.statements
+            if statement.strip().startswith(
+                "CREATE TABLE _alembic_batch_temp")])
+
+    def _columns(self):
+        return [
+            (col['name'], str(col['type']), col['nullable'])
+            for col in Inspector.from_engine(self.conn).get_columns('foo')
+        ]
+
+    def test_recreates_coalesced(self):
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.alter_column('x', nullable=False)
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.add_column(Column('y', Integer))
+            batch_op.alter_column('data', type_=String(100))
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.alter_column('y', type_=String(20))
+        eq_(self._recreates(), 0)
+
+        self.context._flush_batches()
+        eq_(self._recreates(), 1)
+        eq_(
+            self._columns(),
+            [('id', 'INTEGER', False), ('data', 'VARCHAR(100)', True),
+             ('x', 'INTEGER', False), ('y', 'VARCHAR(20)', True)]
+        )
+        eq_(
+            [dict(row) for row in self.conn.execute("select * from foo")],
+            [{"id": 1, "data": "d1", "x": 5, "y": None}]
+        )
+
+    def test_execute_is_barrier(self):
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.alter_column('x', nullable=False)
+        self.op.execute("update foo set x=6")
+        eq_(self._recreates(), 1)
+
+    def test_get_bind_is_barrier(self):
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.alter_column('x', nullable=False)
+        self.op.get_bind()
+        eq_(self._recreates(), 1)
+
+    def test_other_table_not_barrier(self):
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.alter_column('x', nullable=False)
+        self.op.create_table('bar', Column('id', Integer, primary_key=True))
+        eq_(self._recreates(), 0)
+
+        self.op.add_column('foo', Column('y', Integer))
+        eq_(self._recreates(), 1)
+        eq_(
+            [name for name, type_, nullable in self._columns()],
+            ['id', 'data', 'x', 'y']
+        )
+
+    def test_rename_ends_coalescing(self):
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.alter_column(
+                'data', new_column_name='newdata', nullable=False)
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.alter_column('newdata', type_=String(100))
+        eq_(self._recreates(), 1)
+
+        self.context._flush_batches()
+        eq_(self._recreates(), 2)
+        eq_(
+            self._columns(),
+            [('id', 'INTEGER', False), ('newdata', 'VARCHAR(100)', False),
+             ('x', 'INTEGER', True)]
+        )
+
+    def test_recreate_never_not_coalesced(self):
+        with self.op.batch_alter_table("foo") as batch_op:
+            batch_op.alter_column('x', nullable=False)
+        with self.op.batch_alter_table("foo", recreate="never") as batch_op:
+            batch_op.add_column(Column('y', Integer))
+        eq_(self._recreates(), 1)
+
+
+class BatchReflectionCacheTest(TestBase):
+    __requires__ = ('sqlalchemy_100', )
+    __only_on__ = "sqlite"
+
+    def setUp(self):
+        self.conn = config.db.connect()
+        self.metadata = MetaData()
+        Table(
+            'foo', self.metadata,
+            Column('id', Integer, primary_key=True),
+            Column('data', String(50)),
+            Column('x', Integer),
+            UniqueConstraint('x', name='uq_x')
+        )
+        Table(
+            'bar', self.metadata,
+            Column('id', Integer, primary_key=True),
+            Column('foo_id', Integer, ForeignKey('foo.id')),
+        )
+        self.metadata.create_all(self.conn)
+        self.conn.execute("insert into foo (id, data, x) values (1, 'd1', 5)")
+        self.context = MigrationContext.configure(
+            self.conn, opts={'cache_batch_reflection': True})
+        self.op = Operations(self.context)
+
+    def tearDown(self):
+        self.metadata.drop_all(self.conn)
+        self.conn.close()
+
+    @contextmanager
+    def _reflections(self):
+        reflecttable = Inspector.reflecttable
+        with mock.patch.object(
+                Inspector, "reflecttable",
+                side_effect=reflecttable, autospec=True) as reflect_mock:
+            yield reflect_mock
+
+    def _reflected_tables(self, reflect_mock):
+        return [call[1][1].name for call in reflect_mock.mock_calls]
+
+    def _assert_foo(self, columns):
+        insp = Inspector.from_engine(self.conn)
+        eq_(
+            [(col['name'], str(col['type']), col['nullable'])
+             for col in insp.get_columns('foo')],
+            columns
+        )
+        eq_(
+            [uq['name'] for uq in insp.get_unique_constraints('foo')],
+            ['uq_x']
+        )
+
+    def test_consecutive_batches_reflect_once(self):
+        with self._reflections() as reflect_mock:
+            with self.op.batch_alter_table("foo") as batch_op:
+                batch_op.alter_column('x', nullable=False)
+            with self.op.batch_alter_table("foo") as batch_op:
+                batch_op.alter_column('data', type_=String(100))
+            with self.op.batch_alter_table("bar") as batch_op:
+                batch_op.alter_column('foo_id', nullable=False)
+            with self.op.batch_alter_table("bar") as batch_op:
+                batch_op.alter_column('foo_id', nullable=True)
+
+        eq_(self._reflected_tables(reflect_mock), ['foo', 'bar', 'foo'])
+        self._assert_foo([
+            ('id', 'INTEGER', False), ('data', 'VARCHAR(100)', True),
+            ('x', 'INTEGER', False)])
+        eq_(
+            [(fk['constrained_columns'], fk['referred_table'])
+             for fk in Inspector.from_engine(self.conn).get_foreign_keys(
+                 'bar')],
+            [(['foo_id'], 'foo')]
+        )
+
+    def test_other_operation_invalidates(self):
+        with self._reflections() as reflect_mock:
+            with self.op.batch_alter_table("foo") as batch_op:
+                batch_op.alter_column('x', nullable=False)
+            self.op.add_column('foo', Column('y', Integer))
+            with self.op.batch_alter_table("foo") as batch_op:
+                batch_op.alter_column('data', type_=String(100))
+
+        eq_(self._reflected_tables(reflect_mock), ['foo', 'foo'])
+        self._assert_foo([
+            ('id', 'INTEGER', False), ('data', 'VARCHAR(100)', True),
+            ('x', 'INTEGER', False), ('y', 'INTEGER', True)])
+
+    def test_deferred_indexes_cached(self):
+        with self._reflections() as reflect_mock:
+            with self.op.batch_alter_table(
+                    "foo", defer_indexes=True) as batch_op:
+                batch_op.create_index('ix_data', ['data'])
+                batch_op.alter_column('x', nullable=False)
+            with self.op.batch_alter_table(
+                    "foo", defer_indexes=True) as batch_op:
+                batch_op.alter_column('data', type_=String(100))
+
+        eq_(self._reflected_tables(reflect_mock), ['foo'])
+        eq_(
+            [(idx['name'], idx['column_names']) for idx in
+             Inspector.from_engine(self.conn).get_indexes('foo')],
+            [('ix_data', ['data'])]
+        )
+
+    def test_rename_not_cached(self):
+        with self._reflections() as reflect_mock:
+            with self.op.batch_alter_table("foo") as batch_op:
+                batch_op.alter_column(
+                    'data', new_column_name='newdata', nullable=False)
+            with self.op.batch_alter_table("foo") as batch_op:
+                batch_op.alter_column('newdata', type_=String(100))
+
+        eq_(self._reflected_tables(reflect_mock), ['foo', 'foo'])
+        self._assert_foo([
+            ('id', 'INTEGER', False), ('newdata', 'VARCHAR(100)', False),
+            ('x', 'INTEGER', True)])
+
+
+class BatchCoalesceUpgradeTest(TestBase):
+    __requires__ = ('sqlalchemy_08', )
+    __only_on__ = "sqlite"
+
+    def setUp(self):
+        self.bind = _sqlite_file_db()
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.a = a = util.rev_id()
+        self.b = b = util.rev_id()
+        script = ScriptDirectory.from_config(self.cfg)
+        script.generate_revision(a, None, refresh=True)
+        write_script(script, a, """
+revision = '%s'
+down_revision = None
+
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.create_table('foo', sa.Column('id', sa.Integer, primary_key=True),
+                    sa.Column('x', sa.Integer))
+    with op.batch_alter_table('foo') as batch_op:
+        batch_op.alter_column('x', nullable=False)
+
+""" % a)
+        script.generate_revision(b, None, refresh=True)
+        write_script(script, b, """
+revision = '%s'
+down_revision = '%s'
+
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    with op.batch_alter_table('foo') as batch_op:
+        batch_op.alter_column('x', type_=sa.String(20))
+
+""" % (b, a))
+        env_file_fixture("""
+
+from sqlalchemy import engine_from_config
+
+engine = engine_from_config(
+    config.get_section(config.config_ini_section),
+    prefix='sqlalchemy.')
+
+connection = engine.connect()
+
+context.configure(connection=connection, coalesce_batch_recreates=True)
+
+try:
+    with context.begin_transaction():
+        context.run_migrations()
+finally:
+    connection.close()
+
+""")
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def test_applied_at_end_of_run(self):
+        create = ApplyBatchImpl._create
+        with mock.patch.object(
+                ApplyBatchImpl, "_create",
+                side_effect=create, autospec=True) as create_mock:
+            command.upgrade(self.cfg, "heads")
+        eq_(len(create_mock.mock_calls), 1)
+
+        eq_(
+            [(col['name'], str(col['type']), col['nullable'])
+             for col in Inspector.from_engine(self.bind).get_columns('foo')],
+            [('id', 'INTEGER', False), ('x', 'VARCHAR(20)', False)]
+        )
+        eq_(
+            self.bind.scalar("select version_num from alembic_version"),
+            self.b
+        )
+
+
 class BatchRoundTripMySQLTest(BatchRoundTripTest):
     __only_on__ = "mysql"
 
@@ -1,13 +1,14 @@
 from unittest import TestCase
 
 from alembic import op
-from sqlalchemy import Integer, String
+from sqlalchemy import Integer, String, LargeBinary
 from sqlalchemy.sql import table, column
-from sqlalchemy import Table, Column, MetaData
-from sqlalchemy.types import TypeEngine
+from sqlalchemy import Table, Column, MetaData, event
+from sqlalchemy.types import TypeEngine, TypeDecorator
 
 from alembic.testing.fixtures import op_fixture, TestBase
 from alembic.testing import eq_, assert_raises_message, config
+from alembic.testing import mock
 
 
 class BulkInsertTest(TestBase):
@@ -145,6 +146,123 @@ class BulkInsertTest(TestBase):
             "VALUES (4, 'row v4', 'row v8')"
         )
 
+    def test_bulk_insert_iterator_as_sql(self):
+        context, t1 = self._table_fixture('default', True)
+        op.bulk_insert(
+            t1,
+            ({'id': i, 'v1': 'row v%d' % i, 'v2': 'row v%d' % (i + 4)}
+             for i in range(1, 4)),
+            chunk_size=2
+        )
+        context.assert_(
+            "INSERT INTO ins_table (id, v1, v2) "
+            "VALUES (1, 'row v1', 'row v5')",
+            "INSERT INTO ins_table (id, v1, v2) "
+            "VALUES (2, 'row v2', 'row v6')",
+            "INSERT INTO ins_table (id, v1, v2) "
+            "VALUES (3, 'row v3', 'row v7')"
+        )
+
+    def _test_bulk_insert_offline(self, dialect, format_, rows=None):
+        context, t1 = self._table_fixture(dialect, True)
+        context.impl.offline_bulk_insert = format_
+        op.bulk_insert(t1, rows or [
+            {'id': 1, 'v1': 'row v1', 'v2': 'row v5'},
+            {'id': 2, 'v1': "row 'v2'", 'v2': None},
+            {'id': 3, 'v1': 'row v3'},
+        ])
+        return context
+
+    def test_bulk_insert_as_sql_values(self):
+        context = self._test_bulk_insert_offline('sqlite', 'values')
+        context.assert_(
+            "INSERT INTO ins_table (id, v1, v2) VALUES "
+            "(1, 'row v1', 'row v5'), (2, 'row ''v2''', NULL)",
+            "INSERT INTO ins_table (id, v1) VALUES (3, 'row v3')"
+        )
+
+    def test_bulk_insert_as_sql_values_chunked(self):
+        context, t1 = self._table_fixture('postgresql', True)
+        context.impl.offline_bulk_insert = 'values'
+        op.bulk_insert(
+            t1, [{'id': i, 'v1': 'v%d' % i} for i in range(1, 4)],
+            chunk_size=2)
+        context.assert_(
+            "INSERT INTO ins_table (id, v1) VALUES (1, 'v1'), (2, 'v2')",
+            "INSERT INTO ins_table (id, v1) VALUES (3, 'v3')"
+        )
+
+    def test_bulk_insert_as_sql_values_inline_literal(self):
+        context = self._test_bulk_insert_offline('postgresql', 'values', [
+            {'id': 1, 'v1': op.inline_literal('x'), 'v2': 'y'},
+        ])
+        context.assert_(
+            "INSERT INTO ins_table (id, v1, v2) VALUES (1, 'x', 'y')"
+        )
+
+    def test_bulk_insert_as_sql_values_unsupported(self):
+        context = self._test_bulk_insert_offline('oracle', 'values', [
+            {'id': 1, 'v1': 'row v1', 'v2': 'row v5'},
+        ])
+        context.assert_(
+            "INSERT INTO ins_table (id, v1, v2) "
+            "VALUES (1, 'row v1', 'row v5')",
+            "/"
+        )
+
+    def test_bulk_insert_as_sql_copy(self):
+        context, t1 = self._table_fixture('postgresql', True)
+        context.impl.offline_bulk_insert = 'copy'
+        buf = []
+        context.impl.output_buffer.write = buf.append
+        op.bulk_insert(t1, [
+            {'id': 1, 'v1': 'row\tv1\\', 'v2': None},
+            {'id': 2, 'v1': 'row v2', 'v2': 'row\nv6'},
+        ])
+        eq_(
+            buf,
+            ["COPY ins_table (id, v1, v2) FROM stdin;\n"
+             "1\trow\\tv1\\\\\t\\N\n"
+             "2\trow v2\trow\\nv6\n"
+             "\\.\n\n"]
+        )
+
+    def test_bulk_insert_as_sql_copy_inline_literal(self):
+        context = self._test_bulk_insert_offline('postgresql', 'copy', [
+            {'id': 1, 'v1': op.inline_literal('x'), 'v2': 'y'},
+        ])
+        context.assert_(
+            "INSERT INTO ins_table (id, v1, v2) VALUES (1, 'x', 'y')"
+        )
+
+    def test_bulk_insert_as_sql_copy_type_decorator(self):
+        class Upper(TypeDecorator):
+            impl = String
+
+            def process_bind_param(self, value, dialect):
+                return value.upper()
+
+            def process_literal_param(self, value, dialect):
+                return value.upper()
+
+        context = op_fixture('postgresql', True)
+        context.impl.offline_bulk_insert = 'copy'
+        t1 = table('t', column('id', Integer), column('data', Upper()))
+        op.bulk_insert(t1, [{'id': 1, 'data': 'd1'}])
+        context.assert_(
+            "INSERT INTO t (id, data) VALUES (1, 'D1')"
+        )
+
+    def test_bulk_insert_as_sql_copy_bytes(self):
+        context = op_fixture('postgresql', True)
+        context.impl.offline_bulk_insert = 'copy'
+        t1 = table(
+            't', column('id', Integer), column('data', LargeBinary()))
+        op.bulk_insert(t1, [{'id': 1, 'data': b'd1'}])
+        context.assert_(
+            "INSERT INTO t (id, data) VALUES (1, 'd1')"
+        )
+
     def test_bulk_insert_as_sql_pg(self):
         context = self._test_bulk_insert('postgresql', True)
         context.assert_(
@@ -206,10 +324,16 @@ class BulkInsertTest(TestBase):
         context, t1 = self._table_fixture("sqlite", False)
         assert_raises_message(
             TypeError,
-            "List expected",
+            "List or other iterable expected",
             op.bulk_insert, t1, {"id": 5}
         )
 
+        assert_raises_message(
+            TypeError,
+            "List or other iterable expected",
+            op.bulk_insert, t1, 5
+        )
+
         assert_raises_message(
             TypeError,
             "List of dictionaries expected",
@@ -271,6 +395,28 @@ class RoundTripTest(TestBase):
             ]
         )
 
+    def test_bulk_insert_iterator_chunks(self):
+        statements = []
+
+        @event.listens_for(self.conn, "before_cursor_execute")
+        def before_cursor_execute(
+                conn, cursor, statement, parameters, context, executemany):
+            statements.append(len(parameters) if executemany else 1)
+
+        progress = mock.Mock()
+        rows = (
+            {'data': "d%d" % i, "x": "x%d" % i} for i in range(1, 6)
+        )
+        self.op.bulk_insert(
+            self.t1, rows, chunk_size=2, progress=progress)
+
+        eq_(statements, [2, 2, 1])
+        eq_(progress.mock_calls, [mock.call(2), mock.call(4), mock.call(5)])
+        eq_(
+            self.conn.execute("select id, data, x from foo").fetchall(),
+            [(i, "d%d" % i, "x%d" % i) for i in range(1, 6)]
+        )
+
     def test_bulk_insert_inline_literal(self):
         class MyType(TypeEngine):
             pass
@@ -4,9 +4,15 @@ from alembic.script import ScriptDirectory
 from alembic.testing.fixtures import TestBase, capture_context_buffer
 from alembic.testing.env import staging_env, _sqlite_testing_config, \
     three_rev_fixture, clear_staging_env, _no_sql_testing_config, \
-    _sqlite_file_db, write_script, env_file_fixture
+    _sqlite_file_db, write_script, env_file_fixture, make_sourceless
 from alembic.testing import eq_, assert_raises_message
+from alembic.util import compat
 from alembic import util
+from alembic.testing import mock
+from alembic.ddl.impl import DefaultImpl
+import os
+import shutil
+import json
 
 
 class HistoryTest(TestBase):
@@ -371,3 +377,435 @@ down_revision = '%s'
             self.bind.scalar("select version_num from alembic_version"),
             self.a
         )
+
+
+class BundleTest(TestBase):
+
+    def setUp(self):
+        self.env = staging_env()
+        self.cfg = cfg = _no_sql_testing_config()
+        cfg.set_main_option('dialect_name', 'sqlite')
+        cfg.remove_main_option('url')
+        self.a, self.b, self.c = three_rev_fixture(cfg)
+        self.bundle_path = os.path.join(self.env.dir, 'revisions.bundle')
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def _bundle_and_remove_sources(self):
+        self.cfg.set_main_option('revision_bundle', self.bundle_path)
+        self.cfg.stdout = buf = compat.StringIO()
+        command.bundle(self.cfg)
+        eq_(buf.getvalue().strip(), "Bundled 3 revision(s)")
+        shutil.rmtree(self.env.versions)
+        os.mkdir(self.env.versions)
+
+    def test_revisions_from_bundle(self):
+        self._bundle_and_remove_sources()
+        script = ScriptDirectory.from_config(self.cfg)
+        eq_(script.get_heads(), [self.c])
+        eq_(
+            [rev.revision for rev in script.walk_revisions()],
+            [self.c, self.b, self.a]
+        )
+        rev = script.get_revision(self.b)
+        eq_(rev.doc, compat.u("Rev B, m\xe9il"))
+        assert rev.path.startswith(self.bundle_path)
+
+    def test_upgrade_from_bundle(self):
+        self._bundle_and_remove_sources()
+        with capture_context_buffer() as buf:
+            command.upgrade(self.cfg, self.c, sql=True)
+        assert "CREATE STEP 1" in buf.getvalue()
+        assert "CREATE STEP 3" in buf.getvalue()
+
+    def test_output_argument(self):
+        self.cfg.stdout = compat.StringIO()
+        command.bundle(self.cfg, output=self.bundle_path)
+        assert os.path.exists(self.bundle_path)
+
+        # not configured, so revisions still come from the directory
+        script = ScriptDirectory.from_config(self.cfg)
+        assert script.get_revision(self.a).path.startswith(
+            self.env.versions)
+
+    def test_no_output(self):
+        assert_raises_message(
+            util.CommandError,
+            "No output file specified",
+            command.bundle, self.cfg
+        )
+
+    def test_not_a_bundle(self):
+        with open(self.bundle_path, 'wb') as f:
+            f.write(b"some file")
+        self.cfg.set_main_option('revision_bundle', self.bundle_path)
+        script = ScriptDirectory.from_config(self.cfg)
+        assert_raises_message(
+            util.CommandError,
+            "File %s is not a revision bundle" % self.bundle_path,
+            script.get_heads
+        )
+
+    def test_new_revision_file_warns(self):
+        self._bundle_and_remove_sources()
+        path = os.path.join(self.env.versions, "d_rev.py")
+        with open(path, 'w') as f:
+            f.write(
+                "revision = 'd'\ndown_revision = %r\n" % self.c)
+        script = ScriptDirectory.from_config(self.cfg)
+        with mock.patch("alembic.util.warn") as warn:
+            eq_(script.get_heads(), [self.c])
+        eq_(len(warn.mock_calls), 1)
+        assert "Revision file(s) %s are newer than the revision bundle" % (
+            path) in warn.mock_calls[0][1][0]
+
+    def test_bundled_revisions_dont_warn(self):
+        self.cfg.set_main_option('revision_bundle', self.bundle_path)
+        self.cfg.stdout = compat.StringIO()
+        command.bundle(self.cfg)
+        script = ScriptDirectory.from_config(self.cfg)
+        with mock.patch("alembic.util.warn") as warn:
+            eq_(script.get_heads(), [self.c])
+        eq_(warn.mock_calls, [])
+
+    def test_revision_refused(self):
+        self._bundle_and_remove_sources()
+        assert_raises_message(
+            util.CommandError,
+            "Revisions are read from the revision bundle %s" %
+            self.bundle_path,
+            command.revision, self.cfg, message="d"
+        )
+
+    def test_empty_bundle(self):
+        open(self.bundle_path, 'wb').close()
+        self.cfg.set_main_option('revision_bundle', self.bundle_path)
+        script = ScriptDirectory.from_config(self.cfg)
+        assert_raises_message(
+            util.CommandError,
+            "File %s is not a revision bundle" % self.bundle_path,
+            script.get_heads
+        )
+
+    def _make_sourceless(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        for rev in script.walk_revisions():
+            make_sourceless(rev.path)
+        self.cfg.set_main_option('sourceless', 'true')
+
+    def test_sourceless_bundle(self):
+        self._make_sourceless()
+        self._bundle_and_remove_sources()
+        script = ScriptDirectory.from_config(self.cfg)
+        eq_(script.get_heads(), [self.c])
+        rev = script.get_revision(self.b)
+        eq_(rev.doc, compat.u("Rev B, m\xe9il"))
+        assert rev.path.endswith(".pyc") or rev.path.endswith(".pyo")
+        with capture_context_buffer() as buf:
+            command.upgrade(self.cfg, self.c, sql=True)
+        assert "CREATE STEP 3" in buf.getvalue()
+
+    def test_sourceless_bundle_other_python(self):
+        self._make_sourceless()
+        self._bundle_and_remove_sources()
+        script = ScriptDirectory.from_config(self.cfg)
+        with mock.patch.object(compat, "pyc_magic", b"\x00\x00\r\n"):
+            assert_raises_message(
+                util.CommandError,
+                "Revision bundle %s contains code compiled by a different "
+                "version of Python" % self.bundle_path,
+                script.get_heads
+            )
+
+
+class SquashTest(TestBase):
+    __only_on__ = 'sqlite'
+
+    def setUp(self):
+        self.bind = _sqlite_file_db()
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.a = a = util.rev_id()
+        self.b = b = util.rev_id()
+        self.c = c = util.rev_id()
+        script = ScriptDirectory.from_config(self.cfg)
+        script.generate_revision(a, "rev a", refresh=True)
+        write_script(script, a, """
+revision = '%s'
+down_revision = None
+
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.create_table('account', sa.Column('id', sa.Integer, primary_key=True))
+
+def downgrade():
+    op.drop_table('account')
+""" % a)
+        script.generate_revision(b, "rev b", refresh=True)
+        write_script(script, b, """
+revision = '%s'
+down_revision = '%s'
+
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.create_table(
+        'address',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('account_id', sa.Integer, sa.ForeignKey('account.id')),
+        sa.Column('email', sa.String(50))
+    )
+    op.create_index('ix_address_email', 'address', ['email'])
+
+def downgrade():
+    op.drop_table('address')
+""" % (b, a))
+        script.generate_revision(c, "rev c", refresh=True)
+        write_script(script, c, """
+revision = '%s'
+down_revision = '%s'
+
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.add_column('account', sa.Column('name', sa.String(50)))
+
+def downgrade():
+    pass
+""" % (c, b))
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def _env_fixture(self):
+        env_file_fixture("""
+
+from sqlalchemy import engine_from_config
+
+engine = engine_from_config(
+    config.get_section(config.config_ini_section),
+    prefix='sqlalchemy.')
+
+connection = engine.connect()
+
+context.configure(connection=connection)
+
+try:
+    with context.begin_transaction():
+        context.run_migrations()
+finally:
+    connection.close()
+
+""")
+
+    def _squash(self):
+        self._env_fixture()
+        command.upgrade(self.cfg, self.b)
+        return command.squash(
+            self.cfg, "base:%s" % self.b, message="baseline")
+
+    def _fresh_db(self):
+        self.bind.dispose()
+        os.remove(self.bind.url.database)
+
+    def test_squash_creates_schema(self):
+        squashed = self._squash()
+        eq_(squashed.squashes, self.b)
+        eq_(squashed.down_revision, None)
+        assert "op.create_table('account'" in open(squashed.path).read()
+
+        script = ScriptDirectory.from_config(self.cfg)
+        eq_(script.get_heads(), [self.c])
+        eq_(script.get_bases(), [self.a])
+        eq_(script.get_revision(squashed.revision).squashes, self.b)
+
+    def test_squash_uses_column_reflect_hook(self):
+        with mock.patch.object(
+                DefaultImpl, "autogen_column_reflect") as reflect_mock:
+            self._squash()
+        eq_(
+            sorted(set(
+                (args[1].name, args[2]['name'])
+                for args, kw in reflect_mock.call_args_list)),
+            [('account', 'id'), ('address', 'account_id'),
+             ('address', 'email'), ('address', 'id')]
+        )
+
+    def test_fresh_install_uses_squash(self):
+        squashed = self._squash()
+        self._fresh_db()
+
+        script = ScriptDirectory.from_config(self.cfg)
+        eq_(
+            [step.revision.revision
+             for step in script._upgrade_revs("heads", ())],
+            [squashed.revision, self.c]
+        )
+
+        command.upgrade(self.cfg, "heads")
+        eq_(
+            self.bind.scalar("select version_num from alembic_version"),
+            self.c
+        )
+        eq_(
+            sorted(
+                col['name'] for col in
+                self.bind.dialect.get_columns(self.bind, 'account')),
+            ['id', 'name']
+        )
+        eq_(
+            [idx['name'] for idx in
+             self.bind.dialect.get_indexes(self.bind, 'address')],
+            ['ix_address_email']
+        )
+
+    def test_fresh_install_to_squashed_history(self):
+        self._squash()
+        self._fresh_db()
+
+        script = ScriptDirectory.from_config(self.cfg)
+        eq_(
+            [step.revision.revision
+             for step in script._upgrade_revs(self.a, ())],
+            [self.a]
+        )
+
+    def test_existing_db_keeps_history(self):
+        self._squash()
+        command.downgrade(self.cfg, self.a)
+
+        script = ScriptDirectory.from_config(self.cfg)
+        eq_(
+            [step.revision.revision
+             for step in script._upgrade_revs("heads", (self.a, ))],
+            [self.b, self.c]
+        )
+        command.upgrade(self.cfg, "heads")
+        eq_(
+            self.bind.scalar("select version_num from alembic_version"),
+            self.c
+        )
+
+    def test_db_not_at_revision(self):
+        self._env_fixture()
+        command.upgrade(self.cfg, self.a)
+        assert_raises_message(
+            util.CommandError,
+            "Target database is not at revision %s." % self.b,
+            command.squash, self.cfg, self.b
+        )
+
+    def test_range_not_from_base(self):
+        assert_raises_message(
+            util.CommandError,
+            "Squashed revisions must start from base",
+            command.squash, self.cfg, "%s:%s" % (self.a, self.b)
+        )
+
+
+class CheckTest(TestBase):
+    __only_on__ = 'sqlite'
+
+    def setUp(self):
+        self.bind = _sqlite_file_db()
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.a = a = util.rev_id()
+        script = ScriptDirectory.from_config(self.cfg)
+        script.generate_revision(a, None, refresh=True)
+        write_script(script, a, """
+revision = '%s'
+down_revision = None
+""" % a)
+        env_file_fixture("""
+
+from sqlalchemy import MetaData, Table, Column, Integer, engine_from_config
+target_metadata = MetaData()
+Table('account', target_metadata, Column('id', Integer, primary_key=True))
+
+engine = engine_from_config(
+    config.get_section(config.config_ini_section),
+    prefix='sqlalchemy.')
+
+connection = engine.connect()
+
+context.configure(connection=connection, target_metadata=target_metadata)
+
+try:
+    with context.begin_transaction():
+        context.run_migrations()
+finally:
+    connection.close()
+
+""")
+        self.bind.execute("create table account (id integer primary key)")
+        command.stamp(self.cfg, a)
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def _check(self, **kw):
+        buf = BytesIO()
+        self.cfg.stdout = TextIOWrapper(
+            buf, encoding='ascii', line_buffering=True)
+        command.check(self.cfg, **kw)
+        return buf.getvalue().decode('ascii')
+
+    def test_check_matches(self):
+        eq_(self._check(), "No differences detected\n")
+
+    def test_check_differs(self):
+        self.bind.execute("alter table account add column name varchar")
+        assert_raises_message(
+            util.CommandError,
+            "Database doesn't match the target metadata:\n"
+            "  \\('remove_column', None, 'account', Column\\('name'",
+            command.check, self.cfg
+        )
+
+    def test_fingerprint_stamp_and_match(self):
+        output = self._check(fingerprint=True)
+        assert output.startswith(
+            "No schema fingerprint recorded for revision %s" % self.a)
+
+        output = self._check(stamp=True)
+        assert output.startswith(
+            "Recorded schema fingerprint")
+
+        script = ScriptDirectory.from_config(self.cfg)
+        with open(os.path.join(
+                script.dir, "schema_fingerprints.json")) as file_:
+            fingerprints = json.load(file_)
+        eq_(list(fingerprints), [self.a])
+        eq_(list(fingerprints[self.a]), ['sqlite'])
+
+        with mock.patch(
+                "alembic.autogenerate.compare_metadata") as compare_metadata:
+            eq_(
+                self._check(fingerprint=True),
+                "Schema fingerprint matches revision %s\n" % self.a
+            )
+        eq_(compare_metadata.mock_calls, [])
+
+    def test_fingerprint_differs(self):
+        self._check(stamp=True)
+        self.bind.execute("alter table account add column name varchar")
+        assert_raises_message(
+            util.CommandError,
+            "Database doesn't match the target metadata",
+            self._check, fingerprint=True
+        )
+
+    def test_stamp_requires_revision(self):
+        command.stamp(self.cfg, "base")
+        assert_raises_message(
+            util.CommandError,
+            "Database has no current revision to record a schema "
+            "fingerprint for",
+            command.check, self.cfg, stamp=True
+        )
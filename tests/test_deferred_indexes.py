@@ -0,0 +1,213 @@
+from alembic.testing import TestBase, eq_, config, assert_raises_message
+from alembic.testing import mock
+from alembic.testing.env import staging_env, clear_staging_env, \
+    _sqlite_file_db, _sqlite_testing_config, write_script, env_file_fixture
+from alembic.ddl.sqlite import SQLiteImpl
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from alembic import command, util
+
+from sqlalchemy import Integer, Column, MetaData, Table, event
+from sqlalchemy.engine.reflection import Inspector
+
+
+class DeferIndexBuildsTest(TestBase):
+    __only_on__ = "sqlite"
+
+    def setUp(self):
+        self.conn = config.db.connect()
+        self.metadata = MetaData()
+        self.foo = Table(
+            'foo', self.metadata,
+            Column('id', Integer, primary_key=True),
+            Column('x', Integer),
+            Column('y', Integer)
+        )
+        Table(
+            'bar', self.metadata,
+            Column('id', Integer, primary_key=True),
+            Column('x', Integer)
+        )
+        self.metadata.create_all(self.conn)
+        self.context = MigrationContext.configure(
+            self.conn, opts={'defer_index_builds': True})
+        self.op = Operations(self.context)
+
+        self.statements = statements = []
+
+        @event.listens_for(self.conn, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, *arg):
+            statements.append(statement.split("(")[0].strip())
+
+    def tearDown(self):
+        self.metadata.drop_all(self.conn)
+        self.conn.close()
+
+    def _indexes(self, table_name):
+        return sorted(
+            index['name'] for index in
+            Inspector.from_engine(self.conn).get_indexes(table_name))
+
+    def test_deferred_past_bulk_insert(self):
+        self.op.create_index('ix_foo_x', 'foo', ['x'])
+        self.op.bulk_insert(self.foo, [{'id': 1, 'x': 5, 'y': 6}])
+        eq_(self.statements, ['INSERT INTO foo'])
+
+        self.context.build_deferred_indexes()
+        eq_(
+            self.statements,
+            ['INSERT INTO foo', 'CREATE INDEX ix_foo_x ON foo']
+        )
+        eq_(self._indexes('foo'), ['ix_foo_x'])
+
+    def test_built_ahead_of_execute(self):
+        self.op.create_index('ix_foo_x', 'foo', ['x'])
+        self.op.execute("update foo set y = 7")
+        eq_(
+            self.statements,
+            ['CREATE INDEX ix_foo_x ON foo', 'update foo set y = 7']
+        )
+
+    def test_unique_not_deferred(self):
+        self.op.create_index('ix_foo_x', 'foo', ['x'], unique=True)
+        self.op.create_index('ix_foo_y', 'foo', ['y'])
+        eq_(self.statements, ['CREATE UNIQUE INDEX ix_foo_x ON foo'])
+        eq_(self._indexes('foo'), ['ix_foo_x'])
+
+    def test_built_ahead_of_operation_on_table(self):
+        self.op.create_index('ix_foo_x', 'foo', ['x'])
+        self.op.create_index('ix_bar_x', 'bar', ['x'])
+        self.op.alter_column('bar', 'x', new_column_name='q')
+        eq_(self._indexes('foo'), [])
+        eq_(self._indexes('bar'), ['ix_bar_x'])
+
+    def test_discarded_by_drop_index(self):
+        self.op.create_index('ix_foo_x', 'foo', ['x'])
+        self.op.create_index('ix_foo_y', 'foo', ['y'])
+        self.op.drop_index('ix_foo_x')
+        eq_(self.statements, [])
+        self.context.build_deferred_indexes()
+        eq_(self.statements, ['CREATE INDEX ix_foo_y ON foo'])
+        eq_(self._indexes('foo'), ['ix_foo_y'])
+
+    def test_discarded_by_drop_table(self):
+        self.op.create_table('bat', Column('id', Integer, primary_key=True))
+        self.op.create_index('ix_bat_id', 'bat', ['id'])
+        self.op.create_index('ix_foo_x', 'foo', ['x'])
+        self.op.drop_table('bat')
+        self.context.build_deferred_indexes()
+        eq_(
+            self.statements,
+            ['CREATE TABLE bat', 'DROP TABLE bat',
+             'CREATE INDEX ix_foo_x ON foo']
+        )
+
+    def test_failures_reported_per_index(self):
+        self.op.create_index('ix_foo_q', 'foo', ['q'])
+        self.op.create_index('ix_foo_x', 'foo', ['x'])
+        self.op.create_index('ix_foo_r', 'foo', ['r'])
+        assert_raises_message(
+            util.CommandError,
+            r"Failed to build 2 deferred index\(es\):\n"
+            "  ix_foo_q on foo: .*no such column: q.*\n"
+            "  ix_foo_r on foo: .*no such column: r",
+            self.context.build_deferred_indexes
+        )
+        eq_(self._indexes('foo'), ['ix_foo_x'])
+
+
+class DeferIndexBuildsUpgradeTest(TestBase):
+    __only_on__ = "sqlite"
+
+    def setUp(self):
+        self.bind = _sqlite_file_db()
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.a = a = util.rev_id()
+        self.b = b = util.rev_id()
+        script = ScriptDirectory.from_config(self.cfg)
+        script.generate_revision(a, None, refresh=True)
+        write_script(script, a, """
+revision = '%s'
+down_revision = None
+
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.create_table('foo', sa.Column('id', sa.Integer, primary_key=True),
+                    sa.Column('x', sa.Integer), sa.Column('y', sa.Integer))
+    op.create_index('ix_foo_x', 'foo', ['x'])
+
+""" % a)
+        script.generate_revision(b, None, refresh=True)
+        write_script(script, b, """
+revision = '%s'
+down_revision = '%s'
+
+from alembic import op
+from sqlalchemy.sql import table, column
+
+def upgrade():
+    op.create_index('ix_foo_y', 'foo', ['y'])
+    foo = table('foo', column('id'), column('x'), column('y'))
+    op.bulk_insert(foo, [{'id': 1, 'x': 5, 'y': 6}])
+
+""" % (b, a))
+        env_file_fixture("""
+
+from sqlalchemy import engine_from_config
+
+engine = engine_from_config(
+    config.get_section(config.config_ini_section),
+    prefix='sqlalchemy.')
+
+connection = engine.connect()
+
+context.configure(
+    connection=connection, defer_index_builds=True,
+    index_build_workers=2, transaction_per_migration=True)
+
+try:
+    with context.begin_transaction():
+        context.run_migrations()
+finally:
+    connection.close()
+
+""")
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def _assert_upgraded(self):
+        eq_(
+            sorted(
+                index['name'] for index in
+                Inspector.from_engine(self.bind).get_indexes('foo')),
+            ['ix_foo_x', 'ix_foo_y']
+        )
+        eq_(
+            self.bind.scalar("select version_num from alembic_version"),
+            self.b
+        )
+
+    def test_built_at_end_of_run(self):
+        build = MigrationContext._build_indexes_concurrently
+        with mock.patch.object(
+                MigrationContext, "_build_indexes_concurrently",
+                side_effect=build, autospec=True) as build_mock:
+            command.upgrade(self.cfg, "heads")
+        eq_(len(build_mock.mock_calls), 0)
+        self._assert_upgraded()
+
+    def test_built_concurrently(self):
+        build = MigrationContext._build_indexes_concurrently
+        with mock.patch.object(
+                SQLiteImpl, "concurrent_index_builds", True), \
+                mock.patch.object(
+                    MigrationContext, "_build_indexes_concurrently",
+                    side_effect=build, autospec=True) as build_mock:
+            command.upgrade(self.cfg, "heads")
+        eq_(len(build_mock.mock_calls), 1)
+        self._assert_upgraded()
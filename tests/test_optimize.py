@@ -0,0 +1,233 @@
+from alembic.testing import TestBase, eq_
+from alembic.testing import mock
+from alembic.testing.env import staging_env, clear_staging_env, \
+    _sqlite_file_db, _sqlite_testing_config, write_script, env_file_fixture
+from alembic.ddl.impl import DefaultImpl
+from alembic.operations import ops
+from alembic.operations.optimize import net_operations
+from alembic.script import ScriptDirectory
+from alembic import command, util
+
+from sqlalchemy import Integer, Column, ForeignKey
+from sqlalchemy.engine.reflection import Inspector
+
+
+class NetOperationsTest(TestBase):
+
+    def _create_table(self, name, *cols):
+        return ops.CreateTableOp(
+            name, [Column('id', Integer, primary_key=True)] + list(cols))
+
+    def test_create_drop_table(self):
+        operations = [
+            self._create_table('foo'),
+            ops.AddColumnOp('foo', Column('x', Integer)),
+            ops.CreateIndexOp('ix_x', 'foo', ['x']),
+            ops.DropTableOp('foo'),
+            self._create_table('bar'),
+        ]
+        eq_(net_operations(operations), [operations[4]])
+
+    def test_create_drop_table_referred_to(self):
+        operations = [
+            self._create_table('foo'),
+            self._create_table('bar', Column('foo_id', ForeignKey('foo.id'))),
+            ops.DropTableOp('bar'),
+            ops.DropTableOp('foo'),
+        ]
+        eq_(net_operations(operations), [])
+
+    def test_create_drop_table_other_schema_between(self):
+        operations = [
+            self._create_table('foo'),
+            ops.AddColumnOp('foo', Column('x', Integer), schema='other'),
+            ops.CreateIndexOp('ix_x', 'foo', ['x'], schema='other'),
+            ops.DropTableOp('foo'),
+        ]
+        eq_(net_operations(operations), operations[1:3])
+
+    def test_create_drop_table_execute_between(self):
+        operations = [
+            self._create_table('foo'),
+            ops.ExecuteSQLOp("insert into foo (id) values (1)"),
+            ops.DropTableOp('foo'),
+        ]
+        eq_(net_operations(operations), operations)
+
+    def test_add_drop_column(self):
+        operations = [
+            ops.AddColumnOp('foo', Column('x', Integer)),
+            ops.AlterColumnOp('foo', 'x', modify_nullable=False),
+            ops.AddColumnOp('foo', Column('y', Integer)),
+            ops.DropColumnOp('foo', 'x'),
+        ]
+        eq_(net_operations(operations), [operations[2]])
+
+    def test_add_drop_column_indexed(self):
+        operations = [
+            ops.AddColumnOp('foo', Column('x', Integer)),
+            ops.CreateIndexOp('ix_x', 'foo', ['x']),
+            ops.DropColumnOp('foo', 'x'),
+        ]
+        eq_(net_operations(operations), operations)
+
+    def test_create_drop_index(self):
+        operations = [
+            ops.CreateIndexOp('ix_x', 'foo', ['x']),
+            ops.AddColumnOp('foo', Column('y', Integer)),
+            ops.DropIndexOp('ix_x'),
+        ]
+        eq_(net_operations(operations), [operations[1]])
+
+    def test_add_column_to_created_table(self):
+        operations = [
+            self._create_table('foo'),
+            ops.CreateIndexOp('ix_id', 'bar', ['id']),
+            ops.AddColumnOp('foo', Column('x', Integer)),
+        ]
+        result = net_operations(operations)
+        eq_(result, operations[0:2])
+        eq_([col.name for col in result[0].columns], ['id', 'x'])
+
+    def test_add_column_refers_to_table_in_other_schema(self):
+        operations = [
+            self._create_table('foo'),
+            self._create_table('bar'),
+            ops.AddColumnOp(
+                'foo', Column('bar_id', ForeignKey('other.bar.id'))),
+        ]
+        result = net_operations(operations)
+        eq_(result, operations[0:2])
+        eq_([col.name for col in result[0].columns], ['id', 'bar_id'])
+
+    def test_add_column_refers_to_later_table(self):
+        operations = [
+            self._create_table('foo'),
+            self._create_table('bar'),
+            ops.AddColumnOp('foo', Column('bar_id', ForeignKey('bar.id'))),
+        ]
+        eq_(net_operations(operations), operations)
+
+    def test_merge_renames(self):
+        operations = [
+            ops.AlterColumnOp('foo', 'x', modify_name='y'),
+            ops.AddColumnOp('foo', Column('z', Integer)),
+            ops.AlterColumnOp(
+                'foo', 'y', modify_name='q', existing_type=Integer),
+        ]
+        result = net_operations(operations)
+        eq_(result, operations[0:2])
+        eq_((result[0].column_name, result[0].modify_name), ('x', 'q'))
+
+    def test_renames_cancel(self):
+        operations = [
+            ops.AlterColumnOp('foo', 'x', modify_name='y'),
+            ops.AlterColumnOp('foo', 'y', modify_name='x'),
+        ]
+        eq_(net_operations(operations), [])
+
+    def test_rename_not_merged_past_reference(self):
+        operations = [
+            ops.AlterColumnOp('foo', 'x', modify_name='y'),
+            ops.CreateIndexOp('ix_y', 'foo', ['y']),
+            ops.AlterColumnOp('foo', 'y', modify_name='q'),
+        ]
+        eq_(net_operations(operations), operations)
+
+
+class OptimizeFreshUpgradeTest(TestBase):
+    __only_on__ = "sqlite"
+
+    def setUp(self):
+        self.bind = _sqlite_file_db()
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.a = a = util.rev_id()
+        self.b = b = util.rev_id()
+        script = ScriptDirectory.from_config(self.cfg)
+        script.generate_revision(a, None, refresh=True)
+        write_script(script, a, """
+revision = '%s'
+down_revision = None
+
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.create_table('foo', sa.Column('id', sa.Integer, primary_key=True))
+    op.create_table('tmp', sa.Column('id', sa.Integer, primary_key=True))
+    op.add_column('foo', sa.Column('x', sa.Integer))
+    op.create_index('ix_foo_x', 'foo', ['x'])
+
+""" % a)
+        script.generate_revision(b, None, refresh=True)
+        write_script(script, b, """
+revision = '%s'
+down_revision = '%s'
+
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.drop_table('tmp')
+    op.drop_index('ix_foo_x')
+    op.add_column('foo', sa.Column('y', sa.String(20)))
+    op.execute("insert into foo (id, x, y) values (1, 5, 'y')")
+    lookup = op.create_table(
+        'lookup', sa.Column('id', sa.Integer, primary_key=True))
+    op.bulk_insert(lookup, [{'id': 1}, {'id': 2}])
+
+""" % (b, a))
+        env_file_fixture("""
+
+from sqlalchemy import engine_from_config
+
+engine = engine_from_config(
+    config.get_section(config.config_ini_section),
+    prefix='sqlalchemy.')
+
+connection = engine.connect()
+
+context.configure(connection=connection, optimize_fresh_upgrade=True)
+
+try:
+    with context.begin_transaction():
+        context.run_migrations()
+finally:
+    connection.close()
+
+""")
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def test_upgrade(self):
+        create_table = DefaultImpl.create_table
+        with mock.patch.object(
+                DefaultImpl, "create_table",
+                side_effect=create_table, autospec=True) as create_mock:
+            command.upgrade(self.cfg, "heads")
+        eq_(
+            [call[1][1].name for call in create_mock.mock_calls],
+            ['foo', 'lookup']
+        )
+        eq_(
+            [col.name for col in create_mock.mock_calls[0][1][1].c],
+            ['id', 'x', 'y']
+        )
+
+        insp = Inspector.from_engine(self.bind)
+        eq_(
+            [col['name'] for col in insp.get_columns('foo')],
+            ['id', 'x', 'y']
+        )
+        eq_(insp.get_indexes('foo'), [])
+        assert 'tmp' not in insp.get_table_names()
+        eq_(self.bind.execute("select id, x, y from foo").fetchall(),
+            [(1, 5, 'y')])
+        eq_(self.bind.execute("select id from lookup").fetchall(),
+            [(1, ), (2, )])
+        eq_(
+            self.bind.scalar("select version_num from alembic_version"),
+            self.b
+        )
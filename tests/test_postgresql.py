@@ -1,9 +1,12 @@
 
 from sqlalchemy import DateTime, MetaData, Table, Column, text, Integer, \
-    String, Interval, Sequence, Numeric, BigInteger, Float, Numeric
+    String, Interval, Sequence, Numeric, BigInteger, Float, Numeric, \
+    ForeignKey, Index, UniqueConstraint, event, exc
 from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.engine.reflection import Inspector
 from alembic.operations import Operations
+from alembic.ddl.postgresql import PostgresqlImpl, _pg_dialect_compatible
 from sqlalchemy.sql import table, column
 from alembic.autogenerate.compare import \
     _compare_server_default, _compare_tables, _render_server_default_for_compare
@@ -12,7 +15,8 @@ from alembic import command, util
 from alembic.migration import MigrationContext
 from alembic.script import ScriptDirectory
 
-from alembic.testing import eq_, provide_metadata
+from alembic.testing import eq_, provide_metadata, assert_raises
+from alembic.testing import mock
 from alembic.testing.env import staging_env, clear_staging_env, \
     _no_sql_testing_config, write_script
 from alembic.testing.fixtures import capture_context_buffer
@@ -376,6 +380,65 @@ class PostgresqlDefaultCompareTest(TestBase):
             t1, t2, t2.c.id, ""
         )
 
+    def _batch_comparisons(self):
+        t = Table("sometable", MetaData(),
+                  Column("id", Integer, primary_key=True),
+                  Column("a", Integer, server_default=text("5")),
+                  Column("b", Integer, server_default=text("5")),
+                  Column("c", String(), server_default="hello"),
+                  Column("d", Integer))
+        return [
+            (None, t.c.id, None, None),
+            (t.c.a, t.c.a, "5", "6"),
+            (t.c.b, t.c.b, "5", "(2 + 3)"),
+            (t.c.c, t.c.c, "hello", "'hello'::character varying"),
+            (t.c.d, t.c.d, None, "5"),
+        ]
+
+    def test_compare_defaults_single_query(self):
+        impl = self.autogen_context['context'].impl
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *arg):
+            statements.append(statement)
+
+        event.listen(
+            impl.connection, "before_cursor_execute", before_cursor_execute)
+        try:
+            results = impl.compare_server_defaults(self._batch_comparisons())
+        finally:
+            event.remove(
+                impl.connection, "before_cursor_execute",
+                before_cursor_execute)
+
+        eq_(results, [False, True, False, False, True])
+        eq_(
+            [stmt for stmt in statements if stmt.startswith("SELECT")],
+            ["SELECT (6 = 5), ((2 + 3) = 5), "
+             "('hello'::character varying = 'hello')"]
+        )
+
+    def test_compare_defaults_chunked(self):
+        impl = self.autogen_context['context'].impl
+        comparisons = self._batch_comparisons()
+        with mock.patch.object(impl, "default_compare_chunk_size", 2):
+            eq_(
+                impl.compare_server_defaults(comparisons),
+                [
+                    impl.compare_server_default(*comparison)
+                    for comparison in comparisons
+                ]
+            )
+
+    def test_compare_defaults_failed_expression(self):
+        impl = self.autogen_context['context'].impl
+        comparisons = self._batch_comparisons()
+        comparisons[2] = comparisons[2][0:3] + ("nonexistent_fn()", )
+        assert_raises(
+            exc.DBAPIError,
+            impl.compare_server_defaults, comparisons
+        )
+
 
 class PostgresqlDetectSerialTest(TestBase):
     __only_on__ = 'postgresql'
@@ -475,4 +538,127 @@ class PostgresqlDetectSerialTest(TestBase):
             Column('x', Integer, autoincrement=False, primary_key=True)
         )
 
+    @provide_metadata
+    def test_sequence_owners_queried_once(self):
+        for tname in ('t1', 't2', 't3'):
+            Table(tname, self.metadata,
+                  Column('id', Integer, primary_key=True))
+        self.metadata.create_all(config.db)
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *arg):
+            statements.append(statement)
+
+        insp = Inspector.from_engine(config.db)
+        diffs = []
+        event.listen(
+            config.db, "before_cursor_execute", before_cursor_execute)
+        try:
+            _compare_tables(
+                set([(None, 't1'), (None, 't2'), (None, 't3')]), set([]),
+                [],
+                insp, self.metadata, diffs, self.autogen_context)
+        finally:
+            event.remove(
+                config.db, "before_cursor_execute", before_cursor_execute)
+
+        eq_(
+            len([stmt for stmt in statements if "pg_depend" in stmt]),
+            1
+        )
+        for diff in diffs:
+            eq_(diff[1].c.id.server_default, None)
+
+
+class PostgresqlBulkReflectionTest(TestBase):
+    __only_on__ = 'postgresql'
 
+    def _per_table(self, insp, tname):
+        return {
+            'columns': [
+                (col['name'], repr(col['type']), col['nullable'],
+                 col['default'])
+                for col in insp.get_columns(tname)],
+            'pk_constraint': insp.get_pk_constraint(tname),
+            'foreign_keys': insp.get_foreign_keys(tname),
+            'indexes': sorted(
+                insp.get_indexes(tname), key=lambda idx: idx['name']),
+            'unique_constraints': sorted(
+                insp.get_unique_constraints(tname),
+                key=lambda uq: uq['name'])
+        }
+
+    @provide_metadata
+    def test_matches_per_table_reflection(self):
+        Table('a', self.metadata,
+              Column('id', Integer, primary_key=True),
+              Column('x', String(50), nullable=False, server_default="q"),
+              Column('y', Numeric(10, 2)),
+              UniqueConstraint('x', 'y', name='uq_a_xy'))
+        Table('b', self.metadata,
+              Column('id1', Integer, primary_key=True),
+              Column('id2', Integer, primary_key=True),
+              Column('a_id', Integer,
+                     ForeignKey('a.id', ondelete='CASCADE')),
+              Column('z', Integer),
+              Index('ix_b_z_a', 'z', 'a_id'))
+        self.metadata.create_all(config.db)
+
+        with config.db.connect() as conn:
+            context = MigrationContext.configure(connection=conn)
+            insp = Inspector.from_engine(conn)
+            reflected = context.impl.autogen_reflect_tables(
+                insp, None, ['a', 'b'])
+
+            expected = dict(
+                (tname, self._per_table(Inspector.from_engine(conn), tname))
+                for tname in ['a', 'b'])
+
+        for tname in ['a', 'b']:
+            info = reflected[tname]
+            eq_(
+                [(col['name'], repr(col['type']), col['nullable'],
+                  col['default']) for col in info['columns']],
+                expected[tname]['columns']
+            )
+            eq_(info['pk_constraint'], expected[tname]['pk_constraint'])
+            eq_(info['foreign_keys'], expected[tname]['foreign_keys'])
+            eq_(
+                sorted(info['indexes'], key=lambda idx: idx['name']),
+                expected[tname]['indexes'])
+            eq_(
+                sorted(
+                    info['unique_constraints'], key=lambda uq: uq['name']),
+                expected[tname]['unique_constraints'])
+
+
+class PostgresqlBulkReflectionCompatTest(TestBase):
+
+    def _impl_fixture(self, dialect):
+        inspector = mock.Mock(dialect=dialect)
+        inspector.dialect.server_version_info = (9, 4)
+        inspector.dialect.default_schema_name = "public"
+        return inspector, PostgresqlImpl(
+            dialect, None, False, None, None, {})
+
+    @config.requirements.sqlalchemy_100
+    def test_compatible_dialect(self):
+        assert _pg_dialect_compatible(postgresql.dialect())
+
+    def test_changed_signature_falls_back(self):
+        class ChangedDialect(postgresql.dialect):
+            def _get_column_info(
+                    self, name, format_type, default, notnull,
+                    domains, enums, schema, comment):
+                pass
+
+        inspector, impl = self._impl_fixture(ChangedDialect())
+        eq_(impl.autogen_reflect_tables(inspector, None, ['a']), None)
+
+    def test_type_error_falls_back(self):
+        inspector, impl = self._impl_fixture(postgresql.dialect())
+        with mock.patch.object(
+                PostgresqlImpl, "_reflect_columns",
+                side_effect=TypeError("unexpected argument")):
+            eq_(impl.autogen_reflect_tables(inspector, None, ['a']), None)
@@ -901,3 +901,190 @@ class MultipleBaseCrossDependencyTestTwo(DownIterateTest):
             ['d3', 'c3', 'b3', 'a3', 'base3']
         )
 
+
+class ReachabilityIndexTest(TestBase):
+    def setUp(self):
+        self.map = RevisionMap(
+            lambda: [
+                Revision('base1', ()),
+                Revision('base2', ()),
+                Revision('a1', 'base1'),
+                Revision('a2', 'base2'),
+                Revision('b1', 'a1'),
+                Revision('b2', 'a2', dependencies='a1'),
+                Revision('c1a', 'b1'),
+                Revision('c1b', 'b1'),
+                Revision('d1', ('c1a', 'c1b')),
+                Revision('c2', 'b2'),
+            ]
+        )
+
+    def _ids(self, bits):
+        return self.map._index.revision_ids(bits)
+
+    def _assert_matches_traversal(self):
+        map_ = self.map
+        index = map_._index
+        for rev in map_.get_revisions(map_._real_heads + map_._real_bases):
+            for include_dependencies in (True, False):
+                eq_(
+                    self._ids(index.ancestors(
+                        [rev], include_dependencies=include_dependencies)),
+                    set(r.revision for r in map_._get_ancestor_nodes(
+                        [rev], include_dependencies=include_dependencies))
+                )
+                eq_(
+                    self._ids(index.descendants(
+                        [rev], include_dependencies=include_dependencies)),
+                    set(r.revision for r in map_._get_descendant_nodes(
+                        [rev], include_dependencies=include_dependencies))
+                )
+
+    def test_matches_traversal(self):
+        self._assert_matches_traversal()
+
+    def test_topological_positions(self):
+        index = self.map._index
+        all_bits = (1 << len(index._revisions)) - 1
+        for rev in index.revisions(all_bits):
+            for downrev in rev._all_down_revisions:
+                assert index._positions[downrev] < \
+                    index._positions[rev.revision]
+
+    def test_descendants_with_dependencies(self):
+        index = self.map._index
+        a1 = self.map.get_revision('a1')
+        eq_(
+            self._ids(index.descendants([a1])),
+            set(['a1', 'b1', 'c1a', 'c1b', 'd1', 'b2', 'c2'])
+        )
+        eq_(
+            self._ids(index.descendants([a1], include_dependencies=False)),
+            set(['a1', 'b1', 'c1a', 'c1b', 'd1'])
+        )
+
+    def test_overlap_check(self):
+        index = self.map._index
+        assert_raises_message(
+            RevisionError,
+            "Requested revision d1 overlaps with other requested revisions",
+            index.ancestors,
+            self.map.get_revisions(['c2', 'd1', 'b1']), check=True
+        )
+
+    def test_add_revision_updates_index(self):
+        map_ = self.map
+        index = map_._index
+        # memoize some closures first
+        self._assert_matches_traversal()
+
+        map_.add_revision(Revision('e1', 'd1', dependencies='c2'))
+        assert map_._index is index
+        self._assert_matches_traversal()
+        eq_(
+            self._ids(index.descendants([map_.get_revision('base2')])),
+            set(['base2', 'a2', 'b2', 'c2', 'e1'])
+        )
+        eq_(
+            self._ids(index.descendants(
+                [map_.get_revision('base2')], include_dependencies=False)),
+            set(['base2', 'a2', 'b2', 'c2'])
+        )
+
+    def test_shares_lineage(self):
+        map_ = self.map
+        eq_(
+            map_.filter_for_lineage(
+                ['c1a', 'c1b', 'd1', 'c2', 'base2'], 'c1a'),
+            ['c1a', 'd1']
+        )
+        eq_(
+            map_.filter_for_lineage(
+                ['d1', 'c2'], 'a1', include_dependencies=True),
+            ['d1', 'c2']
+        )
+        eq_(
+            map_.filter_for_lineage(['d1', 'c2'], 'a1'),
+            ['d1']
+        )
+
+
+class ManyMergePointsTest(TestBase):
+    def setUp(self):
+        # a chain of 40 diamonds; traversal which doesn't skip nodes
+        # already seen visits the top of the chain 2 ** 40 times
+        revs = [Revision('root', (), branch_labels='main')]
+        down = 'root'
+        for idx in range(40):
+            revs.extend([
+                Revision('l%d' % idx, down),
+                Revision('r%d' % idx, down),
+                Revision('m%d' % idx, ('l%d' % idx, 'r%d' % idx)),
+            ])
+            down = 'm%d' % idx
+        self.map = RevisionMap(lambda: revs)
+
+    def test_descendants_yielded_once(self):
+        base = self.map.get_revision('root')
+        nodes = list(self.map._get_descendant_nodes([base]))
+        eq_(len(nodes), 121)
+        eq_(len(set(nodes)), 121)
+
+    def test_ancestors_yielded_once(self):
+        head = self.map.get_revision('m39')
+        eq_(len(list(self.map._get_ancestor_nodes([head]))), 121)
+
+    def test_branch_label_applied(self):
+        eq_(self.map.get_revision('m39').branch_labels, set(['main']))
+        eq_(len(list(self.map.iterate_revisions('main@head', 'root'))), 120)
+
+
+class SquashedRevisionTest(TestBase):
+    def setUp(self):
+        self.map = RevisionMap(
+            lambda: [
+                Revision('a', ()),
+                Revision('b', ('a',)),
+                Revision('c', ('b',)),
+                Revision('d', ('c',)),
+                Revision('x', ('b',)),
+                Revision('sb', (), squashes='b'),
+                Revision('sc', (), squashes='c'),
+            ]
+        )
+
+    def _revs(self, *revs):
+        return [self.map.get_revision(rev) for rev in revs]
+
+    def test_not_in_graph(self):
+        eq_(set(self.map.heads), set(['d', 'x']))
+        eq_(self.map.bases, ('a', ))
+        eq_(self.map.get_revision('sc').squashes, 'c')
+        eq_(
+            [rev.revision for rev in self.map.iterate_revisions('d', 'base')],
+            ['d', 'c', 'b', 'a']
+        )
+
+    def test_largest_squash_preferred(self):
+        squashes, revs = self.map._squashed_upgrade(
+            self._revs('a', 'b', 'c', 'd', 'x'))
+        eq_([rev.revision for rev in squashes], ['sc'])
+        eq_([rev.revision for rev in revs], ['d', 'x'])
+
+    def test_partial_range_not_squashed(self):
+        squashes, revs = self.map._squashed_upgrade(
+            self._revs('a', 'b', 'x'))
+        eq_([rev.revision for rev in squashes], ['sb'])
+        eq_([rev.revision for rev in revs], ['x'])
+
+        squashes, revs = self.map._squashed_upgrade(self._revs('a'))
+        eq_(squashes, [])
+        eq_([rev.revision for rev in revs], ['a'])
+
+    def test_add_squash_revision(self):
+        self.map.add_revision(Revision('sd', (), squashes='d'))
+        eq_(set(self.map.heads), set(['d', 'x']))
+        squashes, revs = self.map._squashed_upgrade(
+            self._revs('a', 'b', 'c', 'd'))
+        eq_([rev.revision for rev in squashes], ['sd'])
+        eq_(revs, [])
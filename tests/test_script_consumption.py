@@ -5,11 +5,11 @@ import re
 
 from alembic import command, util
 from alembic.util import compat
-from alembic.script import ScriptDirectory, Script
+from alembic.script import ScriptDirectory, Script, base
 from alembic.testing.env import clear_staging_env, staging_env, \
     _sqlite_testing_config, write_script, _sqlite_file_db, \
-    three_rev_fixture, _no_sql_testing_config
-from alembic.testing import eq_, assert_raises_message
+    three_rev_fixture, _no_sql_testing_config, _get_staging_directory
+from alembic.testing import eq_, assert_raises_message, mock
 from alembic.testing.fixtures import TestBase, capture_context_buffer
 
 
@@ -125,6 +125,230 @@ class SourcelessApplyVersionsTest(ApplyVersionsFunctionalTest):
     sourceless = True
 
 
+class RevisionMapCacheTest(TestBase):
+
+    def setUp(self):
+        self.env = staging_env()
+        self.cfg = cfg = _no_sql_testing_config()
+        cfg.set_main_option('dialect_name', 'sqlite')
+        cfg.remove_main_option('url')
+        self.cache_path = os.path.join(
+            _get_staging_directory(), 'revision_map.cache')
+        cfg.set_main_option('revision_map_cache', self.cache_path)
+
+        self.a, self.b, self.c = three_rev_fixture(cfg)
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def _load_script(self):
+        # build a new ScriptDirectory and its revision map, counting the
+        # modules that actually get imported.
+        script = ScriptDirectory.from_config(self.cfg)
+        with mock.patch(
+                "alembic.util.load_python_file",
+                side_effect=util.load_python_file) as load:
+            script.revision_map.heads
+        return script, load.call_count
+
+    def test_cache_written(self):
+        script, loaded = self._load_script()
+        eq_(loaded, 3)
+        assert os.path.exists(self.cache_path)
+
+        script, loaded = self._load_script()
+        eq_(loaded, 0)
+        eq_(script.get_heads(), [self.c])
+        eq_(script.get_revision(self.b).down_revision, self.a)
+        eq_(
+            [rev.revision for rev in script.walk_revisions()],
+            [self.c, self.b, self.a]
+        )
+
+    def test_module_loaded_on_access(self):
+        self._load_script()
+        script, loaded = self._load_script()
+        rev = script.get_revision(self.a)
+        eq_(rev.doc, "Rev A")
+        assert hasattr(rev.module, "upgrade")
+
+    def test_modified_file_reloaded(self):
+        self._load_script()
+        script = ScriptDirectory.from_config(self.cfg)
+        write_script(script, self.c, """\
+revision = '%s'
+down_revision = '%s'
+branch_labels = ('somelabel', )
+
+def upgrade():
+    pass
+
+def downgrade():
+    pass
+
+""" % (self.c, self.b))
+
+        script, loaded = self._load_script()
+        eq_(loaded, 1)
+        eq_(script.get_revision(self.c).branch_labels, set(['somelabel']))
+
+        script, loaded = self._load_script()
+        eq_(loaded, 0)
+        eq_(script.get_revision(self.c).branch_labels, set(['somelabel']))
+
+    def test_removed_file_dropped(self):
+        script, loaded = self._load_script()
+        os.unlink(script.get_revision(self.c).path)
+
+        script, loaded = self._load_script()
+        eq_(loaded, 0)
+        eq_(script.get_heads(), [self.b])
+
+    def test_corrupt_cache_ignored(self):
+        with open(self.cache_path, 'w') as f:
+            f.write("not json")
+        script, loaded = self._load_script()
+        eq_(loaded, 3)
+        eq_(script.get_heads(), [self.c])
+
+
+class LazyScriptTest(TestBase):
+
+    def setUp(self):
+        self.env = staging_env()
+        self.cfg = cfg = _no_sql_testing_config()
+        cfg.set_main_option('dialect_name', 'sqlite')
+        cfg.remove_main_option('url')
+
+        self.a, self.b, self.c = three_rev_fixture(cfg)
+        cfg.set_main_option('lazy_scripts', 'true')
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def _load_script(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        with mock.patch(
+                "alembic.util.load_python_file",
+                side_effect=util.load_python_file) as load:
+            script.revision_map.heads
+        return script, load.call_count
+
+    def test_no_import_for_revision_map(self):
+        script, loaded = self._load_script()
+        eq_(loaded, 0)
+        eq_(script.get_heads(), [self.c])
+        eq_(script.get_revision(self.c).down_revision, self.b)
+        eq_(
+            [rev.revision for rev in script.walk_revisions()],
+            [self.c, self.b, self.a]
+        )
+
+    def test_module_imported_on_access(self):
+        script, loaded = self._load_script()
+        rev = script.get_revision(self.b)
+        eq_(rev.doc, compat.u("Rev B, méil"))
+        assert hasattr(rev.module, "upgrade")
+
+    def test_upgrade(self):
+        with capture_context_buffer() as buf:
+            command.upgrade(self.cfg, self.c, sql=True)
+        assert "CREATE STEP 3" in buf.getvalue()
+
+    def test_tuple_identifiers(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        write_script(script, self.c, """\
+revision = '%s'
+down_revision = ('%s', )
+branch_labels = ['foo']
+depends_on = None
+
+def upgrade():
+    pass
+
+def downgrade():
+    pass
+
+""" % (self.c, self.b))
+        script, loaded = self._load_script()
+        eq_(loaded, 0)
+        rev = script.get_revision(self.c)
+        eq_(rev.down_revision, self.b)
+        eq_(rev.branch_labels, set(['foo']))
+
+    def test_computed_identifiers_fall_back_to_import(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        write_script(script, self.c, """\
+revision = '%s'
+down_revision = '%s'.lower()
+
+def upgrade():
+    pass
+
+def downgrade():
+    pass
+
+""" % (self.c, self.b))
+        script, loaded = self._load_script()
+        eq_(loaded, 1)
+        eq_(script.get_revision(self.c).down_revision, self.b)
+
+
+class ParallelLoadTest(TestBase):
+
+    def setUp(self):
+        self.env = staging_env()
+        self.cfg = cfg = _no_sql_testing_config()
+        cfg.set_main_option('dialect_name', 'sqlite')
+        cfg.remove_main_option('url')
+
+        self.a, self.b, self.c = three_rev_fixture(cfg)
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def test_same_order_as_serial(self):
+        serial = ScriptDirectory.from_config(self.cfg)
+
+        self.cfg.set_main_option('revision_load_workers', '4')
+        parallel = ScriptDirectory.from_config(self.cfg)
+        eq_(parallel.revision_load_workers, 4)
+
+        with mock.patch(
+                "alembic.script.base.ThreadPool",
+                side_effect=base.ThreadPool) as pool:
+            eq_(
+                [rev.revision for rev in parallel._load_revisions()],
+                [rev.revision for rev in serial._load_revisions()]
+            )
+        eq_(pool.mock_calls[0], mock.call(4))
+
+        eq_(parallel.get_heads(), [self.c])
+        eq_(
+            [rev.revision for rev in parallel.walk_revisions()],
+            [self.c, self.b, self.a]
+        )
+
+    def test_duplicate_warnings_in_order(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        for rev, name in [(self.a, "dupe_a.py"), (self.b, "dupe_b.py")]:
+            with open(script.get_revision(rev).path, "rb") as src:
+                content = src.read()
+            with open(os.path.join(script.versions, name), "wb") as dest:
+                dest.write(content)
+
+        def warnings_for(workers):
+            self.cfg.set_main_option('revision_load_workers', workers)
+            script = ScriptDirectory.from_config(self.cfg)
+            with mock.patch("alembic.util.warn") as warn:
+                script.revision_map.heads
+            return warn.mock_calls
+
+        serial = warnings_for('1')
+        eq_(len(serial), 2)
+        eq_(warnings_for('4'), serial)
+
+
 class TransactionalDDLTest(TestBase):
     def setUp(self):
         self.env = staging_env()
@@ -153,6 +377,25 @@ class TransactionalDDLTest(TestBase):
         assert re.match(r"^CREATE TABLE.*?\n+$", buf.getvalue(), re.S)
         assert "COMMIT;" not in buf.getvalue()
 
+    def test_deferred_version_writes(self):
+        with capture_context_buffer(
+                transactional_ddl=True, defer_version_writes=True) as buf:
+            command.upgrade(self.cfg, self.c, sql=True)
+        eq_(buf.getvalue().count("INSERT INTO alembic_version"), 1)
+        assert "UPDATE alembic_version" not in buf.getvalue()
+        assert re.match(
+            r"^BEGIN;.*CREATE STEP 3.*INSERT INTO alembic_version "
+            r"\(version_num\) VALUES \('%s'\);\s+COMMIT;" % self.c,
+            buf.getvalue(), re.S)
+
+    def test_deferred_version_writes_per_rev_ddl(self):
+        # ignored, as each migration commits separately
+        with capture_context_buffer(
+                transaction_per_migration=True,
+                defer_version_writes=True) as buf:
+            command.upgrade(self.cfg, self.c, sql=True)
+        eq_(buf.getvalue().count("UPDATE alembic_version"), 2)
+
     def test_begin_commit_per_rev_ddl(self):
         with capture_context_buffer(transaction_per_migration=True) as buf:
             command.upgrade(self.cfg, self.c, sql=True)
@@ -270,3 +270,99 @@ class UpdateRevTest(TestBase):
             self.updater.update_to_step, _down('a', None, True)
         )
 
+
+class DeferredUpdateRevTest(TestBase):
+
+    @classmethod
+    def setup_class(cls):
+        cls.bind = config.db
+
+    def setUp(self):
+        self.connection = self.bind.connect()
+        self.context = migration.MigrationContext.configure(
+            connection=self.connection,
+            opts={"version_table": "version_table"})
+        version_table.create(self.connection)
+        self.updater = migration.HeadMaintainer(
+            self.context, (), deferred=True)
+
+    def tearDown(self):
+        version_table.drop(self.connection, checkfirst=True)
+        self.connection.close()
+
+    def _assert_db_heads(self, heads):
+        eq_(set(self.context.get_current_heads()), set(heads))
+
+    def test_nothing_written_until_flush(self):
+        self.updater.update_to_step(_up(None, 'a', True))
+        self.updater.update_to_step(_up('a', 'b'))
+        self.updater.update_to_step(_up('b', 'c'))
+        eq_(self.updater.heads, set(['c']))
+        self._assert_db_heads(())
+
+        self.updater.flush()
+        self._assert_db_heads(('c', ))
+
+    def test_one_statement_per_net_change(self):
+        self.connection.execute(version_table.insert(), version_num='a')
+        self.updater = migration.HeadMaintainer(
+            self.context, ('a', ), deferred=True)
+        for step in [
+            _up('a', 'b'), _up('b', 'c1'), _up('b', 'c2', True),
+            _up('c1', 'd1'), _up('c2', 'd2'), _up(('d1', 'd2'), 'e'),
+            _up('e', 'f')
+        ]:
+            self.updater.update_to_step(step)
+
+        with mock.patch.object(
+                self.context.impl, "_exec",
+                side_effect=self.context.impl._exec) as exec_:
+            self.updater.flush()
+        eq_(len(exec_.mock_calls), 1)
+        self._assert_db_heads(('f', ))
+
+        # nothing further to write
+        with mock.patch.object(self.context.impl, "_exec") as exec_:
+            self.updater.flush()
+        eq_(exec_.mock_calls, [])
+
+    def test_net_branches(self):
+        self.updater.update_to_step(_up(None, 'a', True))
+        self.updater.update_to_step(_up('a', 'b1'))
+        self.updater.update_to_step(_up('a', 'b2', True))
+        self.updater.update_to_step(_up(None, 'x', True))
+        self.updater.flush()
+        self._assert_db_heads(('b1', 'b2', 'x'))
+
+        self.updater.update_to_step(_up(('b1', 'b2'), 'c'))
+        self.updater.update_to_step(_down('x', None, True))
+        self.updater.flush()
+        self._assert_db_heads(('c', ))
+
+        self.updater.update_to_step(_down('c', None, True))
+        self.updater.flush()
+        self._assert_db_heads(())
+
+    def test_update_no_match_on_flush(self):
+        self.updater = migration.HeadMaintainer(
+            self.context, ('x', ), deferred=True)
+        self.updater.update_to_step(_up('x', 'b'))
+        assert_raises_message(
+            CommandError,
+            "Online migration expected to match one row when updating "
+            "'x' to 'b' in 'version_table'; 0 found",
+            self.updater.flush
+        )
+
+    def test_delete_multi_match_on_flush(self):
+        self.connection.execute(version_table.insert(), version_num='a')
+        self.connection.execute(version_table.insert(), version_num='a')
+        self.updater = migration.HeadMaintainer(
+            self.context, ('a', ), deferred=True)
+        self.updater.update_to_step(_down('a', None, True))
+        assert_raises_message(
+            CommandError,
+            "Online migration expected to match one row when "
+            "deleting 'a' in 'version_table'; 2 found",
+            self.updater.flush
+        )